@@ -0,0 +1,97 @@
+import asyncio
+import time
+from collections import deque
+from app.core.cache import dumps
+
+
+class Subscriber:
+    __slots__ = ("queue", "lagged")
+
+    def __init__(self, size: int):
+        self.queue = asyncio.Queue(size)
+        self.lagged = False
+
+
+def sse_message(event_id: int, event: str, data: bytes) -> bytes:
+    return b"id: %d\nevent: %s\ndata: %s\n\n" % (event_id, event.encode(), data)
+
+
+class Broadcaster:
+    """
+    Reparte eventos a cualquier número de suscriptores, cada uno con su cola acotada.
+    Un suscriptor lento no frena a los demás: si su cola se llena deja de recibir,
+    termina de vaciarla y se le cierra la conexión; al reconectar con Last-Event-ID
+    recupera del búfer circular lo que se perdió.
+    """
+
+    def __init__(self, buffer_size: int, queue_size: int):
+        self.buffer = deque(maxlen=buffer_size)
+        self.queue_size = queue_size
+        self.subscribers = set()
+        # Ids crecientes también entre reinicios: se parte de la hora en milisegundos
+        self.last_id = int(time.time() * 1000)
+        self.stats = {"published": 0, "lagged": 0, "resumed": 0, "resyncs": 0}
+
+    def publish(self, event: str, data) -> int:
+        """
+        Serializa `data` una sola vez y lo encola para todos los suscriptores.
+        """
+        self.last_id += 1
+        message = sse_message(self.last_id, event, dumps(data))
+        self.buffer.append((self.last_id, message))
+        self.stats["published"] += 1
+        for sub in list(self.subscribers):
+            try:
+                sub.queue.put_nowait(message)
+            except asyncio.QueueFull:
+                sub.lagged = True
+                self.subscribers.discard(sub)
+                self.stats["lagged"] += 1
+        return self.last_id
+
+    def subscribe(self, last_event_id: int = None):
+        """
+        Nuevo suscriptor y los mensajes que le faltan desde `last_event_id`. Si alguno
+        ya salió del búfer (o el id es de antes de un reinicio) el backlog es None.
+        """
+        sub = Subscriber(self.queue_size)
+        self.subscribers.add(sub)
+        if last_event_id is None:
+            return sub, []
+        oldest = self.buffer[0][0] if self.buffer else self.last_id + 1
+        if last_event_id < oldest - 1:
+            self.stats["resyncs"] += 1
+            return sub, None
+        self.stats["resumed"] += 1
+        return sub, [message for event_id, message in self.buffer if event_id > last_event_id]
+
+    def unsubscribe(self, sub: Subscriber):
+        self.subscribers.discard(sub)
+
+    async def stream(self, sub: Subscriber, backlog, heartbeat: float, retry_ms: int):
+        """
+        Cuerpo text/event-stream de un suscriptor. Un backlog None se anuncia con un
+        evento "resync": el cliente debe volver a pedir el estado completo.
+        """
+        try:
+            yield b"retry: %d\n\n" % retry_ms
+            if backlog is None:
+                yield sse_message(self.last_id, "resync", b"{}")
+            elif backlog:
+                yield b"".join(backlog)
+            while not (sub.lagged and sub.queue.empty()):
+                try:
+                    message = await asyncio.wait_for(sub.queue.get(), heartbeat)
+                except asyncio.TimeoutError:
+                    yield b": ping\n\n"
+                    continue
+                # Lo que se haya acumulado mientras tanto sale en el mismo envío
+                chunk = [message]
+                while not sub.queue.empty():
+                    chunk.append(sub.queue.get_nowait())
+                yield b"".join(chunk)
+        finally:
+            self.unsubscribe(sub)
+
+    def get_stats(self) -> dict:
+        return {**self.stats, "subscribers": len(self.subscribers), "buffered": len(self.buffer), "last_id": self.last_id}
@@ -1,13 +1,160 @@
 import time
-from app.core.config import CACHE_TTL
+import asyncio
+import hashlib
+import logging
+import orjson
+from collections import OrderedDict
+from app.core.config import CACHE_TTL, PARSE_MEMO_SIZE, PREFETCH_NEXT_PAGE
+
+logger = logging.getLogger(__name__)
 
 cache = {}
+cache_stats = {"hits": 0, "misses": 0}
 
-def get_cached(key):
-    now = time.time()
-    if key in cache and now - cache[key]["timestamp"] < CACHE_TTL:
-        return cache[key]["data"]
+def is_fresh(entry) -> bool:
+    return time.time() - entry["timestamp"] < entry["ttl"]
+
+def get_cached_entry(key):
+    entry = cache.get(key)
+    if entry is not None and is_fresh(entry):
+        cache_stats["hits"] += 1
+        return entry
+    cache_stats["misses"] += 1
     return None
 
-def set_cache(key, value):
-    cache[key] = {"timestamp": time.time(), "data": value}
+def get_cached(key):
+    entry = get_cached_entry(key)
+    return entry["data"] if entry else None
+
+def set_cache(key, value, ttl=None):
+    """
+    Guarda `value` en `key`. `ttl` (segundos) sustituye a CACHE_TTL para esta entrada.
+    """
+    ttl = ttl or CACHE_TTL
+    entry = cache.get(key)
+    if entry is not None and entry["data"] is value:
+        # Mismo objeto (p. ej. página sin cambios servida por memo_parse): se conservan los bytes
+        entry["timestamp"] = time.time()
+        entry["ttl"] = ttl
+        return entry
+    # body: JSON serializado (una vez); variants: body comprimido por codificación ("br", "gzip")
+    entry = {"timestamp": time.time(), "ttl": ttl, "data": value, "body": None, "variants": {}}
+    cache[key] = entry
+    return entry
+
+def invalidate(key) -> bool:
+    """
+    Quita `key` de la caché; True si estaba.
+    """
+    return cache.pop(key, None) is not None
+
+def _json_default(obj):
+    if hasattr(obj, "model_dump"):
+        return obj.model_dump()
+    raise TypeError(f"Tipo no serializable: {type(obj).__name__}")
+
+def dumps(value) -> bytes:
+    return orjson.dumps(value, default=_json_default, option=orjson.OPT_NON_STR_KEYS)
+
+def serialized_body(entry) -> bytes:
+    """
+    JSON de la entrada, serializado la primera vez que se pide.
+    """
+    if entry["body"] is None:
+        entry["body"] = dumps(entry["data"])
+    return entry["body"]
+
+# -------------------- Cargas compartidas y prefetch --------------------
+inflight = {}
+prefetch_tasks = set()
+prefetch_stats = {"scheduled": 0, "skipped": 0, "failed": 0}
+
+async def load_once(key, loader):
+    """
+    Ejecuta loader() una sola vez aunque varias peticiones pidan la misma clave a la vez;
+    las demás esperan el mismo resultado. Cancelar a un solicitante no cancela la carga.
+    """
+    task = inflight.get(key)
+    if task is None:
+        task = asyncio.ensure_future(loader())
+        inflight[key] = task
+        task.add_done_callback(lambda _: inflight.pop(key, None))
+    return await asyncio.shield(task)
+
+def _prefetch_done(task):
+    prefetch_tasks.discard(task)
+    if not task.cancelled() and task.exception() is not None:
+        prefetch_stats["failed"] += 1
+        logger.warning(f"[PREFETCH] Falló: {task.exception()}")
+
+def prefetch(key, loader):
+    """
+    Lanza en segundo plano la carga de `key` si no está en caché ni cargándose ya.
+    """
+    entry = cache.get(key)
+    if (not PREFETCH_NEXT_PAGE or key in inflight
+            or (entry is not None and is_fresh(entry))):
+        prefetch_stats["skipped"] += 1
+        return
+    prefetch_stats["scheduled"] += 1
+    task = asyncio.ensure_future(load_once(key, loader))
+    prefetch_tasks.add(task)
+    task.add_done_callback(_prefetch_done)
+
+# -------------------- Memo de parseo por contenido --------------------
+# Si una página descargada es idéntica byte a byte a la anterior (TTL vencido o
+# force_refresh), se devuelve el resultado ya parseado en lugar de parsear otra vez.
+parse_memo = OrderedDict()
+parse_stats = {}
+
+def content_hash(text: str) -> str:
+    return hashlib.blake2b(text.encode("utf-8", "surrogatepass"), digest_size=16).hexdigest()
+
+def memo_parse(endpoint: str, parser, text: str, *args):
+    """
+    Ejecuta parser(text, *args) salvo que ya se haya parseado el mismo contenido
+    con el mismo parser y argumentos. El resultado memoizado es compartido: no mutarlo.
+    """
+    key, hit = _memo_lookup(endpoint, parser, text, args)
+    if hit is not _MISS:
+        return hit
+    return _memo_store(endpoint, key, parser(text, *args))
+
+async def memo_parse_in_thread(endpoint: str, parser, text: str, *args):
+    """
+    Como memo_parse, pero el parseo (si hace falta) corre en un hilo para no bloquear
+    el bucle de eventos. La memo solo se toca desde el bucle.
+    """
+    key, hit = _memo_lookup(endpoint, parser, text, args)
+    if hit is not _MISS:
+        return hit
+    return _memo_store(endpoint, key, await asyncio.to_thread(parser, text, *args))
+
+_MISS = object()
+
+def _memo_lookup(endpoint: str, parser, text: str, args: tuple):
+    # Con el módulo: animes.parse_home y mangas.parse_home no pueden compartir entrada
+    key = (f"{parser.__module__}.{parser.__qualname__}", content_hash(text), args)
+    if key in parse_memo:
+        parse_memo.move_to_end(key)
+        parse_stats.setdefault(endpoint, {"unchanged": 0, "parsed": 0})["unchanged"] += 1
+        return key, parse_memo[key]
+    return key, _MISS
+
+def _memo_store(endpoint: str, key, result):
+    parse_stats.setdefault(endpoint, {"unchanged": 0, "parsed": 0})["parsed"] += 1
+    parse_memo[key] = result
+    while len(parse_memo) > PARSE_MEMO_SIZE:
+        parse_memo.popitem(last=False)
+    return result
+
+def get_cache_stats():
+    total = cache_stats["hits"] + cache_stats["misses"]
+    return {**cache_stats, "entries": len(cache), "hit_ratio": round(cache_stats["hits"] / total, 4) if total else 0.0}
+
+def get_parse_stats():
+    out = {}
+    for endpoint, stats in parse_stats.items():
+        total = stats["unchanged"] + stats["parsed"]
+        out[endpoint] = {**stats, "unchanged_rate": round(stats["unchanged"] / total, 4) if total else 0.0}
+    return out
@@ -0,0 +1,104 @@
+import gzip
+import brotli
+from starlette.datastructures import Headers, MutableHeaders
+from app.core.config import (
+    COMPRESS_MIN_SIZE, BROTLI_QUALITY, GZIP_LEVEL, BROTLI_CACHED_QUALITY, GZIP_CACHED_LEVEL
+)
+
+# Por orden de preferencia cuando el cliente acepta varias con el mismo q
+SUPPORTED_ENCODINGS = ("br", "gzip")
+COMPRESSIBLE_TYPES = ("application/json", "application/x-ndjson", "text/")
+
+
+def negotiate_encoding(accept_encoding: str):
+    """
+    Elige "br", "gzip" o None a partir de la cabecera Accept-Encoding (respeta q=0 y "*").
+    """
+    if not accept_encoding:
+        return None
+    weights = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        name = name.strip().lower()
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        if name:
+            weights[name] = q
+
+    best, best_q = None, 0.0
+    for encoding in SUPPORTED_ENCODINGS:
+        q = weights.get(encoding, weights.get("*", 0.0))
+        if q > best_q:
+            best, best_q = encoding, q
+    return best
+
+
+def compress(body: bytes, encoding: str, cached: bool = False) -> bytes:
+    """
+    Para variantes que se guardan en caché (`cached=True`) se usa un nivel más alto:
+    se comprimen una sola vez.
+    """
+    if encoding == "br":
+        return brotli.compress(body, quality=BROTLI_CACHED_QUALITY if cached else BROTLI_QUALITY)
+    if encoding == "gzip":
+        return gzip.compress(body, compresslevel=GZIP_CACHED_LEVEL if cached else GZIP_LEVEL)
+    return body
+
+
+def is_compressible(content_type) -> bool:
+    return bool(content_type) and content_type.startswith(COMPRESSIBLE_TYPES)
+
+
+class CompressionMiddleware:
+    """
+    Comprime con brotli/gzip las respuestas de cuerpo único (no streaming) que no
+    traigan ya Content-Encoding y superen COMPRESS_MIN_SIZE. Las respuestas cacheadas
+    llegan ya comprimidas desde app.core.responses y pasan sin tocar.
+    """
+
+    def __init__(self, app, minimum_size: int = COMPRESS_MIN_SIZE):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = negotiate_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        if not encoding:
+            await self.app(scope, receive, send)
+            return
+
+        pending_start = None
+
+        async def send_wrapper(message):
+            nonlocal pending_start
+            if message["type"] == "http.response.start":
+                pending_start = message
+                return
+            if message["type"] != "http.response.body" or pending_start is None:
+                await send(message)
+                return
+
+            start, pending_start = pending_start, None
+            headers = MutableHeaders(raw=start["headers"])
+            body = message.get("body", b"")
+            if (message.get("more_body", False) or "content-encoding" in headers
+                    or not is_compressible(headers.get("content-type")) or len(body) < self.minimum_size):
+                await send(start)
+                await send(message)
+                return
+
+            compressed = compress(body, encoding)
+            headers["Content-Encoding"] = encoding
+            headers["Content-Length"] = str(len(compressed))
+            headers.add_vary_header("Accept-Encoding")
+            await send(start)
+            await send({"type": "http.response.body", "body": compressed})
+
+        await self.app(scope, receive, send_wrapper)
@@ -1,5 +1,8 @@
-BASE_URL = "https://animeav1.com"
-ZONATMO_BASE_URL = "https://zonatmo.com"
+import os
+
+# Se pueden sobrescribir por entorno, p. ej. para apuntar al simulador local (benchmarks/upstream_sim.py)
+BASE_URL = os.getenv("BASE_URL", "https://animeav1.com").rstrip("/")
+ZONATMO_BASE_URL = os.getenv("ZONATMO_BASE_URL", "https://zonatmo.com").rstrip("/")
 
 HEADERS = {
     "User-Agent": (
@@ -10,13 +13,100 @@ HEADERS = {
 
 ZONATMO_HEADERS = {
     "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/124.0.0.0 Safari/537.36",
-    "Referer": "https://zonatmo.com/",
+    "Referer": f"{ZONATMO_BASE_URL}/",
     "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8",
     "Accept-Language": "es-ES,es;q=0.9,en;q=0.8",
     # "Cookie": "agrega aquí tus cookies si tienes una sesión válida",
 }
 
 CACHE_TTL = 300  # segundos
+FINISHED_CACHE_TTL = int(os.getenv("FINISHED_CACHE_TTL", str(24 * 3600)))  # detalle/episodios de títulos finalizados
+CHANGE_SEEN_MAX = 1000  # novedades de la portada recordadas por lista (app.utils.changes)
+DATA_DIR = os.getenv("DATA_DIR", "data")  # almacenes persistentes (SQLite)
+PARSE_MEMO_SIZE = 256  # resultados de parseo memoizados por hash de contenido
+PREFETCH_NEXT_PAGE = os.getenv("PREFETCH_NEXT_PAGE", "1") != "0"  # catálogo/búsqueda: precargar la página N+1
+
+# Compresión de respuestas (brotli/gzip según Accept-Encoding)
+COMPRESS_MIN_SIZE = 1024  # bytes; por debajo no compensa comprimir
+BROTLI_QUALITY = 5        # respuestas al vuelo
+GZIP_LEVEL = 6
+BROTLI_CACHED_QUALITY = 9  # variantes guardadas junto a la entrada de caché (se comprimen una vez)
+GZIP_CACHED_LEVEL = 9
+
+# Streaming NDJSON (Accept: application/x-ndjson): la primera línea sale sola, el resto en bloques
+NDJSON_CHUNK_SIZE = 16 * 1024  # bytes
+
+# Endpoints batch (POST /api/animes/batch, /api/mangas/detalle/batch)
+BATCH_MAX_ITEMS = 50
+BATCH_CONCURRENCY = 8  # descargas simultáneas por petición batch
+
+# /api/animes?pages=all|N-M: páginas del catálogo descargadas a la vez
+CATALOG_CONCURRENCY = 6
+
+# Caché en disco de imágenes (páginas de capítulos), direccionada por contenido
+IMAGE_CACHE_MAX_BYTES = int(os.getenv("IMAGE_CACHE_MAX_BYTES", str(1024 ** 3)))  # presupuesto; se expulsa por LRU
+IMAGE_INDEX_TTL = 365 * 24 * 3600  # URL -> digest; las páginas no cambian
+
+# Lectura anticipada: al pedir la página k (o registrar el capítulo) se precargan las siguientes
+VIEWER_TTL = int(os.getenv("VIEWER_TTL", str(6 * 3600)))  # segundos que se reutiliza la lista de imágenes de un capítulo
+VIEWER_MAX_ENTRIES = int(os.getenv("VIEWER_MAX_ENTRIES", "2000"))  # visores en memoria (LRU)
+VIEWER_EAGER_PAGES = 2  # páginas del visor que se precargan; el resto con loading="lazy"
+VIEWER_PLACEHOLDER_SIZE = (800, 1200)  # ancho y alto declarados mientras no se conoce el real
+VIEWER_CACHE_CONTROL = "public, max-age=300"
+READAHEAD_DEPTH = int(os.getenv("READAHEAD_DEPTH", "3"))  # páginas por delante del lector (0 = desactivado)
+READAHEAD_CONCURRENCY = int(os.getenv("READAHEAD_CONCURRENCY", "2"))  # descargas simultáneas por visor
+READAHEAD_IDLE = 120  # segundos sin peticiones del visor tras los que se abandona la precarga
+
+# Exportación CBZ/ZIP de un capítulo: páginas descargadas a la vez
+ARCHIVE_CONCURRENCY = 4
+
+# Transformación de imágenes (/api/images/transform y proxy de páginas con w/q)
+IMAGE_WORKERS = int(os.getenv("IMAGE_WORKERS", str(min(4, os.cpu_count() or 1))))  # procesos de Pillow
+IMAGE_DEFAULT_QUALITY = 75
+IMAGE_MAX_WIDTH = 2048
+IMAGE_ALLOWED_HOSTS = [  # otakuteca.com sirve las portadas de ZonaTMO
+    h.strip() for h in os.getenv("IMAGE_ALLOWED_HOSTS", "cdn.animeav1.com,animeav1.com,zonatmo.com,otakuteca.com").split(",") if h.strip()
+]
+
+# Biblioteca local de mangas (/api/mangas/library)
+MANGA_LIBRARY_TTL = 90 * 24 * 3600  # segundos que se conserva una obra que no vuelve a verse
+MANGA_LIBRARY_REFRESH = 6 * 3600  # segundos tras los que una combinación de filtros se vuelve a scrapear
+
+# Rastreo masivo (python -m app.crawl)
+CRAWL_CONCURRENCY = 8  # peticiones simultáneas en total
+CRAWL_PER_HOST = 2  # peticiones simultáneas por host
+CRAWL_HOST_RATE = 4.0  # peticiones por segundo como mucho a cada host
+CRAWL_MAX_ATTEMPTS = 3  # intentos por página antes de darla por fallida
+
+# Metadatos de imágenes (include=image_meta): tamaño, color medio y LQIP por URL
+IMAGE_META_TTL = 30 * 24 * 3600  # segundos, en almacén persistente
+IMAGE_META_CONCURRENCY = 4  # descargas simultáneas del trabajo en segundo plano
+IMAGE_META_QUEUE_MAX = 10000  # URLs pendientes como mucho; el resto se descarta hasta otra petición
+IMAGE_META_RETRY = 3600  # segundos antes de reintentar una URL que falló
+LQIP_WIDTH = 16  # píxeles de ancho de la miniatura
+
+# Eventos en tiempo real (GET /api/events, Server-Sent Events)
+EVENTS_POLL_INTERVAL = int(os.getenv("EVENTS_POLL_INTERVAL", "60"))  # segundos entre lecturas de la portada de animes
+# Segundos entre lecturas de la portada de mangas. Cada lectura ignora la caché de HTML
+# y abre un navegador (Playwright + proxies), por eso es más espaciada que la de animes
+EVENTS_MANGA_POLL_INTERVAL = int(os.getenv("EVENTS_MANGA_POLL_INTERVAL", "300"))
+EVENTS_BUFFER = 1000  # últimos eventos guardados para reanudar con Last-Event-ID
+EVENTS_QUEUE_MAX = 256  # eventos pendientes por suscriptor; si se llena, se le cierra y reanuda al reconectar
+EVENTS_HEARTBEAT = 15  # segundos entre comentarios keep-alive
+EVENTS_RETRY_MS = 3000  # espera de reconexión que se indica a EventSource
+
+# Clientes HTTP compartidos (app.core.http)
+HTTP_MAX_CONNECTIONS = 100
+HTTP_MAX_KEEPALIVE = 20
+
+# Resolución /view_uploads/<id> -> /viewer/<uniqid>/paginated (casi nunca cambia)
+CHAPTER_MAP_TTL = 30 * 24 * 3600  # segundos, en almacén persistente
+RESOLVE_CONCURRENCY = 8
+RESOLVE_BATCH_MAX_ITEMS = 1000
+
+# Lista de imágenes (dirPath + images) de cada capítulo en /scrape-manga
+CHAPTER_IMAGES_TTL = 24 * 3600  # segundos, en almacén persistente
+VIEWER_PAGE_CONCURRENCY = 8  # páginas del visor paginado descargadas a la vez
 
 VALID_CATEGORIES = ["tv-anime", "pelicula", "ova", "especial"]
 VALID_GENRES = [
@@ -0,0 +1,46 @@
+import asyncio
+import httpx
+from app.core.config import HTTP_MAX_CONNECTIONS, HTTP_MAX_KEEPALIVE
+
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+# Clientes httpx compartidos por nombre: reutilizan conexiones (keep-alive/TLS) entre peticiones
+clients = {}
+
+
+def get_client(name: str, **kwargs) -> httpx.AsyncClient:
+    """
+    Devuelve el cliente `name`, creándolo con `kwargs` (headers, timeout, ...) la primera vez.
+    """
+    client = clients.get(name)
+    if client is None or client.is_closed:
+        limits = httpx.Limits(max_connections=HTTP_MAX_CONNECTIONS, max_keepalive_connections=HTTP_MAX_KEEPALIVE)
+        client = clients[name] = httpx.AsyncClient(limits=limits, **kwargs)
+    return client
+
+
+async def get_with_retries(client: httpx.AsyncClient, url: str, retries: int = 3, backoff: float = 1.0, **kwargs) -> httpx.Response:
+    """
+    GET con reintentos ante 429/5xx y errores de red (espera backoff * 2^intento,
+    o Retry-After si viene). Equivale al Retry(total=3, backoff_factor=1) de requests.
+    """
+    for attempt in range(retries + 1):
+        try:
+            response = await client.get(url, **kwargs)
+        except httpx.TransportError:
+            if attempt == retries:
+                raise
+        else:
+            if response.status_code not in RETRY_STATUSES or attempt == retries:
+                return response
+            retry_after = response.headers.get("retry-after", "")
+            if retry_after.isdigit():
+                await asyncio.sleep(min(float(retry_after), 30.0))
+                continue
+        await asyncio.sleep(backoff * 2 ** attempt)
+
+
+async def close_clients():
+    for client in clients.values():
+        await client.aclose()
+    clients.clear()
@@ -0,0 +1,238 @@
+import asyncio
+import hashlib
+import os
+import tempfile
+from collections import Counter, OrderedDict
+from fastapi import HTTPException, Request
+from fastapi.responses import FileResponse, Response
+from app.core.cache import load_once
+from app.core.store import KVStore
+from app.core.config import DATA_DIR, IMAGE_CACHE_MAX_BYTES, IMAGE_INDEX_TTL
+
+# Los blobs se guardan por digest de su contenido (DATA_DIR/images/ab/abcdef...) y un
+# índice persistente apunta de cada clave (URL de origen o variante) a su digest.
+IMAGE_DIR = os.path.join(DATA_DIR, "images")
+IMMUTABLE = "public, max-age=31536000, immutable"
+TMP_PREFIX = ".tmp-"
+
+image_index = KVStore("image_index", IMAGE_INDEX_TTL)
+# digest -> tamaño, del menos al más recientemente usado
+blobs = OrderedDict()
+# digest -> respuestas que lo están enviando; _evict no los borra
+pinned = Counter()
+image_cache_stats = {"hits": 0, "misses": 0, "evictions": 0, "bytes": 0}
+_loaded = False
+
+
+def blob_path(digest: str) -> str:
+    return os.path.join(IMAGE_DIR, digest[:2], digest)
+
+
+def _scan() -> list:
+    """
+    (mtime, digest, tamaño) de los blobs en disco; borra de paso los temporales que
+    haya dejado una escritura interrumpida. Corre en un hilo.
+    """
+    found = []
+    if os.path.isdir(IMAGE_DIR):
+        for sub in os.scandir(IMAGE_DIR):
+            if not sub.is_dir():
+                continue
+            for f in os.scandir(sub.path):
+                if f.name.startswith(TMP_PREFIX):
+                    os.unlink(f.path)
+                elif f.is_file():
+                    st = f.stat()
+                    found.append((st.st_mtime, f.name, st.st_size))
+    return found
+
+
+async def ensure_loaded():
+    """
+    Reconstruye el orden LRU desde disco (por mtime) la primera vez. El recorrido del
+    directorio va en un hilo; `blobs` solo se modifica desde el bucle de eventos.
+    """
+    if not _loaded:
+        await load_once("image_cache_load", _load)
+
+
+async def _load():
+    global _loaded
+    found = await asyncio.to_thread(_scan)
+    for _, digest, size in sorted(found):
+        blobs[digest] = size
+        image_cache_stats["bytes"] += size
+    _loaded = True
+
+
+def _forget(digest: str):
+    size = blobs.pop(digest, None)
+    if size is not None:
+        image_cache_stats["bytes"] -= size
+
+
+def _read_index(key: str):
+    # Lectura del índice y utime (el mtime conserva el orden LRU entre reinicios) en un solo viaje al hilo
+    meta = image_index.get(key)
+    if meta is None:
+        return None, False
+    try:
+        os.utime(blob_path(meta["digest"]))
+    except FileNotFoundError:
+        return meta, False
+    return meta, True
+
+
+async def lookup(key: str):
+    """
+    {"digest", "content_type", "size"} de `key` si su blob sigue en disco, o None.
+    """
+    await ensure_loaded()
+    meta, on_disk = await asyncio.to_thread(_read_index, key)
+    if meta is None:
+        return None
+    if not on_disk:
+        _forget(meta["digest"])
+        return None
+    if meta["digest"] not in blobs:
+        return None
+    blobs.move_to_end(meta["digest"])
+    return meta
+
+
+def _write_blob(path: str, content: bytes):
+    # Escritura atómica: temporal en el mismo directorio + rename
+    if os.path.exists(path):
+        return
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), prefix=TMP_PREFIX)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(content)
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.unlink(tmp)
+        raise
+
+
+def _evict() -> list:
+    """
+    Saca del LRU lo que sobra y devuelve las rutas a borrar (el borrado va en un hilo).
+    No toca los blobs que se están enviando.
+    """
+    excess = image_cache_stats["bytes"] - IMAGE_CACHE_MAX_BYTES
+    victims = []
+    for digest, size in blobs.items():
+        if excess <= 0 or len(blobs) - len(victims) <= 1:
+            break
+        if digest not in pinned:
+            victims.append(digest)
+            excess -= size
+    for digest in victims:
+        image_cache_stats["bytes"] -= blobs.pop(digest)
+        image_cache_stats["evictions"] += 1
+    return [blob_path(digest) for digest in victims]
+
+
+def _persist(key: str, meta: dict, evicted: list):
+    image_index.set(key, meta)
+    for path in evicted:
+        try:
+            os.unlink(path)
+        except FileNotFoundError:
+            pass
+
+
+async def store(key: str, content: bytes, content_type: str) -> dict:
+    await ensure_loaded()
+    digest = hashlib.blake2b(content, digest_size=16).hexdigest()
+    await asyncio.to_thread(_write_blob, blob_path(digest), content)
+    if digest not in blobs:
+        blobs[digest] = len(content)
+        image_cache_stats["bytes"] += len(content)
+    blobs.move_to_end(digest)
+    meta = {"digest": digest, "content_type": content_type, "size": len(content)}
+    await asyncio.to_thread(_persist, key, meta, _evict())
+    return meta
+
+
+async def cached_image(key: str, fetch) -> dict:
+    """
+    Metadatos de la imagen `key`, descargándola con fetch() -> (bytes, content_type)
+    solo si no está en disco. Descargas simultáneas de la misma clave se comparten.
+    """
+    meta = await lookup(key)
+    if meta is not None:
+        image_cache_stats["hits"] += 1
+        return meta
+    image_cache_stats["misses"] += 1
+
+    async def load():
+        content, content_type = await fetch()
+        return await store(key, content, content_type)
+
+    return await load_once(("image", key), load)
+
+
+def read_blob(digest: str) -> bytes:
+    with open(blob_path(digest), "rb") as f:
+        return f.read()
+
+
+def _unpin(digest: str):
+    pinned[digest] -= 1
+    if pinned[digest] <= 0:
+        del pinned[digest]
+
+
+class BlobResponse(FileResponse):
+    """
+    FileResponse de un blob fijado con `pinned`: se suelta al terminar de enviarse.
+    """
+
+    def __init__(self, digest: str, **kwargs):
+        super().__init__(blob_path(digest), **kwargs)
+        self.digest = digest
+
+    async def __call__(self, scope, receive, send):
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            _unpin(self.digest)
+
+
+async def image_response(request: Request, meta: dict, headers: dict = None, reload=None) -> Response:
+    """
+    304 si el cliente ya tiene esta versión; si no, el fichero vía FileResponse
+    (sendfile y Range). El digest del contenido hace de ETag fuerte. Si el blob se
+    expulsó después de buscarlo, reload() -> meta lo vuelve a cargar.
+    """
+    etag = f'"{meta["digest"]}"'
+    headers = {**(headers or {}), "ETag": etag, "Cache-Control": IMMUTABLE}
+    if_none_match = request.headers.get("if-none-match", "")
+    if if_none_match.strip() == "*" or etag in (t.strip().removeprefix("W/") for t in if_none_match.split(",")):
+        return Response(status_code=304, headers=headers)
+    for attempt in range(2):
+        digest = meta["digest"]
+        # Fijado antes de comprobar el disco: desde aquí ningún store() lo puede borrar
+        pinned[digest] += 1
+        try:
+            on_disk = await asyncio.to_thread(os.path.isfile, blob_path(digest))
+        except BaseException:
+            _unpin(digest)
+            raise
+        # Fuera de `blobs` el borrado ya está en marcha aunque el fichero siga ahí
+        if on_disk and digest in blobs:
+            headers["ETag"] = f'"{digest}"'
+            return BlobResponse(digest, media_type=meta["content_type"], headers=headers)
+        _unpin(digest)
+        _forget(digest)
+        if reload is None or attempt:
+            break
+        meta = await reload()
+    raise HTTPException(status_code=503, detail="La imagen salió de la caché; vuelve a pedirla")
+
+
+def get_image_cache_stats() -> dict:
+    return {**image_cache_stats, "blobs": len(blobs), "max_bytes": IMAGE_CACHE_MAX_BYTES}
@@ -0,0 +1,96 @@
+from fastapi import Request
+from fastapi.responses import Response, StreamingResponse
+from app.core.cache import dumps, get_cached_entry, set_cache, serialized_body
+from app.core.compression import negotiate_encoding, compress
+from app.core.config import COMPRESS_MIN_SIZE, NDJSON_CHUNK_SIZE
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+
+class JSONBytesResponse(Response):
+    """
+    Respuesta JSON serializada con orjson. Si el contenido ya son bytes
+    (p. ej. el cuerpo guardado en caché) se envía tal cual.
+    """
+    media_type = "application/json"
+
+    def render(self, content) -> bytes:
+        if isinstance(content, bytes):
+            return content
+        return dumps(content)
+
+
+def entry_response(request: Request, entry) -> JSONBytesResponse:
+    """
+    Responde con los bytes de una entrada de caché en la codificación que acepte el cliente.
+    La variante comprimida se calcula la primera vez y queda guardada en la entrada.
+    """
+    body = serialized_body(entry)
+    headers = {"Vary": "Accept-Encoding"}
+    encoding = negotiate_encoding(request.headers.get("accept-encoding", "")) if len(body) >= COMPRESS_MIN_SIZE else None
+    if encoding:
+        variants = entry["variants"]
+        if encoding not in variants:
+            variants[encoding] = compress(body, encoding, cached=True)
+        body = variants[encoding]
+        headers["Content-Encoding"] = encoding
+    return JSONBytesResponse(body, headers=headers)
+
+
+def cached_response(request: Request, key):
+    """
+    Respuesta directa con los bytes cacheados de `key`, o None si no hay entrada vigente.
+    """
+    entry = get_cached_entry(key)
+    return entry_response(request, entry) if entry else None
+
+
+def cache_response(request: Request, key, data):
+    """
+    Guarda `data` en caché y responde con sus bytes serializados (una sola serialización).
+    """
+    return entry_response(request, set_cache(key, data))
+
+
+def wants_ndjson(request: Request) -> bool:
+    return NDJSON_MEDIA_TYPE in request.headers.get("accept", "")
+
+
+def _ndjson_chunks(items):
+    buffer = bytearray()
+    first = True
+    for item in items:
+        buffer += dumps(item)
+        buffer += b"\n"
+        if first or len(buffer) >= NDJSON_CHUNK_SIZE:
+            yield bytes(buffer)
+            buffer.clear()
+            first = False
+    if buffer:
+        yield bytes(buffer)
+
+
+async def _ndjson_chunks_async(items):
+    buffer = bytearray()
+    first = True
+    async for item in items:
+        buffer += dumps(item)
+        buffer += b"\n"
+        if first or len(buffer) >= NDJSON_CHUNK_SIZE:
+            yield bytes(buffer)
+            buffer.clear()
+            first = False
+    if buffer:
+        yield bytes(buffer)
+
+
+def ndjson_response(items, headers: dict = None) -> StreamingResponse:
+    """
+    Una línea JSON por elemento, serializada a medida que se consume `items`
+    (iterable, generador o iterable asíncrono). Los generadores síncronos los
+    recorre Starlette en el threadpool, así que pueden parsear sobre la marcha.
+    """
+    chunks = _ndjson_chunks_async(items) if hasattr(items, "__aiter__") else _ndjson_chunks(items)
+    return StreamingResponse(
+        chunks, media_type=NDJSON_MEDIA_TYPE, headers={"Vary": "Accept, Accept-Encoding", **(headers or {})}
+    )
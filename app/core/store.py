@@ -0,0 +1,89 @@
+import os
+import sqlite3
+import threading
+import time
+import orjson
+from app.core.config import DATA_DIR
+
+
+class KVStore:
+    """
+    Almacén clave -> valor JSON persistente (SQLite en DATA_DIR) con un TTL común.
+    Pensado para datos que cambian muy poco y deben sobrevivir a reinicios;
+    la conexión se abre en el primer uso y es segura entre hilos.
+    """
+
+    def __init__(self, name: str, ttl: float):
+        self.name = name
+        self.ttl = ttl
+        self._conn = None
+        self._lock = threading.Lock()
+
+    def _db(self) -> sqlite3.Connection:
+        if self._conn is None:
+            os.makedirs(DATA_DIR, exist_ok=True)
+            conn = sqlite3.connect(os.path.join(DATA_DIR, f"{self.name}.sqlite3"), check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("CREATE TABLE IF NOT EXISTS kv (key TEXT PRIMARY KEY, value BLOB NOT NULL, updated REAL NOT NULL)")
+            self._conn = conn
+        return self._conn
+
+    def get(self, key: str):
+        return self.get_many([key]).get(key)
+
+    def get_many(self, keys: list) -> dict:
+        """
+        Valores vigentes de `keys` (las caducadas o ausentes no aparecen).
+        """
+        out = {}
+        min_updated = time.time() - self.ttl
+        with self._lock:
+            db = self._db()
+            # SQLite limita el número de parámetros por consulta
+            for i in range(0, len(keys), 500):
+                chunk = keys[i:i + 500]
+                rows = db.execute(
+                    f"SELECT key, value FROM kv WHERE updated >= ? AND key IN ({','.join('?' * len(chunk))})",
+                    (min_updated, *chunk),
+                )
+                for key, value in rows:
+                    out[key] = orjson.loads(value)
+        return out
+
+    def items(self) -> dict:
+        """
+        Todas las entradas vigentes (para reconstruir índices en memoria al arrancar).
+        """
+        with self._lock:
+            rows = self._db().execute("SELECT key, value FROM kv WHERE updated >= ?", (time.time() - self.ttl,)).fetchall()
+        return {key: orjson.loads(value) for key, value in rows}
+
+    def set(self, key: str, value):
+        self.set_many({key: value})
+
+    def set_many(self, items: dict):
+        now = time.time()
+        with self._lock:
+            db = self._db()
+            with db:
+                db.executemany(
+                    "INSERT OR REPLACE INTO kv (key, value, updated) VALUES (?, ?, ?)",
+                    [(key, orjson.dumps(value), now) for key, value in items.items()],
+                )
+
+    def delete(self, key: str):
+        with self._lock:
+            db = self._db()
+            with db:
+                db.execute("DELETE FROM kv WHERE key = ?", (key,))
+
+    def purge_expired(self) -> int:
+        with self._lock:
+            db = self._db()
+            with db:
+                return db.execute("DELETE FROM kv WHERE updated < ?", (time.time() - self.ttl,)).rowcount
+
+    def count(self) -> int:
+        with self._lock:
+            return self._db().execute("SELECT COUNT(*) FROM kv").fetchone()[0]
@@ -0,0 +1,259 @@
+"""
+Rastreo masivo para poblar los índices locales sin pasar por la API.
+
+Recorre el catálogo de animeav1 (y el detalle de cada anime) y la biblioteca de
+ZonaTMO (y el detalle de cada obra) con los mismos parsers que los endpoints, y
+guarda el resultado en el índice de /api/animes/search-local, la biblioteca de
+/api/mangas/library y la copia local de /api/mangas/detalle.
+
+El progreso se guarda en DATA_DIR/crawl.sqlite3 (una fila por página): si se
+interrumpe, la siguiente ejecución sigue con lo pendiente. --reset empieza de cero.
+
+Uso:
+    python -m app.crawl [--only anime,manga] [--no-details] [--max-pages N]
+                        [--concurrency 8] [--per-host 2] [--rate 4]
+"""
+import argparse
+import asyncio
+import os
+import sqlite3
+import sys
+import time
+from urllib.parse import urlsplit
+
+import httpx
+
+from app.core.config import (
+    BASE_URL, DATA_DIR, ZONATMO_HEADERS, CRAWL_CONCURRENCY, CRAWL_PER_HOST, CRAWL_HOST_RATE, CRAWL_MAX_ATTEMPTS
+)
+from app.core.http import close_clients, get_client, get_with_retries
+from app.routers.animes import catalog_query, catalog_url, parse_catalog, parse_media
+from app.routers.mangadetails import detail_mirror, parse_detail
+from app.routers.mangasearch import build_url, library_refresh, parse_search_cards
+from app.utils.animeindex import anime_index
+from app.utils.mangalibrary import manga_library
+from app.utils.scraping import animeav1_client
+
+KINDS = {"anime": ("anime_catalog", "anime_detail"), "manga": ("manga_library", "manga_detail")}
+
+
+class Checkpoint:
+    """
+    Páginas por rastrear en SQLite: (tipo, destino) -> pending | done | failed.
+    Marcar una página como hecha y añadir las que descubre va en la misma transacción.
+    """
+
+    def __init__(self, path: str):
+        self.db = sqlite3.connect(path)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS jobs (kind TEXT NOT NULL, target TEXT NOT NULL, state TEXT NOT NULL,"
+            " attempts INTEGER NOT NULL DEFAULT 0, updated REAL NOT NULL, PRIMARY KEY (kind, target))"
+        )
+        self.db.execute("CREATE INDEX IF NOT EXISTS jobs_state ON jobs(state, kind)")
+
+    def reset(self):
+        with self.db:
+            self.db.execute("DELETE FROM jobs")
+
+    def add(self, jobs):
+        with self.db:
+            self._add(jobs)
+
+    def _add(self, jobs):
+        # OR IGNORE: una página ya hecha o pendiente no se vuelve a encolar
+        self.db.executemany(
+            "INSERT OR IGNORE INTO jobs (kind, target, state, updated) VALUES (?, ?, 'pending', ?)",
+            [(kind, target, time.time()) for kind, target in jobs],
+        )
+
+    def pending(self, kinds, limit: int, exclude: set) -> list:
+        rows = self.db.execute(
+            f"SELECT kind, target FROM jobs WHERE state = 'pending' AND kind IN ({','.join('?' * len(kinds))})"
+            " ORDER BY rowid LIMIT ?",
+            (*kinds, limit + len(exclude)),
+        ).fetchall()
+        return [job for job in rows if job not in exclude][:limit]
+
+    def done(self, job, discovered):
+        with self.db:
+            self.db.execute("UPDATE jobs SET state = 'done', updated = ? WHERE kind = ? AND target = ?", (time.time(), *job))
+            self._add(discovered)
+
+    def failed(self, job) -> bool:
+        """
+        Suma un intento; True si se agotaron y la página queda como fallida.
+        """
+        with self.db:
+            self.db.execute(
+                "UPDATE jobs SET attempts = attempts + 1, updated = ?,"
+                " state = CASE WHEN attempts + 1 >= ? THEN 'failed' ELSE 'pending' END"
+                " WHERE kind = ? AND target = ?",
+                (time.time(), CRAWL_MAX_ATTEMPTS, *job),
+            )
+            return self.db.execute("SELECT state FROM jobs WHERE kind = ? AND target = ?", job).fetchone()[0] == "failed"
+
+    def counts(self) -> dict:
+        return dict(self.db.execute("SELECT state, COUNT(*) FROM jobs GROUP BY state").fetchall())
+
+
+class HostBudget:
+    """
+    Cortesía por host: como mucho `per_host` peticiones a la vez y `rate` por segundo.
+    """
+
+    def __init__(self, per_host: int, rate: float):
+        self.per_host = per_host
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self.semaphores = {}
+        self.next_slot = {}
+
+    async def __call__(self, url: str, fetch):
+        host = urlsplit(url).netloc
+        semaphore = self.semaphores.setdefault(host, asyncio.Semaphore(self.per_host))
+        async with semaphore:
+            now = time.monotonic()
+            slot = max(now, self.next_slot.get(host, now))
+            self.next_slot[host] = slot + self.interval
+            if slot > now:
+                await asyncio.sleep(slot - now)
+            return await fetch()
+
+
+class Crawler:
+    def __init__(self, args):
+        self.args = args
+        self.checkpoint = Checkpoint(os.path.join(DATA_DIR, "crawl.sqlite3"))
+        self.budget = HostBudget(args.per_host, args.rate)
+        self.kinds = [k for name in args.only for k in KINDS[name][: 1 if args.no_details else 2]]
+        self.query = catalog_query(None, None, None, None, None, None, None)
+        self.pages = 0
+        self.failures = 0
+
+    async def get(self, client: httpx.AsyncClient, url: str) -> str:
+        response = await self.budget(url, lambda: get_with_retries(client, url))
+        response.raise_for_status()
+        return response.text
+
+    def _next_pages(self, kind: str, page: int, last: int):
+        if self.args.max_pages:
+            last = min(last, self.args.max_pages)
+        return [(kind, str(n)) for n in range(page + 1, last + 1)]
+
+    # Cada tipo de página devuelve las páginas nuevas que descubre
+    async def anime_catalog(self, target: str) -> list:
+        page = int(target)
+        url = catalog_url(self.query, page)
+        catalog = await asyncio.to_thread(parse_catalog, await self.get(animeav1_client(), url), url, page)
+        if "error" in catalog:
+            raise ValueError(catalog["error"])
+        await asyncio.to_thread(anime_index.index_catalog, catalog["animes"], self.query)
+        found = [("anime_detail", a["slug"]) for a in catalog["animes"] if a.get("slug")]
+        # La primera página da el total; el resto se encola de golpe
+        if page == 1:
+            found += self._next_pages("anime_catalog", 1, catalog["total_pages"])
+        return found
+
+    async def anime_detail(self, slug: str) -> list:
+        html = await self.get(animeav1_client(), f"{BASE_URL}/media/{slug}")
+        media = await asyncio.to_thread(parse_media, html, slug)
+        if "error" in media:
+            raise ValueError(media["error"])
+        await asyncio.to_thread(anime_index.index_detail, media)
+        return []
+
+    async def manga_library(self, target: str) -> list:
+        page = int(target)
+        url = build_url(None, None, None, None, None, None, None, None, None, None, None, None, None, page, "title")
+        cards = await asyncio.to_thread(parse_search_cards, await self.get(zonatmo_client(), url))
+        if not cards:
+            return []
+        await manga_library.add([c.model_dump() for c in cards], {})
+        await asyncio.to_thread(library_refresh.set, url, time.time())
+        found = [("manga_detail", c.url) for c in cards if c.url.startswith("http")]
+        # La biblioteca no dice cuántas páginas hay: se sigue mientras haya tarjetas
+        return found + self._next_pages("manga_library", page, page + 1)
+
+    async def manga_detail(self, url: str) -> list:
+        data = await asyncio.to_thread(parse_detail, await self.get(zonatmo_client(), url), url)
+        await asyncio.to_thread(detail_mirror.set, url, data)
+        return []
+
+    async def run_job(self, job):
+        kind, target = job
+        try:
+            discovered = await getattr(self, kind)(target)
+        except Exception as e:
+            # Cualquier fallo (red, HTTP, parseo) cuenta como intento; el rastreo sigue
+            if self.checkpoint.failed(job):
+                self.failures += 1
+                print(f"[WARN] {kind} {target}: {e}", file=sys.stderr)
+            return
+        self.checkpoint.done(job, [j for j in discovered if j[0] in self.kinds])
+        self.pages += 1
+
+    async def run(self):
+        if self.args.reset:
+            self.checkpoint.reset()
+        self.checkpoint.add([(kind, "1") for kind in self.kinds if kind in ("anime_catalog", "manga_library")])
+
+        start = last_report = time.monotonic()
+        running = {}
+        while True:
+            free = self.args.concurrency - len(running)
+            if free > 0:
+                for job in self.checkpoint.pending(self.kinds, free, set(running)):
+                    running[job] = asyncio.create_task(self.run_job(job))
+            if not running:
+                break
+            done, _ = await asyncio.wait(running.values(), timeout=1.0, return_when=asyncio.FIRST_COMPLETED)
+            for job in [j for j, t in running.items() if t in done]:
+                running.pop(job).result()
+            if time.monotonic() - last_report >= self.args.report_every:
+                last_report = time.monotonic()
+                self.report(start)
+        self.report(start)
+
+    def report(self, start: float):
+        elapsed = time.monotonic() - start
+        counts = self.checkpoint.counts()
+        print(
+            f"{self.pages} páginas en {elapsed:.1f}s ({self.pages / elapsed if elapsed else 0:.1f} páginas/s) | "
+            f"pendientes {counts.get('pending', 0)} | hechas {counts.get('done', 0)} | fallidas {counts.get('failed', 0)}",
+            flush=True,
+        )
+
+
+def zonatmo_client() -> httpx.AsyncClient:
+    # Los detalles de obra redirigen a veces: aquí sí se siguen (al revés que en mangadetails)
+    return get_client("crawl_zonatmo", headers=ZONATMO_HEADERS, timeout=20.0, follow_redirects=True)
+
+
+async def main_async(args) -> int:
+    os.makedirs(DATA_DIR, exist_ok=True)
+    crawler = Crawler(args)
+    if "manga_library" in crawler.kinds:
+        await asyncio.to_thread(manga_library.load)
+    try:
+        await crawler.run()
+    finally:
+        await close_clients()
+    return 1 if crawler.failures else 0
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--only", default="anime,manga", type=lambda v: [s for s in v.split(",") if s in KINDS],
+                        help="anime, manga o ambos separados por coma")
+    parser.add_argument("--no-details", action="store_true", help="Solo listados, sin páginas de detalle")
+    parser.add_argument("--max-pages", type=int, default=0, help="Límite de páginas de catálogo/biblioteca (0 = todas)")
+    parser.add_argument("--concurrency", type=int, default=CRAWL_CONCURRENCY)
+    parser.add_argument("--per-host", type=int, default=CRAWL_PER_HOST)
+    parser.add_argument("--rate", type=float, default=CRAWL_HOST_RATE, help="Peticiones por segundo por host")
+    parser.add_argument("--report-every", type=float, default=5.0, help="Segundos entre informes de progreso")
+    parser.add_argument("--reset", action="store_true", help="Olvidar el progreso guardado y empezar de cero")
+    return asyncio.run(main_async(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
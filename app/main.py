@@ -1,7 +1,29 @@
+import asyncio
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
-from app.routers import animefilters, animes, animeschedule, mangas, mangadetails, mangaimages, mangasearch, mangafilters
+from app.core.compression import CompressionMiddleware
+from app.core.http import close_clients
+from app.core.imagecache import ensure_loaded
+from app.core.responses import JSONBytesResponse
+from app.utils.imaging import shutdown_pool
+from app.utils.imagemeta import stop_image_meta
+from app.utils.mangalibrary import manga_library
+from app.routers import animefilters, animes, events, images, animeschedule, mangas, mangadetails, mangaimages, mangasearch, mangafilters, stats
 
-app = FastAPI(title="Anime & Manga API")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # La biblioteca local de mangas se lee entera del disco antes de aceptar peticiones
+    await asyncio.to_thread(manga_library.load)
+    # Y el LRU de la caché de imágenes, para que /api/stats cuente lo que ya hay en disco
+    await ensure_loaded()
+    yield
+    events.stop_events()
+    stop_image_meta()
+    await close_clients()
+    shutdown_pool()
+
+app = FastAPI(title="Anime & Manga API", default_response_class=JSONBytesResponse, lifespan=lifespan)
+app.add_middleware(CompressionMiddleware)
 
 # Registrar routers
 app.include_router(animes.router, prefix="/api/animes", tags=["Animes"])
@@ -12,6 +34,9 @@ app.include_router(mangadetails.router, prefix="/api/mangas", tags=["Manga Detai
 app.include_router(mangaimages.router, prefix="/api/mangas", tags=["Manga Images"])
 app.include_router(mangasearch.router, prefix="/api/mangas", tags=["Manga Search"])
 app.include_router(mangafilters.router, prefix="/api/mangas", tags=["Manga Filters"])
+app.include_router(images.router, prefix="/api/images", tags=["Images"])
+app.include_router(events.router, prefix="/api", tags=["Events"])
+app.include_router(stats.router, prefix="/api", tags=["Stats"])
 
 if __name__ == "__main__":
     import uvicorn
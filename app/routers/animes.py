@@ -1,21 +1,192 @@
-from fastapi import APIRouter, Query, HTTPException
+from fastapi import APIRouter, Query, HTTPException, Request
 from bs4 import BeautifulSoup
-import re, json, demjson3, asyncio, requests
-from app.utils.scraping import fetch_html, find_sveltekit_script, extract_js_object, extract_home_block
+from pydantic import BaseModel
+from typing import List
+import re, json, demjson3, asyncio, httpx
+from app.utils.scraping import animeav1_client, fetch_html, find_sveltekit_script, extract_js_object, extract_home_block
 from app.utils.builders import (
     build_poster_url, build_backdrop_url,
     build_episode_image_url, build_episode_url,
     build_featured_image_url, build_latest_episode_image_url,
     build_latest_media_image_url, build_watch_url
 )
-from app.core.cache import get_cached, set_cache
-from app.core.config import BASE_URL, VALID_CATEGORIES, VALID_GENRES, VALID_STATUS, VALID_ORDERS, VALID_LETTERS
+from app.core.cache import cache, memo_parse, memo_parse_in_thread, get_cached_entry, set_cache, load_once, prefetch
+from app.utils.changes import anime_episodes, anime_media, invalidate_keys
+from app.core.responses import (
+    JSONBytesResponse, entry_response, wants_ndjson, ndjson_response
+)
+from app.utils.animeindex import LOCAL_ORDERS, anime_index, media_status
+from app.utils.imagemeta import wants_image_meta, with_image_meta, with_image_meta_stream, image_meta_response
+from app.utils.pagination import is_paged, check_order, parse_fields, project, paginate
+from app.utils.batch import check_batch, gather_entries, batch_body
+from app.core.config import BASE_URL, FINISHED_CACHE_TTL, CATALOG_CONCURRENCY, VALID_CATEGORIES, VALID_GENRES, VALID_STATUS, VALID_ORDERS, VALID_LETTERS
 
 router = APIRouter()
 
 # -------------------- /animes --------------------
+def catalog_query(category, genre, min_year, max_year, status, order, letter) -> dict:
+    """
+    Filtros en forma canónica: listas ordenadas y sin repetir, orden por defecto
+    explícito y letra en mayúscula. Consultas equivalentes dan la misma URL y clave de caché.
+    """
+    return {
+        "category": sorted(set(category or [])),
+        "genre": sorted(set(genre or [])),
+        "min_year": min_year,
+        "max_year": max_year,
+        "status": status,
+        "order": order or "predeterminado",
+        "letter": letter.upper() if letter else None,
+    }
+
+def catalog_url(query: dict, page: int) -> str:
+    base_url = f"{BASE_URL}/catalogo"
+    params = []
+    for cat in query["category"]:
+        params.append(f"category={cat}")
+    for g in query["genre"]:
+        params.append(f"genre={g}")
+    if query["min_year"]:
+        params.append(f"minYear={query['min_year']}")
+    if query["max_year"]:
+        params.append(f"maxYear={query['max_year']}")
+    if query["status"]:
+        params.append(f"status={query['status']}")
+    params.append(f"order={query['order']}")
+    if query["letter"]:
+        params.append(f"letter={query['letter']}")
+    params.append(f"page={page}")
+
+    return base_url + "?" + "&".join(params)
+
+def parse_pages(pages: str):
+    """
+    "all" -> (1, None); "N-M" -> (N, M); "N" -> (N, N).
+    """
+    if pages == "all":
+        return 1, None
+    m = re.fullmatch(r"(\d+)(?:-(\d+))?", pages)
+    if not m:
+        raise HTTPException(status_code=400, detail="Pages inválido. Formato: all | N-M")
+    start = int(m.group(1))
+    end = int(m.group(2)) if m.group(2) else start
+    if start < 1 or end < start:
+        raise HTTPException(status_code=400, detail="Pages inválido. Formato: all | N-M")
+    return start, end
+
+async def fetch_catalog(url: str, page: int) -> dict:
+    response = await animeav1_client().get(url)
+    if response.status_code != 200:
+        return {"error": "Failed to fetch the page", "url": url}
+    return await asyncio.to_thread(parse_catalog, response.text, url, page)
+
+def catalog_cache_key(url: str) -> str:
+    return f"catalogo_{url}"
+
+async def fetch_catalog_entry(url: str, page: int, query: dict) -> dict:
+    catalog = await fetch_catalog(url, page)
+    if "error" in catalog:
+        return catalog
+    # Escrituras de SQLite/FTS fuera del bucle de eventos
+    await asyncio.to_thread(anime_index.index_catalog, catalog["animes"], query)
+    return set_cache(catalog_cache_key(url), catalog)
+
+async def load_catalog(query: dict, page: int, force_refresh: bool = False) -> dict:
+    """
+    Entrada de caché de una página del catálogo (clave = URL canónica), o el dict
+    {"error": ...} sin cachear. Las cargas simultáneas de la misma página se comparten.
+    """
+    url = catalog_url(query, page)
+    key = catalog_cache_key(url)
+    entry = None if force_refresh else get_cached_entry(key)
+    if entry is not None:
+        return entry
+    return await load_once(key, lambda: fetch_catalog_entry(url, page, query))
+
+def prefetch_catalog(query: dict, catalog: dict):
+    next_page = catalog["page"] + 1
+    if next_page <= catalog["total_pages"]:
+        url = catalog_url(query, next_page)
+        prefetch(catalog_cache_key(url), lambda: fetch_catalog_entry(url, next_page, query))
+
+async def fetch_catalog_pages(query: dict, pages, force_refresh: bool = False):
+    """
+    Carga `pages` con CATALOG_CONCURRENCY peticiones a la vez (las cacheadas no descargan)
+    y va devolviendo (página, catálogo) según terminan. Si el consumidor deja de leer
+    (p. ej. el cliente corta el streaming) se cancelan las descargas pendientes.
+    """
+    semaphore = asyncio.Semaphore(CATALOG_CONCURRENCY)
+
+    async def one(page):
+        async with semaphore:
+            try:
+                entry = await load_catalog(query, page, force_refresh)
+            except httpx.HTTPError as e:
+                return page, {"error": f"Failed to fetch the page: {e}", "url": catalog_url(query, page)}
+            return page, entry if "error" in entry else entry["data"]
+
+    tasks = [asyncio.create_task(one(page)) for page in pages]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            yield await next_done
+    finally:
+        for task in tasks:
+            task.cancel()
+
+async def stream_catalog_pages(first: dict, rest):
+    """
+    Animes de la primera página y, después, de cada página según llega, sin repetir id.
+    """
+    seen = set()
+    async def fresh(animes):
+        for anime in animes:
+            anime_id = anime.get("id")
+            if anime_id in seen:
+                continue
+            seen.add(anime_id)
+            yield anime
+
+    async for anime in fresh(first["animes"]):
+        yield anime
+    async for page, catalog in rest:
+        if "error" in catalog:
+            print(f"[WARN] Página {page} del catálogo: {catalog['error']}")
+            continue
+        async for anime in fresh(catalog["animes"]):
+            yield anime
+
+async def merge_catalog_pages(first: dict, rest, start: int, last: int) -> dict:
+    """
+    Une todas las páginas en orden de página y quita los animes repetidos por id.
+    """
+    catalogs = {start: first}
+    errors = {}
+    async for page, catalog in rest:
+        if "error" in catalog:
+            errors[page] = catalog["error"]
+        else:
+            catalogs[page] = catalog
+
+    animes, seen = [], set()
+    for page in sorted(catalogs):
+        for anime in catalogs[page]["animes"]:
+            anime_id = anime.get("id")
+            if anime_id not in seen:
+                seen.add(anime_id)
+                animes.append(anime)
+
+    return {
+        "url": first["url"],
+        "pages": f"{start}-{last}",
+        "total_results": first["total_results"],
+        "total_pages": first["total_pages"],
+        "animes": animes,
+        "errors": errors,
+    }
+
 @router.get("")
-def get_animes(
+async def get_animes(
+    request: Request,
     category: list[str] = Query(None),
     genre: list[str] = Query(None),
     min_year: int = None,
@@ -23,7 +194,10 @@ def get_animes(
     status: str = None,
     order: str = "predeterminado",
     letter: str = None,
-    page: int = 1
+    page: int = 1,
+    pages: str = Query(None, description="all | N-M: varias páginas a la vez (ignora page)"),
+    include: str = Query(None, description="image_meta: añade tamaño, color medio y LQIP de cada imagen"),
+    force_refresh: bool = Query(False)
 ):
     if category and not all(c in VALID_CATEGORIES for c in category):
         raise HTTPException(status_code=400, detail=f"Category inválida. Opciones: {VALID_CATEGORIES}")
@@ -38,50 +212,45 @@ def get_animes(
     if min_year and max_year and min_year > max_year:
         raise HTTPException(status_code=400, detail="min_year no puede ser mayor que max_year")
 
-    base_url = f"{BASE_URL}/catalogo"
-    params = []
-    if category:
-        for cat in category:
-            params.append(f"category={cat}")
-    if genre:
-        for g in genre:
-            params.append(f"genre={g}")
-    if min_year:
-        params.append(f"minYear={min_year}")
-    if max_year:
-        params.append(f"maxYear={max_year}")
-    if status:
-        params.append(f"status={status}")
-    if order:
-        params.append(f"order={order}")
-    if letter:
-        params.append(f"letter={letter.upper()}")
-    params.append(f"page={page}")
-
-    url = base_url + "?" + "&".join(params) if params else base_url
-    response = requests.get(url)
-    if response.status_code != 200:
-        return {"error": "Failed to fetch the page", "url": url}
-
-    soup = BeautifulSoup(response.text, "html.parser")
-
-    scripts = soup.find_all("script")
-    data_script = None
-    for script in scripts:
-        if script.string and "__sveltekit_" in script.string:
-            data_script = script.string
-            break
-
-    if not data_script:
-        return {"error": "Data script not found", "url": url}
-
-    results_match = re.search(r"results:\s*\[([\s\S]*?)\]\s*}", data_script)
-    if not results_match:
-        return {"error": "Results not found in script", "url": url}
+    query = catalog_query(category, genre, min_year, max_year, status, order, letter)
+    ndjson = wants_ndjson(request)
+    meta = wants_image_meta(include)
+    if not pages:
+        entry = await load_catalog(query, page, force_refresh)
+        if "error" in entry:
+            return entry
+        catalog = entry["data"]
+        prefetch_catalog(query, catalog)
+        if not ndjson:
+            return await image_meta_response(catalog) if meta else entry_response(request, entry)
+        animes = (await with_image_meta(catalog["animes"]))[0] if meta else catalog["animes"]
+        return ndjson_response(animes, headers={
+            "X-Total-Results": str(catalog["total_results"]),
+            "X-Total-Pages": str(catalog["total_pages"]),
+        })
+
+    # Varias páginas: la primera da total_pages y el resto se pide en paralelo
+    start, end = parse_pages(pages)
+    first = await load_catalog(query, start, force_refresh)
+    if "error" in first:
+        return first
+    first = first["data"]
+    last = first["total_pages"] if end is None else min(end, first["total_pages"])
+    rest = fetch_catalog_pages(query, range(start + 1, last + 1), force_refresh)
+    if ndjson:
+        animes = stream_catalog_pages(first, rest)
+        return ndjson_response(with_image_meta_stream(animes) if meta else animes, headers={
+            "X-Total-Results": str(first["total_results"]),
+            "X-Total-Pages": str(first["total_pages"]),
+        })
+    merged = await merge_catalog_pages(first, rest, start, last)
+    return await image_meta_response(merged) if meta else JSONBytesResponse(merged)
+
+def iter_catalog_animes(data_script: str, results_str: str):
+    category_match = re.search(r'a\.name="([^"]+)"', data_script)
+    category_name = category_match.group(1) if category_match else "Unknown"
 
-    results_str = results_match.group(1)
     anime_strs = re.split(r"\}\s*,\s*\{", results_str)
-    animes = []
     for i, anime_str in enumerate(anime_strs):
         if i > 0:
             anime_str = "{" + anime_str
@@ -108,8 +277,6 @@ def get_animes(
         if slug_match:
             anime_dict["slug"] = slug_match.group(1)
 
-        category_match = re.search(r'a\.name="([^"]+)"', data_script)
-        category_name = category_match.group(1) if category_match else "Unknown"
         anime_dict["category"] = {
             "id": anime_dict.get("categoryId"),
             "name": category_name,
@@ -117,7 +284,26 @@ def get_animes(
         }
 
         if anime_dict:
-            animes.append(anime_dict)
+            yield anime_dict
+
+def parse_catalog(html: str, url: str, page: int) -> dict:
+    soup = BeautifulSoup(html, "html.parser")
+
+    scripts = soup.find_all("script")
+    data_script = None
+    for script in scripts:
+        if script.string and "__sveltekit_" in script.string:
+            data_script = script.string
+            break
+
+    if not data_script:
+        return {"error": "Data script not found", "url": url}
+
+    results_match = re.search(r"results:\s*\[([\s\S]*?)\]\s*}", data_script)
+    if not results_match:
+        return {"error": "Results not found in script", "url": url}
+
+    animes = list(iter_catalog_animes(data_script, results_match.group(1)))
 
     total_results = len(animes)
     results_elem = soup.find(string=re.compile(r"\d+ Resultados"))
@@ -140,15 +326,55 @@ def get_animes(
         "animes": animes,
     }
 
-# -------------------- /home --------------------
-@router.get("/home")
-async def get_home_data(force_refresh: bool = Query(False)):
-    if not force_refresh:
-        cached = get_cached("home_data")
-        if cached:
-            return cached
+# -------------------- /search-local --------------------
+# Registrada antes de /{slug}: si no, "search-local" se tomaría por un slug
+@router.get("/search-local", summary="Búsqueda en el índice local del catálogo (sin pedir nada a animeav1)")
+async def search_local(
+    request: Request,
+    q: str = Query(None, description="Texto en título o sinopsis (subcadena; si no hay coincidencias, aproximada)"),
+    genre: list[str] = Query(None),
+    category: list[str] = Query(None),
+    status: str = None,
+    min_year: int = None,
+    max_year: int = None,
+    order: str = Query(None, description=f"{' | '.join(LOCAL_ORDERS)} (por defecto relevance con q, title sin q)"),
+    offset: int = Query(0, ge=0),
+    limit: int = Query(20, ge=1, le=100),
+):
+    """
+    El índice se alimenta de cada página de catálogo y cada detalle descargados, así que
+    solo contiene lo ya visto. Cada resultado indica cuándo se actualizó (`updated`,
+    `detail_updated`) y hace cuántos segundos (`age`). Estado, categoría y año se conocen
+    si el anime apareció en una consulta de catálogo filtrada por ellos (o en su detalle).
+    """
+    if category and not all(c in VALID_CATEGORIES for c in category):
+        raise HTTPException(status_code=400, detail=f"Category inválida. Opciones: {VALID_CATEGORIES}")
+    if genre and not all(g in VALID_GENRES for g in genre):
+        raise HTTPException(status_code=400, detail=f"Genre inválido. Opciones: {VALID_GENRES}")
+    if status and status not in VALID_STATUS:
+        raise HTTPException(status_code=400, detail=f"Status inválido. Opciones: {VALID_STATUS}")
+    if order and order not in LOCAL_ORDERS:
+        raise HTTPException(status_code=400, detail=f"Order inválido. Opciones: {LOCAL_ORDERS}")
+    if min_year and max_year and min_year > max_year:
+        raise HTTPException(status_code=400, detail="min_year no puede ser mayor que max_year")
 
-    html = await fetch_html(BASE_URL)
+    q = q.strip() if q else None
+    found = await asyncio.to_thread(
+        anime_index.search, q, sorted(set(genre or [])), sorted(set(category or [])),
+        status, min_year, max_year, order, offset, limit,
+    )
+    if wants_ndjson(request):
+        return ndjson_response(found["results"], headers={"X-Total-Results": str(found["total"])})
+    return JSONBytesResponse({
+        "total": found["total"],
+        "offset": offset,
+        "limit": limit,
+        "fuzzy": found["fuzzy"],
+        "results": found["results"],
+    })
+
+# -------------------- /home --------------------
+def parse_home(html: str) -> dict:
     soup = BeautifulSoup(html, "html.parser")
     script_tag = find_sveltekit_script(soup)
     result = {"featured": [], "latestEpisodes": [], "latestMedia": []}
@@ -182,24 +408,36 @@ async def get_home_data(force_refresh: bool = Query(False)):
                 item["image_url"] = build_latest_media_image_url(anime_id)
                 item["watch_url"] = build_watch_url(slug)
                 result["latestMedia"].append(item)
-
-            set_cache("home_data", result)
-            return result
         except Exception as e:
             print(f"[WARN] Fallback a scraping: {e}")
 
-    set_cache("home_data", result)
     return result
 
-# -------------------- /{slug} --------------------
-@router.get("/{slug}")
-async def get_anime_details(slug: str, force_refresh: bool = Query(False)):
-    if not force_refresh:
-        cached = get_cached(slug)
-        if cached:
-            return cached
+async def fetch_home_entry() -> dict:
+    """
+    Descarga y parsea la portada, la guarda en caché y pasa sus listas al detector de novedades.
+    """
+    html = await fetch_html(BASE_URL)
+    entry = set_cache("home_data", memo_parse("/api/animes/home", parse_home, html))
+    anime_episodes.update(entry["data"]["latestEpisodes"])
+    anime_media.update(entry["data"]["latestMedia"])
+    return entry
 
-    html = await fetch_html(f"{BASE_URL}/media/{slug}")
+@router.get("/home")
+async def get_home_data(
+    request: Request,
+    include: str = Query(None, description="image_meta: añade tamaño, color medio y LQIP de cada imagen"),
+    force_refresh: bool = Query(False)
+):
+    entry = None if force_refresh else get_cached_entry("home_data")
+    if entry is None:
+        entry = await fetch_home_entry()
+    if wants_image_meta(include):
+        return await image_meta_response(entry["data"])
+    return entry_response(request, entry)
+
+# -------------------- /{slug} --------------------
+def parse_media(html: str, slug: str) -> dict:
     soup = BeautifulSoup(html, "html.parser")
     script_tag = find_sveltekit_script(soup)
     if not script_tag:
@@ -228,21 +466,107 @@ async def get_anime_details(slug: str, force_refresh: bool = Query(False)):
         "backdrop": build_backdrop_url(anime_id),
         "episodes": episodes
     })
-
-    set_cache(slug, media_data)
     return media_data
 
-# -------------------- /{slug}/{number} --------------------
-@router.get("/{slug}/{number}")
-async def get_episode(slug: str, number: int, force_refresh: bool = Query(False)):
-    cache_key = f"{slug}_ep_{number}"
-    if not force_refresh:
-        cached = get_cached(cache_key)
-        if cached:
-            return cached
+EPISODE_FIELDS = ["number", "image", "url"]
+
+def page_media(media_data: dict, offset: int, limit: int, order: str, fields: list) -> dict:
+    """
+    Copia superficial del detalle con solo el trozo pedido de episodios (order por número).
+    """
+    episodes, pagination = paginate(media_data.get("episodes", []), offset, limit, order, key=lambda ep: ep["number"])
+    return {**media_data, "episodes": [project(ep, fields) for ep in episodes], "pagination": pagination}
 
-    url = f"{BASE_URL}/media/{slug}/{number}"
-    html = await fetch_html(url)
+async def fetch_media_entry(slug: str) -> dict:
+    """
+    Descarga y parsea el detalle de `slug` y lo guarda en caché.
+    Devuelve la entrada de caché, o el dict {"error": ...} del parser sin cachearlo.
+    """
+    html = await fetch_html(f"{BASE_URL}/media/{slug}")
+    # demjson3 tarda en páginas grandes: el parseo va a un hilo (como fetch_catalog)
+    media_data = await memo_parse_in_thread("/api/animes/{slug}", parse_media, html, slug)
+    if "error" in media_data:
+        return media_data
+    await asyncio.to_thread(anime_index.index_detail, media_data)
+    return set_cache(slug, media_data, ttl=await media_ttl(slug, media_data))
+
+async def media_ttl(slug: str, media_data: dict = None):
+    """
+    Los animes finalizados no cambian: su detalle y episodios aguantan FINISHED_CACHE_TTL.
+    Si aun así aparece un episodio nuevo en la portada, on_new_episodes los invalida.
+    El estado sale del detalle (el pasado o el que haya en caché, aunque haya vencido)
+    y, si no hay ninguno, del índice local.
+    """
+    if media_data is None and slug in cache:
+        media_data = cache[slug]["data"]
+    status = media_status(media_data) if media_data is not None else None
+    if status is None:
+        status = await asyncio.to_thread(anime_index.status_of, slug)
+    return FINISHED_CACHE_TTL if status == "finalizado" else None
+
+@anime_episodes.subscribe
+def on_new_episodes(episodes: list):
+    for ep in episodes:
+        slug = ep["media"]["slug"]
+        invalidate_keys([slug, f"{slug}_ep_{ep.get('number')}"], slug, lambda slug=slug: fetch_media_entry(slug))
+
+@anime_media.subscribe
+def on_new_media(items: list):
+    for item in items:
+        slug = item["slug"]
+        invalidate_keys([slug], slug, lambda slug=slug: fetch_media_entry(slug))
+
+@router.get("/{slug}")
+async def get_anime_details(
+    request: Request,
+    slug: str,
+    force_refresh: bool = Query(False),
+    offset: int = Query(0, ge=0),
+    limit: int = Query(None, ge=1),
+    order: str = Query(None, description="asc | desc (por número de episodio)"),
+    fields: str = Query(None, description=f"Campos de cada episodio separados por coma: {','.join(EPISODE_FIELDS)}")
+):
+    paged = is_paged(offset, limit, order, fields)
+    check_order(order)
+    selected = parse_fields(fields, EPISODE_FIELDS)
+    entry = None if force_refresh else get_cached_entry(slug)
+    if entry is None:
+        entry = await fetch_media_entry(slug)
+        if "error" in entry:
+            return entry
+
+    media_data = entry["data"]
+    if wants_ndjson(request):
+        # Solo la lista de episodios, un episodio por línea
+        page = page_media(media_data, offset, limit, order, selected)
+        return ndjson_response(page["episodes"], headers={"X-Total-Count": str(page["pagination"]["total"])})
+    if paged:
+        return JSONBytesResponse(page_media(media_data, offset, limit, order, selected))
+    return entry_response(request, entry)
+
+# -------------------- /batch --------------------
+class AnimeBatchRequest(BaseModel):
+    slugs: List[str]
+
+@router.post("/batch")
+async def get_animes_batch(body: AnimeBatchRequest, force_refresh: bool = Query(False)):
+    """
+    Detalle de varios animes en una sola petición. Los que no están en caché se
+    descargan en paralelo (acotado); los fallos se devuelven por slug en "errors".
+    """
+    slugs = check_batch(body.slugs, "slugs")
+
+    async def load(slug: str) -> dict:
+        entry = await fetch_media_entry(slug)
+        if "error" in entry:
+            raise HTTPException(status_code=502, detail=entry["error"])
+        return entry
+
+    entries, errors = await gather_entries(slugs, load, lookup=None if force_refresh else get_cached_entry)
+    return JSONBytesResponse(batch_body(slugs, entries, errors))
+
+# -------------------- /{slug}/{number} --------------------
+def parse_episode(html: str) -> dict:
     soup = BeautifulSoup(html, "html.parser")
     script_text = find_sveltekit_script(soup)
     if not script_text:
@@ -328,10 +652,47 @@ async def get_episode(slug: str, number: int, force_refresh: bool = Query(False)
             "downloads": downloads,
         }
 
-        set_cache(cache_key, result)
         return result
 
     except HTTPException:
         raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error al parsear episodio: {e}")
+
+SERVER_FIELDS = ["server", "url", "variant"]
+
+def page_episode(result: dict, offset: int, limit: int, order: str, fields: list) -> dict:
+    """
+    Aplica el mismo offset/limit/order (orden original o invertido) a embeds y downloads.
+    """
+    out = {**result, "pagination": {}}
+    for section in ("embeds", "downloads"):
+        items, out["pagination"][section] = paginate(result.get(section, []), offset, limit, order)
+        out[section] = [project(it, fields) for it in items]
+    return out
+
+@router.get("/{slug}/{number}")
+async def get_episode(
+    request: Request,
+    slug: str,
+    number: int,
+    force_refresh: bool = Query(False),
+    offset: int = Query(0, ge=0),
+    limit: int = Query(None, ge=1),
+    order: str = Query(None, description="asc | desc (orden de la página o invertido)"),
+    fields: str = Query(None, description=f"Campos de cada servidor separados por coma: {','.join(SERVER_FIELDS)}")
+):
+    cache_key = f"{slug}_ep_{number}"
+    paged = is_paged(offset, limit, order, fields)
+    check_order(order)
+    selected = parse_fields(fields, SERVER_FIELDS)
+    entry = None if force_refresh else get_cached_entry(cache_key)
+    if entry is None:
+        url = f"{BASE_URL}/media/{slug}/{number}"
+        html = await fetch_html(url)
+        result = memo_parse("/api/animes/{slug}/{number}", parse_episode, html)
+        entry = set_cache(cache_key, result, ttl=await media_ttl(slug))
+
+    if paged:
+        return JSONBytesResponse(page_episode(entry["data"], offset, limit, order, selected))
+    return entry_response(request, entry)
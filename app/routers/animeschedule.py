@@ -1,18 +1,19 @@
-from fastapi import APIRouter, Query
+from fastapi import APIRouter, Query, Request
 from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.support.ui import WebDriverWait
 from bs4 import BeautifulSoup
 import asyncio, re, json
-from app.core.cache import get_cached, set_cache
+from app.core.cache import memo_parse, get_cached_entry, set_cache
+from app.core.responses import entry_response, wants_ndjson, ndjson_response
 from app.core.config import BASE_URL
 from app.utils.scraping import fetch_html
+from app.utils.imagemeta import wants_image_meta, with_image_meta, image_meta_response
 
 router = APIRouter()
 
-async def fetch_media():
-    html = await fetch_html(f"{BASE_URL}/horario")
+def parse_schedule_media(html: str) -> list:
     m = re.search(r'media\s*:\s*\[', html)
     start = html.find("[", m.start())
     depth, end = 0, None
@@ -29,6 +30,10 @@ async def fetch_media():
     media_json = media_json.replace("undefined", "null")
     return json.loads(re.sub(r',\s*(\]|})', r'\1', media_json))
 
+async def fetch_media():
+    html = await fetch_html(f"{BASE_URL}/horario")
+    return memo_parse("/api/horario", parse_schedule_media, html)
+
 def scrape_schedule_all_days():
     options = Options()
     options.add_argument("--headless=new")
@@ -74,23 +79,25 @@ def scrape_schedule_all_days():
         driver.quit()
 
 @router.get("/horario")
-async def get_horario(force_refresh: bool = Query(False)):
-    if not force_refresh:
-        cached = get_cached("horario")
-        if cached:
-            return {"schedule": cached}
-
-    media, slug_to_data = await asyncio.gather(
-        fetch_media(),
-        asyncio.to_thread(scrape_schedule_all_days)
-    )
+async def get_horario(
+    request: Request,
+    include: str = Query(None, description="image_meta: añade tamaño, color medio y LQIP de cada imagen"),
+    force_refresh: bool = Query(False)
+):
+    entry = None if force_refresh else get_cached_entry("horario")
+    if entry is None:
+        media, slug_to_data = await asyncio.gather(
+            fetch_media(),
+            asyncio.to_thread(scrape_schedule_all_days)
+        )
 
-    for item in media:
-        slug = item.get("slug")
-        if slug in slug_to_data:
-            item.update(slug_to_data[slug])
-        else:
-            item.update({"day": None, "time": None, "poster": None})
+        # Copias: la lista parseada puede estar memoizada y no se debe mutar
+        empty = {"day": None, "time": None, "poster": None}
+        schedule = [{**item, **slug_to_data.get(item.get("slug"), empty)} for item in media]
+        entry = set_cache("horario", {"schedule": schedule})
 
-    set_cache("horario", media)
-    return {"schedule": media}
+    meta = wants_image_meta(include)
+    if wants_ndjson(request):
+        schedule = entry["data"]["schedule"]
+        return ndjson_response((await with_image_meta(schedule))[0] if meta else schedule)
+    return await image_meta_response(entry["data"]) if meta else entry_response(request, entry)
@@ -0,0 +1,113 @@
+import asyncio
+import logging
+import time
+from fastapi import APIRouter, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
+from app.core.broadcast import Broadcaster
+from app.core.config import (
+    EVENTS_POLL_INTERVAL, EVENTS_MANGA_POLL_INTERVAL, EVENTS_BUFFER, EVENTS_QUEUE_MAX, EVENTS_HEARTBEAT, EVENTS_RETRY_MS
+)
+from app.utils.changes import anime_episodes, manga_uploads
+from app.routers.animes import fetch_home_entry
+from app.routers.mangas import fetch_home_page
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter()
+
+# Un solo lector de las portadas para todos los clientes: las novedades que detecta
+# app.utils.changes se publican aquí y se reparten por SSE.
+broadcaster = Broadcaster(EVENTS_BUFFER, EVENTS_QUEUE_MAX)
+poll_stats = {"polls": 0, "errors": 0}
+_poller = None
+
+# (nombre, segundos entre lecturas, carga); la carga pasa las listas al detector.
+# La portada de mangas se pide sin caché: su HTML vive CACHE_TTL segundos y, si no,
+# cada novedad llegaría con hasta ese retraso de más
+SOURCES = [
+    ("anime", EVENTS_POLL_INTERVAL, fetch_home_entry),
+    ("manga", EVENTS_MANGA_POLL_INTERVAL, lambda: fetch_home_page(force_refresh=True)),
+]
+
+
+@anime_episodes.subscribe
+def publish_episodes(episodes: list):
+    # La portada va del más nuevo al más viejo: se publican en orden cronológico
+    for ep in reversed(episodes):
+        broadcaster.publish("new_episode", ep)
+
+
+@manga_uploads.subscribe
+def publish_chapters(items: list):
+    for item in reversed(items):
+        broadcaster.publish("new_chapter", item)
+
+
+async def _poll_source(name: str, load):
+    poll_stats["polls"] += 1
+    try:
+        await load()
+    except Exception as e:
+        poll_stats["errors"] += 1
+        logger.warning(f"[EVENTS] Falló la lectura de la portada de {name}: {e}")
+
+
+async def _poll():
+    due = {name: 0.0 for name, _, _ in SOURCES}
+    while True:
+        # Sin suscriptores no se consulta nada: la portada sigue refrescándose con las peticiones normales
+        if broadcaster.subscribers:
+            now = time.monotonic()
+            ready = []
+            for name, interval, load in SOURCES:
+                if interval > 0 and now >= due[name]:
+                    due[name] = now + interval
+                    ready.append((name, load))
+            if ready:
+                await asyncio.gather(*(_poll_source(name, load) for name, load in ready))
+        await asyncio.sleep(1.0)
+
+
+def ensure_poller():
+    global _poller
+    if _poller is None or _poller.done():
+        _poller = asyncio.get_running_loop().create_task(_poll())
+
+
+def stop_events():
+    global _poller
+    if _poller is not None:
+        _poller.cancel()
+        _poller = None
+
+
+def get_events_stats() -> dict:
+    return {**broadcaster.get_stats(), **poll_stats}
+
+
+@router.get("/events", summary="Novedades en tiempo real (Server-Sent Events)")
+async def events(
+    request: Request,
+    last_event_id: int = Query(None, description="Último id recibido (alternativa a la cabecera Last-Event-ID)")
+):
+    """
+    Flujo text/event-stream con un evento por novedad de las portadas:
+    - new_episode: elemento nuevo de latestEpisodes de /api/animes/home.
+    - new_chapter: elemento nuevo de ultimas_subidas de /api/mangas/home.
+    - resync: faltan eventos anteriores a Last-Event-ID; hay que volver a pedir las portadas.
+
+    Al reconectar, EventSource envía Last-Event-ID y se reciben primero los eventos perdidos.
+    """
+    header = request.headers.get("last-event-id")
+    if header is not None and last_event_id is None:
+        try:
+            last_event_id = int(header)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Last-Event-ID inválido. Debe ser un número entero")
+    ensure_poller()
+    sub, backlog = broadcaster.subscribe(last_event_id)
+    return StreamingResponse(
+        broadcaster.stream(sub, backlog, EVENTS_HEARTBEAT, EVENTS_RETRY_MS),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -0,0 +1,42 @@
+from fastapi import APIRouter, HTTPException, Query, Request
+from typing import Optional
+from urllib.parse import urlsplit
+from app.core.config import IMAGE_DEFAULT_QUALITY, IMAGE_MAX_WIDTH
+from app.core.imagecache import cached_image, image_response
+from app.utils.imaging import (
+    ALLOWED_HOSTS, check_image_format, fetch_source_image, image_variant, is_allowed_host, negotiate_image_format
+)
+
+router = APIRouter()
+
+async def transformed_response(request: Request, source: dict, w: Optional[int], q: int, format: Optional[str]):
+    """
+    Respuesta con la variante pedida de `source`. Sin `format` se negocia con Accept
+    (AVIF > WebP > JPEG/PNG) y la respuesta lleva Vary: Accept.
+    """
+    check_image_format(format)
+    fmt = format or negotiate_image_format(request.headers.get("accept"), source["content_type"])
+    meta = await image_variant(source, w, q, fmt)
+    return await image_response(
+        request, meta, None if format else {"Vary": "Accept"}, reload=lambda: image_variant(source, w, q, fmt)
+    )
+
+
+@router.get("/transform", summary="Redimensiona y recodifica una imagen de los CDN de origen")
+async def transform_image(
+    request: Request,
+    url: str = Query(..., description="URL de la imagen (póster, backdrop, captura o página de capítulo)"),
+    w: Optional[int] = Query(None, ge=16, le=IMAGE_MAX_WIDTH, description="Ancho en píxeles (nunca se amplía)"),
+    q: int = Query(IMAGE_DEFAULT_QUALITY, ge=1, le=95, description="Calidad de compresión"),
+    format: Optional[str] = Query(None, description="avif, webp, jpeg o png; por defecto se negocia con Accept"),
+):
+    """
+    El original se descarga una vez a la caché de imágenes en disco y cada variante
+    (w, q, formato) se genera en un pool de procesos y se cachea por separado.
+    Solo se aceptan URLs de los hosts permitidos (IMAGE_ALLOWED_HOSTS).
+    """
+    parts = urlsplit(url)
+    if parts.scheme not in ("http", "https") or not is_allowed_host(parts.hostname):
+        raise HTTPException(status_code=400, detail=f"Host no permitido. Opciones: {sorted(ALLOWED_HOSTS)}")
+    source = await cached_image(url, lambda: fetch_source_image(url))
+    return await transformed_response(request, source, w, q, format)
@@ -1,12 +1,25 @@
+import asyncio
 import logging
-from fastapi import APIRouter, HTTPException, Query
+from fastapi import APIRouter, HTTPException, Query, Request
 from bs4 import BeautifulSoup
 import httpx
+from lxml import etree
 import re
-from typing import Dict
-
-from app.core.cache import get_cached, set_cache
-from app.core.config import ZONATMO_BASE_URL, ZONATMO_HEADERS
+from typing import Dict, List
+from urllib.parse import urlsplit, urlunsplit
+from pydantic import BaseModel
+
+from app.core.cache import get_cached, get_cached_entry, set_cache, memo_parse_in_thread, load_once
+from app.core.responses import JSONBytesResponse, entry_response, wants_ndjson, ndjson_response
+from app.utils.pagination import is_paged, check_order, parse_fields, project, paginate
+from app.utils.batch import check_batch, gather_entries, batch_body
+from app.core.http import get_client
+from app.core.store import KVStore
+from app.utils.changes import manga_uploads, invalidate_keys
+from app.core.config import (
+    ZONATMO_BASE_URL, ZONATMO_HEADERS, CHAPTER_MAP_TTL, MANGA_LIBRARY_TTL, FINISHED_CACHE_TTL,
+    RESOLVE_CONCURRENCY, RESOLVE_BATCH_MAX_ITEMS
+)
 from app.routers.mangas import normalize_href, extract_cover_url_from_element, detect_type_from_element
 
 # Configuración básica de logs
@@ -19,6 +32,17 @@ BASE_URL = ZONATMO_BASE_URL
 HEADERS = ZONATMO_HEADERS
 
 
+# /view_uploads/<id> -> /viewer/<uniqid>/paginated; persiste entre reinicios
+chapter_map = KVStore("chapter_map", CHAPTER_MAP_TTL)
+# URL de la obra -> último detalle parseado; copia local que /detalle usa si ZonaTMO falla
+detail_mirror = KVStore("manga_details", MANGA_LIBRARY_TTL)
+
+
+def zonatmo_client() -> httpx.AsyncClient:
+    # Sin seguir redirecciones: resolve_final_chapter_url necesita leer Location
+    return get_client("zonatmo", headers=HEADERS, timeout=15.0, follow_redirects=False)
+
+
 async def fetch_html_remote(url: str, force_refresh: bool = False) -> str:
     """
     Descarga HTML remoto con caché opcional.
@@ -30,10 +54,9 @@ async def fetch_html_remote(url: str, force_refresh: bool = False) -> str:
 
     logger.info(f"[FETCH] Descargando: {url}")
     try:
-        async with httpx.AsyncClient(headers=HEADERS, timeout=15.0) as client:
-            resp = await client.get(url)
-            resp.raise_for_status()
-            text = resp.text
+        resp = await zonatmo_client().get(url)
+        resp.raise_for_status()
+        text = resp.text
     except httpx.HTTPError as e:
         logger.error(f"[ERROR] Fallo al obtener {url}: {e}")
         raise HTTPException(status_code=502, detail=f"Error al obtener página: {str(e)}")
@@ -52,37 +75,215 @@ async def resolve_final_chapter_url(upload_url: str) -> str:
     si no, usa regex en el HTML.
     """
     logger.info(f"[RESOLVE] Resolviendo uniqid en: {upload_url}")
-    async with httpx.AsyncClient(headers=HEADERS, timeout=15.0, follow_redirects=False) as client:
-        resp = await client.get(upload_url)
-
-        # Caso 1: Redirección directa -> usar cabecera Location
-        if resp.status_code in (301, 302, 303, 307, 308):
-            final_url = resp.headers.get("Location")
-            if not final_url.startswith("http"):
-                final_url = BASE_URL + final_url
-            logger.info(f"[OK:REDIRECT] {upload_url} -> {final_url}")
-            return final_url
-
-        # Caso 2: No hubo redirect -> buscar uniqid en el HTML
-        html = resp.text
-        match = re.search(r"uniqid:\s*['\"]([^'\"]+)['\"]", html)
-        if not match:
-            logger.warning(f"[WARN] No se encontró uniqid en {upload_url}")
-            raise HTTPException(status_code=500, detail=f"No se encontró uniqid en {upload_url}")
-
-        uniqid = match.group(1)
-        final_url = f"{BASE_URL}/viewer/{uniqid}/paginated"
-        logger.info(f"[OK:HTML] {upload_url} -> {final_url}")
+    resp = await zonatmo_client().get(upload_url)
+
+    # Caso 1: Redirección directa -> usar cabecera Location
+    if resp.status_code in (301, 302, 303, 307, 308):
+        final_url = resp.headers.get("Location")
+        if not final_url.startswith("http"):
+            final_url = BASE_URL + final_url
+        logger.info(f"[OK:REDIRECT] {upload_url} -> {final_url}")
         return final_url
 
+    # Caso 2: No hubo redirect -> buscar uniqid en el HTML
+    html = resp.text
+    match = re.search(r"uniqid:\s*['\"]([^'\"]+)['\"]", html)
+    if not match:
+        logger.warning(f"[WARN] No se encontró uniqid en {upload_url}")
+        raise HTTPException(status_code=500, detail=f"No se encontró uniqid en {upload_url}")
+
+    uniqid = match.group(1)
+    final_url = f"{BASE_URL}/viewer/{uniqid}/paginated"
+    logger.info(f"[OK:HTML] {upload_url} -> {final_url}")
+    return final_url
+
+
+def canonical_upload_url(upload_url: str) -> str:
+    """
+    Forma canónica de una URL /view_uploads/: absoluta, host en minúsculas,
+    sin barra final, query ni fragmento. Es la clave del almacén de resoluciones.
+    """
+    if not upload_url.startswith(BASE_URL):
+        upload_url = normalize_href(upload_url)
+    parts = urlsplit(upload_url)
+    return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), parts.path.rstrip("/"), "", ""))
+
+
+async def resolve_chapter_urls(upload_urls: List[str], force_refresh: bool = False):
+    """
+    Resuelve varias URLs /view_uploads/ a la vez. Las ya conocidas salen del almacén
+    persistente (una sola consulta); el resto se resuelve con RESOLVE_CONCURRENCY
+    peticiones simultáneas y se guarda. Devuelve (resueltas, errores) por URL recibida.
+    """
+    canonical = {u: canonical_upload_url(u) for u in upload_urls}
+    keys = list(dict.fromkeys(canonical.values()))
+    known = {} if force_refresh else await asyncio.to_thread(chapter_map.get_many, keys)
+    resolved, errors = await gather_entries(
+        [k for k in keys if k not in known],
+        lambda k: load_once(("resolve", k), lambda: resolve_final_chapter_url(k)),
+        concurrency=RESOLVE_CONCURRENCY,
+    )
+    if resolved:
+        await asyncio.to_thread(chapter_map.set_many, resolved)
+    mapping = {**known, **resolved}
+    return (
+        {u: mapping[k] for u, k in canonical.items() if k in mapping},
+        {u: errors[k] for u, k in canonical.items() if k in errors},
+    )
+
+
+HTML_PARSER = etree.HTMLParser()
+
+
+def _classes(el) -> list:
+    cls = el.get("class")
+    return cls.split() if cls else []
 
-def parse_detail(soup: BeautifulSoup, url: str) -> Dict:
+
+def _text(el, sep: str = "") -> str:
+    """
+    Equivalente a get_text(sep, strip=True) de BeautifulSoup para nodos lxml.
+    """
+    return sep.join(s.strip() for s in el.itertext() if s.strip())
+
+
+def parse_chapter_row(li, in_group: bool) -> Dict:
+    """
+    Extrae título, URL, fecha y grupo de un <li> de capítulo en una sola pasada
+    sobre sus descendientes (mismo resultado que los cuatro select_one anteriores).
+    """
+    cap_title = play_button = date_tag = group_tag = None
+    # Solo interesan los <a> y la insignia de fecha (<span>): lxml filtra por etiqueta en C
+    for el in li.iterdescendants("a", "span"):
+        tag = el.tag
+        cls = el.get("class")
+        if tag != "a" and (date_tag is not None or not cls or "badge-primary" not in cls):
+            continue
+        classes = cls.split() if cls else []
+        if tag == "a":
+            if cap_title is None and "btn-collapse" in classes:
+                cap_title = el
+            if (play_button is None and "btn" in classes and "btn-default" in classes
+                    and "/view_uploads/" in (el.get("href") or "")):
+                play_button = el
+            if group_tag is None:
+                if in_group:
+                    group_tag = el
+                else:
+                    for anc in el.iterancestors():
+                        if anc is li:
+                            break
+                        if "chapter-list-element" in _classes(anc):
+                            group_tag = el
+                            break
+        if date_tag is None and "badge-primary" in classes:
+            date_tag = el
+        if cap_title is not None and play_button is not None and date_tag is not None and group_tag is not None:
+            break
+
+    cap_url = play_button.get("href") if play_button is not None else None
+    return {
+        "title": _text(cap_title, " ") if cap_title is not None else None,
+        "url": normalize_href(cap_url) if cap_url else None,
+        "date": _text(date_tag) if date_tag is not None else None,
+        "group": _text(group_tag) if group_tag is not None else None,
+    }
+
+
+def _in_group(li, chapters_el) -> bool:
+    # Un ancestro .chapter-list-element dentro de #chapters (fuera de él no puede haberlo)
+    for anc in li.iterancestors():
+        if anc is chapters_el:
+            return "chapter-list-element" in _classes(anc)
+        if "chapter-list-element" in _classes(anc):
+            return True
+    return False
+
+
+def iter_chapters(chapters_el):
+    """
+    Recorre las filas de #chapters (capítulos y subidas de cada grupo) en orden de documento.
+    Coste lineal en el tamaño de la lista.
+    """
+    for li in chapters_el.iter("li"):
+        if "list-group-item" not in _classes(li):
+            continue
+        yield parse_chapter_row(li, _in_group(li, chapters_el))
+
+
+def _scan_page(root) -> Dict:
+    """
+    Una única pasada por el documento que salta el contenido de #chapters
+    (la parte grande) y recoge los nodos de cabecera, estado, géneros y títulos.
+    """
+    found = {"header": None, "alt_header": None, "state": None, "chapters": [], "subtitles": [], "h5": []}
+    stack = [root]
+    while stack:
+        el = stack.pop()
+        if not isinstance(el.tag, str):
+            continue
+        if el.get("id") == "chapters":
+            found["chapters"].append(el)
+            continue
+        classes = _classes(el)
+        if classes:
+            if found["header"] is None and el.tag == "header" and "element" in classes:
+                found["header"] = el
+            if found["alt_header"] is None and "element-header-content" in classes:
+                found["alt_header"] = el
+            if found["state"] is None and "book-status" in classes:
+                found["state"] = el
+            if "element-subtitle" in classes:
+                found["subtitles"].append(el)
+        if el.tag == "h5":
+            found["h5"].append(el)
+        stack.extend(reversed(el))
+    return found
+
+
+def _genres(subtitles: list) -> list:
+    # Equivale a ".element-subtitle ~ h6 a.badge-primary"
+    genres, seen = [], set()
+    for subtitle in subtitles:
+        for h6 in subtitle.itersiblings("h6"):
+            if h6 in seen:
+                continue
+            seen.add(h6)
+            for a in h6.iter("a"):
+                if "badge-primary" in _classes(a):
+                    genres.append(_text(a))
+    return genres
+
+
+def _sibling_spans_after_heading(headings: list, text: str) -> list:
+    # Equivale a "h5:contains(text) ~ span" sin recorrer todo el documento
+    spans, seen = [], set()
+    for h5 in headings:
+        if text not in "".join(h5.itertext()):
+            continue
+        for span in h5.itersiblings("span"):
+            if span not in seen:
+                seen.add(span)
+                spans.append(_text(span))
+    return spans
+
+
+def parse_detail(html: str, url: str) -> Dict:
     """
     Extrae todos los detalles de una obra en ZonaTMO.
+    El documento se recorre con lxml; solo la cabecera se pasa a BeautifulSoup
+    para reutilizar los helpers de portada y tipo.
     """
-    container = soup.select_one("header.element") or soup.select_one(".element-header-content")
-    if not container:
+    root = etree.fromstring(html, HTML_PARSER)
+    if root is None:
+        # HTML vacío o solo espacios: lxml no devuelve documento
         raise HTTPException(status_code=404, detail="No se encontró información de detalle")
+    page = _scan_page(root)
+    header = page["header"] if page["header"] is not None else page["alt_header"]
+    if header is None:
+        raise HTTPException(status_code=404, detail="No se encontró información de detalle")
+    fragment = BeautifulSoup(etree.tostring(header, encoding="unicode", method="html", with_tail=False), "lxml")
+    container = fragment.body.find(True) if fragment.body else fragment.find(True)
 
     # Título, subtítulo, descripción
     title_tag = container.select_one(".element-title")
@@ -98,37 +299,15 @@ def parse_detail(soup: BeautifulSoup, url: str) -> Dict:
     mtype = detect_type_from_element(container)
     demo_tag = container.select_one(".demography")
     demography = demo_tag.get_text(strip=True) if demo_tag else None
-    state_tag = soup.select_one(".book-status")
-    state = state_tag.get_text(strip=True) if state_tag else None
+    state = _text(page["state"]) if page["state"] is not None else None
 
     # Géneros, títulos alternativos, sinónimos
-    genres = [a.get_text(strip=True) for a in soup.select(".element-subtitle ~ h6 a.badge-primary")]
-    alt_titles = [span.get_text(strip=True) for span in soup.select("h5:contains('Títulos alternativos') ~ span")]
-    synonyms = [span.get_text(strip=True) for span in soup.select("h5:contains('Sinónimos') ~ span")]
+    genres = _genres(page["subtitles"])
+    alt_titles = _sibling_spans_after_heading(page["h5"], "Títulos alternativos")
+    synonyms = _sibling_spans_after_heading(page["h5"], "Sinónimos")
 
     # Lista de capítulos
-    chapters = []
-    for li in soup.select("#chapters li.list-group-item"):
-        # Título del capítulo
-        cap_title = li.select_one("a.btn-collapse")
-        cap_text = cap_title.get_text(" ", strip=True) if cap_title else None
-
-        # Botón de reproducción -> URL real (view_uploads/xxxxx)
-        play_button = li.select_one("a.btn.btn-default[href*='/view_uploads/']")
-        cap_url = play_button["href"] if play_button else None
-
-        # Fecha y grupo
-        date_tag = li.select_one(".badge-primary")
-        date = date_tag.get_text(strip=True) if date_tag else None
-        group_tag = li.select_one(".chapter-list-element a")
-        group = group_tag.get_text(strip=True) if group_tag else None
-
-        chapters.append({
-            "title": cap_text,
-            "url": normalize_href(cap_url) if cap_url else None,
-            "date": date,
-            "group": group
-        })
+    chapters = [row for el in page["chapters"] for row in iter_chapters(el)]
 
     logger.info(f"[INFO] Se extrajeron {len(chapters)} capítulos de {url}")
 
@@ -148,21 +327,146 @@ def parse_detail(soup: BeautifulSoup, url: str) -> Dict:
     }
 
 
+CHAPTER_FIELDS = ["title", "url", "date", "group", "final_url"]
+
+
+def _chapter_number(group: list) -> float:
+    match = re.search(r"\d+(?:\.\d+)?", group[0].get("title") or "")
+    return float(match.group()) if match else -1.0
+
+
+def group_chapter_rows(chapters: list) -> list:
+    """
+    Agrupa cada fila de capítulo con las filas de subida (sin título) que la siguen,
+    para paginar por capítulo y no partir sus subidas entre páginas.
+    """
+    groups = []
+    for row in chapters:
+        if row.get("title") is not None or not groups:
+            groups.append([row])
+        else:
+            groups[-1].append(row)
+    return groups
+
+
+def page_detail(data: Dict, offset: int, limit: int, order: str, fields: list, resolved: Dict = None) -> Dict:
+    """
+    Copia superficial del detalle con solo los capítulos pedidos (order por número de capítulo).
+    Con `resolved` (url -> URL final) cada fila lleva además "final_url".
+    """
+    groups, pagination = paginate(group_chapter_rows(data.get("chapters", [])), offset, limit, order, key=_chapter_number)
+    rows = [row for group in groups for row in group]
+    if resolved is not None:
+        rows = [{**row, "final_url": resolved.get(row["url"])} for row in rows]
+    return {**data, "chapters": [project(row, fields) for row in rows], "pagination": pagination}
+
+
+def detail_cache_key(url: str) -> str:
+    return f"detalle_{url}"
+
+
+async def fetch_detail_entry(url: str, force_refresh: bool = False) -> Dict:
+    """
+    Descarga y parsea el detalle de una obra y lo guarda en caché; devuelve la entrada.
+    """
+    logger.info(f"[START] Procesando obra: {url}")
+    html = await fetch_html_remote(url, force_refresh=force_refresh)
+    data = await memo_parse_in_thread("/api/mangas/detalle", parse_detail, html, url)
+    logger.info(f"[END] Finalizado scrapeo de: {url}")
+    # Escritura en SQLite fuera del bucle de eventos
+    await asyncio.to_thread(detail_mirror.set, url, data)
+    # Una obra finalizada no recibe capítulos; si llega alguno, on_new_uploads la invalida
+    finished = (data.get("state") or "").lower().startswith("finalizado")
+    return set_cache(detail_cache_key(url), data, ttl=FINISHED_CACHE_TTL if finished else None)
+
+
+@manga_uploads.subscribe
+def on_new_uploads(items: list):
+    # El HTML de la obra también está cacheado (fetch_html_remote): se quitan los dos
+    for url in dict.fromkeys(item["url"] for item in items):
+        key = detail_cache_key(url)
+        invalidate_keys([key, url], key, lambda url=url: fetch_detail_entry(url))
+
+
 @router.get("/detalle", summary="Detalle de una obra (manga/manhwa/manhua/etc.)")
 async def detalle(
+    request: Request,
     url: str = Query(..., description="URL completa de la obra en ZonaTMO"),
-    force_refresh: bool = Query(False, description="Forzar refresco (ignorar caché)")
+    force_refresh: bool = Query(False, description="Forzar refresco (ignorar caché)"),
+    offset: int = Query(0, ge=0, description="Capítulos a saltar"),
+    limit: int = Query(None, ge=1, description="Máximo de capítulos (con sus subidas)"),
+    order: str = Query(None, description="asc | desc (por número de capítulo)"),
+    fields: str = Query(None, description=f"Campos de cada capítulo separados por coma: {','.join(CHAPTER_FIELDS)}"),
+    resolve: bool = Query(False, description="Añadir final_url (/viewer/...) a los capítulos devueltos (requiere limit)")
 ):
     """
     Obtiene todos los detalles de una obra desde su URL en ZonaTMO.
-    Entrega las URLs de capítulos en formato /view_uploads/... sin resolver automáticamente.
+    Entrega las URLs de capítulos en formato /view_uploads/...; con resolve=true (y limit) se
+    resuelven además los del trozo pedido, hasta RESOLVE_BATCH_MAX_ITEMS, y se añaden como final_url.
+    Con offset/limit/order/fields se sirve solo un trozo de la lista de capítulos cacheada;
+    con Accept: application/x-ndjson se emite un capítulo por línea.
     """
-    logger.info(f"[START] Procesando obra: {url}")
-    html = await fetch_html_remote(url, force_refresh=force_refresh)
-    soup = BeautifulSoup(html, "lxml")
-    data = parse_detail(soup, url)
-    logger.info(f"[END] Finalizado scrapeo de: {url}")
-    return data
+    cache_key = detail_cache_key(url)
+    paged = is_paged(offset, limit, order, fields)
+    check_order(order)
+    selected = parse_fields(fields, CHAPTER_FIELDS)
+    if resolve and limit is None:
+        # Sin limit se resolverían todos los capítulos: cientos de peticiones a ZonaTMO
+        raise HTTPException(status_code=400, detail="resolve=true requiere limit")
+    entry = None if force_refresh else get_cached_entry(cache_key)
+    source = {}
+    if entry is None:
+        try:
+            entry = await fetch_detail_entry(url, force_refresh)
+        except HTTPException:
+            # Si ZonaTMO falla se sirve la última copia guardada (puede estar desfasada),
+            # marcada con X-Detail-Source: mirror; sin copia se propaga el error
+            mirrored = await asyncio.to_thread(detail_mirror.get, url)
+            if mirrored is None:
+                raise
+            logger.warning(f"[MIRROR] ZonaTMO no responde; se sirve la copia local de {url}")
+            entry = {"data": mirrored, "body": None, "variants": {}}
+            source = {"X-Detail-Source": "mirror"}
+
+    data = entry["data"]
+    resolved = None
+    if resolve:
+        rows = page_detail(data, offset, limit, order, None)["chapters"]
+        upload_urls = list(dict.fromkeys(row["url"] for row in rows if row["url"]))
+        if len(upload_urls) > RESOLVE_BATCH_MAX_ITEMS:
+            raise HTTPException(status_code=400, detail=f"Máximo {RESOLVE_BATCH_MAX_ITEMS} subidas a resolver; reduce limit")
+        resolved, _ = await resolve_chapter_urls(upload_urls)
+
+    if wants_ndjson(request):
+        # Solo la lista de capítulos, una fila por línea
+        page = page_detail(data, offset, limit, order, selected, resolved)
+        return ndjson_response(page["chapters"], headers={"X-Total-Count": str(page["pagination"]["total"]), **source})
+    if paged or resolve:
+        return JSONBytesResponse(page_detail(data, offset, limit, order, selected, resolved), headers=source)
+    response = entry_response(request, entry)
+    response.headers.update(source)
+    return response
+
+class DetalleBatchRequest(BaseModel):
+    urls: List[str]
+
+
+@router.post("/detalle/batch", summary="Detalle de varias obras en una sola petición")
+async def detalle_batch(
+    body: DetalleBatchRequest,
+    force_refresh: bool = Query(False, description="Forzar refresco (ignorar caché)")
+):
+    """
+    Las obras que no están en caché se descargan en paralelo (acotado por BATCH_CONCURRENCY)
+    y las URLs repetidas se procesan una vez. Los fallos se devuelven por URL en "errors".
+    """
+    urls = check_batch(body.urls, "urls")
+    entries, errors = await gather_entries(
+        urls,
+        lambda url: fetch_detail_entry(url, force_refresh),
+        lookup=None if force_refresh else lambda url: get_cached_entry(detail_cache_key(url)),
+    )
+    return JSONBytesResponse(batch_body(urls, entries, errors))
 
 @router.get("/resolve_chapter", summary="Resuelve URL de capítulo a su forma final")
 async def resolve_chapter(
@@ -172,14 +476,26 @@ async def resolve_chapter(
     """
     Resuelve una URL /view_uploads/xxxxx a su forma final /viewer/<uniqid>/paginated.
     """
-    if not upload_url.startswith(BASE_URL):
-        upload_url = normalize_href(upload_url)
+    resolved, errors = await resolve_chapter_urls([upload_url], force_refresh)
+    if upload_url in errors:
+        logger.error(f"[ERROR] No se pudo resolver {upload_url}: {errors[upload_url]}")
+        raise HTTPException(status_code=500, detail=f"Error al resolver URL: {errors[upload_url]}")
+    return {"final_url": resolved[upload_url]}
 
-    try:
-        final_url = await resolve_final_chapter_url(upload_url)
-        return {"final_url": final_url}
-    except Exception as e:
-        logger.error(f"[ERROR] No se pudo resolver {upload_url}: {e}")
-        raise HTTPException(status_code=500, detail=f"Error al resolver URL: {str(e)}")
 
+class ResolveBatchRequest(BaseModel):
+    upload_urls: List[str]
 
+
+@router.post("/resolve_chapter/batch", summary="Resuelve varias URLs de capítulo a la vez")
+async def resolve_chapter_batch(
+    body: ResolveBatchRequest,
+    force_refresh: bool = Query(False, description="Forzar refresco (ignorar el almacén)")
+):
+    """
+    Devuelve {"results": {upload_url: final_url}, "errors": {upload_url: detalle}}.
+    Las URLs ya resueltas antes salen del almacén persistente sin tocar ZonaTMO.
+    """
+    upload_urls = check_batch(body.upload_urls, "upload_urls", RESOLVE_BATCH_MAX_ITEMS)
+    resolved, errors = await resolve_chapter_urls(upload_urls, force_refresh)
+    return {"results": resolved, "errors": errors}
@@ -1,21 +1,36 @@
-from fastapi import APIRouter, HTTPException, Response
-from fastapi.responses import HTMLResponse
+from fastapi import APIRouter, HTTPException, Query, Request
+from fastapi.responses import HTMLResponse, Response, StreamingResponse
 from pydantic import BaseModel
-from typing import List
-from uuid import uuid4
-import requests
+from typing import List, Optional
+from collections import OrderedDict
+from html import escape
+from string import Template
+from uuid import NAMESPACE_URL, uuid5
+import asyncio
+import httpx
+import logging
+import io
+import os
+import zipfile
+import time
 import re
 import json
-from urllib.parse import urljoin
+from urllib.parse import quote, urljoin, urlsplit, urlunsplit
 from bs4 import BeautifulSoup
-from requests.adapters import HTTPAdapter
-from urllib3.util.retry import Retry
-from app.core.config import ZONATMO_HEADERS
+from app.core.config import ZONATMO_HEADERS, CHAPTER_IMAGES_TTL, VIEWER_PAGE_CONCURRENCY, IMAGE_DEFAULT_QUALITY, IMAGE_MAX_WIDTH, VIEWER_TTL, VIEWER_MAX_ENTRIES, VIEWER_EAGER_PAGES, VIEWER_PLACEHOLDER_SIZE, VIEWER_CACHE_CONTROL, ARCHIVE_CONCURRENCY, READAHEAD_DEPTH, READAHEAD_CONCURRENCY, READAHEAD_IDLE
+from app.core.http import get_client, get_with_retries
+from app.core.cache import content_hash, load_once
+from app.core.store import KVStore
+from app.core.imagecache import cached_image, image_response, lookup, read_blob
+from app.routers.images import transformed_response
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
 class MangaRequest(BaseModel):
     url: str
+    force_refresh: bool = False
 
 class ImageInfo(BaseModel):
     filename: str
@@ -28,27 +43,165 @@ class MangaResponse(BaseModel):
     viewer_url: str
     message: str
 
-viewers = {}
+# viewer_id -> {"dir_path", "referer", "chapter_title", "images", "created"}, del menos
+# al más recientemente usado. El id sale de la URL del capítulo (uuid5), así que volver
+# a registrar el mismo capítulo reutiliza su entrada en lugar de crear otra.
+viewers = OrderedDict()
+# viewer_id[:8] -> viewer_id, para las URLs cortas del visor
+short_ids = {}
+viewer_stats = {"created": 0, "reused": 0, "expired": 0, "evicted": 0}
+
+VIEWER_SUFFIX = re.compile(r"/(paginated|cascade)(/\d+)?/?$")
+VIEWER_PAGE = re.compile(r"/paginated/(\d+)/?$")
+
+def canonical_chapter_url(url: str) -> str:
+    """
+    URL del capítulo sin fragmento, query ni el modo de lectura (/paginated, /cascade).
+    """
+    parts = urlsplit(url.strip())
+    path = VIEWER_SUFFIX.sub("", parts.path).rstrip("/")
+    return urlunsplit((parts.scheme, parts.netloc.lower(), path, "", ""))
+
+def chapter_viewer_id(url: str) -> str:
+    """
+    Id estable del visor de un capítulo: la misma URL canónica da siempre el mismo id.
+    """
+    return str(uuid5(NAMESPACE_URL, canonical_chapter_url(url)))
+
+def _drop_viewer(viewer_id: str):
+    viewers.pop(viewer_id, None)
+    if short_ids.get(viewer_id[:8]) == viewer_id:
+        del short_ids[viewer_id[:8]]
+    state = readahead.pop(viewer_id, None)
+    if state:
+        for task in state["tasks"].values():
+            task.cancel()
 
-def create_session_with_retries():
-    session = requests.Session()
-    retries = Retry(total=3, backoff_factor=1, status_forcelist=[429, 500, 502, 503, 504])
-    session.mount("https://", HTTPAdapter(max_retries=retries))
-    return session
+def get_viewer_info(viewer_id: str):
+    """
+    Datos del visor si existe y no ha caducado; lo marca como recién usado.
+    """
+    viewer_info = viewers.get(viewer_id)
+    if viewer_info is None:
+        return None
+    if time.monotonic() - viewer_info["created"] > VIEWER_TTL:
+        viewer_stats["expired"] += 1
+        _drop_viewer(viewer_id)
+        return None
+    viewers.move_to_end(viewer_id)
+    return viewer_info
 
-def extract_image_data(url: str):
-    headers = ZONATMO_HEADERS
-    session = create_session_with_retries()
-    response = session.get(url, headers=headers, verify=False)
+def register_viewer(viewer_id: str, viewer_info: dict):
+    viewers[viewer_id] = {**viewer_info, "created": time.monotonic()}
+    viewers.move_to_end(viewer_id)
+    short_ids[viewer_id[:8]] = viewer_id
+    viewer_stats["created"] += 1
+    # Primero los caducados del principio (los menos usados) y luego por tamaño
+    while viewers:
+        oldest, info = next(iter(viewers.items()))
+        if time.monotonic() - info["created"] > VIEWER_TTL:
+            viewer_stats["expired"] += 1
+        elif len(viewers) > VIEWER_MAX_ENTRIES:
+            viewer_stats["evicted"] += 1
+        else:
+            break
+        _drop_viewer(oldest)
+
+ARCHIVE_FORMATS = {"cbz": "application/vnd.comicbook+zip", "zip": "application/zip"}
+
+# URL canónica del capítulo -> {"dir_path", "images"}; persiste entre reinicios
+chapter_images = KVStore("chapter_images", CHAPTER_IMAGES_TTL)
+extract_stats = {"hits": 0, "misses": 0, "paginated_pages": 0}
+
+def viewer_client():
+    # Como la sesión de requests anterior: sigue redirecciones y sin verificar el certificado
+    return get_client("zonatmo_viewer", headers=ZONATMO_HEADERS, timeout=15.0, follow_redirects=True, verify=False)
+
+async def fetch_viewer_html(url: str) -> str:
+    try:
+        response = await get_with_retries(viewer_client(), url)
+    except httpx.HTTPError as e:
+        raise HTTPException(status_code=502, detail=f"Error al obtener página: {str(e)}")
     if response.status_code != 200:
         raise HTTPException(status_code=400, detail=f"No se pudo acceder a la página: Código de estado {response.status_code}")
-    
-    soup = BeautifulSoup(response.text, 'html.parser')
+    return response.text
+
+def parse_viewer_page(html: str):
+    """
+    (dir_path, images) si la página trae la lista completa en su script; si no, y es
+    una página del visor paginado, (None, (número de páginas, URL de la imagen)).
+    """
+    try:
+        return parse_image_data(html), None
+    except HTTPException:
+        pages, image_url = parse_paginated_page(html)
+        if not image_url:
+            raise
+        return None, (pages, image_url)
+
+async def _extract_paginated(url: str, first_html_page: tuple):
+    """
+    Descarga a la vez (VIEWER_PAGE_CONCURRENCY) el resto de páginas del visor paginado
+    y reconstruye dirPath + images a partir de la imagen de cada una. La página ya
+    descargada es la que indica la URL (/paginated/N, 1 si no lo indica).
+    """
+    pages, first_image = first_html_page
+    base = canonical_chapter_url(url)
+    match = VIEWER_PAGE.search(urlsplit(url).path)
+    start = int(match.group(1)) if match else 1
+    semaphore = asyncio.Semaphore(VIEWER_PAGE_CONCURRENCY)
+
+    async def page_image(n: int) -> str:
+        async with semaphore:
+            html = await fetch_viewer_html(f"{base}/paginated/{n}")
+        _, (_, image_url) = await asyncio.to_thread(parse_viewer_page, html)
+        return image_url
+
+    # Fuera de rango no se sabe qué página es la descargada: se piden todas
+    missing = [n for n in range(1, pages + 1) if n != start]
+    fetched = dict(zip(missing, await asyncio.gather(*(page_image(n) for n in missing))))
+    if 1 <= start <= pages:
+        fetched[start] = first_image
+    extract_stats["paginated_pages"] += len(missing) + 1
+    urls = [urljoin(url, fetched[n]) for n in range(1, pages + 1)]
+    # La lista se guarda por capítulo: antes de guardarla, una imagen por página y sin repetir
+    if len(set(urls)) != pages:
+        raise HTTPException(status_code=502, detail="El visor paginado devolvió imágenes repetidas")
+    dir_path = urls[0].rsplit("/", 1)[0] + "/"
+    if not all(u.startswith(dir_path) and "/" not in u[len(dir_path):] for u in urls):
+        raise HTTPException(status_code=400, detail="Las páginas del visor no comparten directorio de imágenes")
+    return dir_path, [u[len(dir_path):] for u in urls]
+
+async def extract_image_data(url: str, force_refresh: bool = False):
+    """
+    dirPath e imágenes del capítulo, sin bloquear el bucle de eventos: descarga con el
+    cliente compartido (con reintentos), parseo en un hilo, resultado guardado por URL
+    canónica del capítulo y extracciones simultáneas del mismo capítulo compartidas.
+    """
+    key = canonical_chapter_url(url)
+    # El almacén es SQLite (con candado): lecturas y escrituras van a un hilo
+    cached = None if force_refresh else await asyncio.to_thread(chapter_images.get, key)
+    if cached is not None:
+        extract_stats["hits"] += 1
+        return cached["dir_path"], cached["images"], url
+    extract_stats["misses"] += 1
+
+    async def load():
+        html = await fetch_viewer_html(url)
+        data, paginated = await asyncio.to_thread(parse_viewer_page, html)
+        dir_path, images = data if data else await _extract_paginated(url, paginated)
+        await asyncio.to_thread(chapter_images.set, key, {"dir_path": dir_path, "images": images})
+        return dir_path, images
+
+    dir_path, images = await load_once(("chapter_images", key), load)
+    return dir_path, images, url
+
+def parse_image_data(html: str):
+    soup = BeautifulSoup(html, 'html.parser')
     script_tags = soup.find_all('script')
     
     dir_path = None
     images = None
-    referer = url
     
     for script in script_tags:
         if script.string and 'dirPath' in script.string and 'images = JSON.parse' in script.string:
@@ -66,40 +219,82 @@ def extract_image_data(url: str):
     if not dir_path or not images:
         raise HTTPException(status_code=400, detail="No se encontraron imágenes o directorio en la página")
     
-    return dir_path, images, referer
+    return dir_path, images
+
+def parse_paginated_page(html: str):
+    """
+    (número de páginas, URL de la imagen) de una página del visor paginado, que solo
+    trae su propia imagen y un selector con todas las páginas.
+    """
+    soup = BeautifulSoup(html, 'html.parser')
+    img = soup.select_one("img.viewer-image, img.viewer-img, #main-container img")
+    image_url = img and (img.get("data-src") or img.get("src"))
+    select = soup.select_one("select#viewer-pages-select, select.viewer-pages-select")
+    pages = len(select.find_all("option")) if select else 1
+    return max(pages, 1), image_url
+
+# Plantilla del visor: se compila una vez; por visor solo se rellenan título y páginas
+VIEWER_TEMPLATE = Template("""<!DOCTYPE html>
+<html lang="es">
+<head>
+    <meta charset="UTF-8">
+    <meta name="viewport" content="width=device-width, initial-scale=1.0">
+    <title>Visor de $title</title>
+$preloads
+    <style>
+        body { font-family: Arial, sans-serif; text-align: center; background-color: #f0f0f0; }
+        img { display: block; width: 100%; max-width: ${width}px; height: auto; margin: 10px auto; background-color: #ddd; }
+        h1 { color: #333; }
+        p { color: #555; }
+    </style>
+</head>
+<body>
+    <h1>Visor de $title</h1>
+    <p>Las páginas se cargan a medida que se avanza.</p>
+$pages
+    <p>Fin del capítulo.</p>
+</body>
+</html>
+""")
 
 def generate_viewer_html(chapter_title: str, images: List[str], viewer_id: str):
-    html_content = f"""
-    <!DOCTYPE html>
-    <html lang="es">
-    <head>
-        <meta charset="UTF-8">
-        <meta name="viewport" content="width=device-width, initial-scale=1.0">
-        <title>Visor de {chapter_title}</title>
-        <style>
-            body {{ font-family: Arial, sans-serif; text-align: center; background-color: #f0f0f0; }}
-            img {{ max-width: 100%; height: auto; margin: 10px 0; }}
-            h1 {{ color: #333; }}
-            p {{ color: #555; }}
-        </style>
-    </head>
-    <body>
-        <h1>Visor de {chapter_title}</h1>
-        <p>Imágenes cargadas automáticamente.</p>
-        {"".join(f'<img src="/api/mangas/scrape-manga/image/{viewer_id}/{i+1}/{img}" alt="Página {i+1}"><br>' for i, img in enumerate(images))}
-        <p>Fin del capítulo.</p>
-    </body>
-    </html>
-    """
-    return html_content
+    """
+    Solo las VIEWER_EAGER_PAGES primeras páginas se piden al abrir el visor (con preload);
+    el resto usa loading="lazy". Ancho y alto declarados reservan el hueco de cada página
+    para que el scroll no salte mientras cargan.
+    """
+    width, height = VIEWER_PLACEHOLDER_SIZE
+    srcs = [escape(f"/api/mangas/scrape-manga/image/{viewer_id}/{i+1}/{quote(img)}") for i, img in enumerate(images)]
+    preloads = "\n".join(f'    <link rel="preload" as="image" href="{src}">' for src in srcs[:VIEWER_EAGER_PAGES])
+    pages = "\n".join(
+        f'    <img src="{src}" alt="Página {i+1}" width="{width}" height="{height}" decoding="async"'
+        + (' fetchpriority="high">' if i < VIEWER_EAGER_PAGES else ' loading="lazy">')
+        for i, src in enumerate(srcs)
+    )
+    return VIEWER_TEMPLATE.substitute(title=escape(chapter_title), preloads=preloads, pages=pages, width=width)
+
+def viewer_page(viewer_info: dict, viewer_id: str):
+    """
+    (HTML, ETag) del visor, renderizado una sola vez por visor registrado.
+    """
+    if "page" not in viewer_info:
+        html_content = generate_viewer_html(viewer_info["chapter_title"], viewer_info["images"], viewer_id)
+        viewer_info["page"] = (html_content.encode("utf-8"), f'"{content_hash(html_content)}"')
+    return viewer_info["page"]
 
 @router.post("/scrape-manga")
 async def scrape_manga(request: MangaRequest):
     try:
         chapter_title = request.url.split('/')[-2] if 'viewer' in request.url else request.url.split('/')[-1].replace('.html', '').replace('-', '_')
-        viewer_id = str(uuid4())
-        
-        dir_path, images, referer = extract_image_data(request.url)
+        viewer_id = chapter_viewer_id(request.url)
+
+        viewer_info = None if request.force_refresh else get_viewer_info(viewer_id)
+        if viewer_info is not None:
+            viewer_stats["reused"] += 1
+            # El título guardado es el que espera la URL corta del visor
+            chapter_title, images = viewer_info["chapter_title"], viewer_info["images"]
+        else:
+            dir_path, images, referer = await extract_image_data(request.url, request.force_refresh)
         
         image_info_list = [
             ImageInfo(
@@ -112,12 +307,14 @@ async def scrape_manga(request: MangaRequest):
         if not image_info_list:
             raise HTTPException(status_code=400, detail="No se encontraron imágenes")
         
-        viewers[viewer_id] = {
-            "dir_path": dir_path,
-            "referer": referer,
-            "chapter_title": chapter_title,
-            "images": images
-        }
+        if viewer_info is None:
+            register_viewer(viewer_id, {
+                "dir_path": dir_path,
+                "referer": referer,
+                "chapter_title": chapter_title,
+                "images": images
+            })
+        schedule_readahead(viewer_id, 0)
         
         return MangaResponse(
             chapter_title=chapter_title,
@@ -132,35 +329,206 @@ async def scrape_manga(request: MangaRequest):
         raise HTTPException(status_code=500, detail=f"Error inesperado: {str(e)}")
 
 @router.get("/scrape-manga/viewer/{chapter_title}/{uuid}", response_class=HTMLResponse)
-async def get_viewer(chapter_title: str, uuid: str):
-    viewer_id = next((vid for vid in viewers if vid.startswith(uuid)), None)
-    if not viewer_id or viewers[viewer_id]["chapter_title"] != chapter_title:
+async def get_viewer(request: Request, chapter_title: str, uuid: str):
+    viewer_id = short_ids.get(uuid[:8])
+    viewer_info = get_viewer_info(viewer_id) if viewer_id and viewer_id.startswith(uuid) else None
+    if not viewer_info or viewer_info["chapter_title"] != chapter_title:
         raise HTTPException(status_code=404, detail="Página del visor no encontrada")
     
-    viewer_info = viewers[viewer_id]
-    html_content = generate_viewer_html(viewer_info["chapter_title"], viewer_info["images"], viewer_id)
-    return HTMLResponse(content=html_content)
+    body, etag = viewer_page(viewer_info, viewer_id)
+    headers = {"ETag": etag, "Cache-Control": VIEWER_CACHE_CONTROL}
+    if etag in (t.strip().removeprefix("W/") for t in request.headers.get("if-none-match", "").split(",")):
+        return Response(status_code=304, headers=headers)
+    return HTMLResponse(content=body, headers=headers)
 
-@router.get("/scrape-manga/image/{viewer_id}/{page_number}/{filename}")
-async def proxy_image(viewer_id: str, page_number: int, filename: str):
-    viewer_info = viewers.get(viewer_id)
-    if not viewer_info:
-        raise HTTPException(status_code=404, detail="Visor no encontrado")
-    
-    dir_path = viewer_info["dir_path"]
-    referer = viewer_info["referer"]
-    
+def images_client():
+    # Como la sesión de requests anterior: sigue redirecciones y sin verificar el certificado
+    return get_client("zonatmo_images", timeout=30.0, follow_redirects=True, verify=False)
+
+async def fetch_page_image(image_url: str, referer: str):
     headers = ZONATMO_HEADERS.copy()
     headers["Referer"] = referer
     headers["User-Agent"] = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
-    session = create_session_with_retries()
-    image_url = urljoin(dir_path, filename)
-    response = session.get(image_url, headers=headers, stream=True, verify=False)
-    
+    response = await get_with_retries(images_client(), image_url, headers=headers)
     if response.status_code != 200:
         raise HTTPException(status_code=400, detail=f"No se pudo obtener la imagen: Código de estado {response.status_code}")
+    return response.content, response.headers.get('content-type', 'image/webp')
+
+# -------------------- Exportación CBZ/ZIP --------------------
+class _ZipSink(io.RawIOBase):
+    """
+    Destino no posicionable para zipfile: acumula lo escrito hasta que se vacía con drain().
+    Al no poder hacer seek, zipfile usa descriptores de datos y nunca reescribe cabeceras.
+    """
+    def __init__(self):
+        self.chunks = []
+
+    def writable(self):
+        return True
+
+    def write(self, b):
+        self.chunks.append(bytes(b))
+        return len(b)
+
+    def drain(self) -> bytes:
+        out = b"".join(self.chunks)
+        self.chunks.clear()
+        return out
+
+async def archive_chunks(viewer_info: dict):
+    """
+    Genera el ZIP página a página y en orden. Las páginas se cargan (vía la caché de
+    imágenes) con ARCHIVE_CONCURRENCY descargas a la vez; las que llegan antes de su
+    turno esperan solo como metadatos y se leen del disco al escribirlas.
+    """
+    images = viewer_info["images"]
+    referer = viewer_info["referer"]
+    semaphore = asyncio.Semaphore(ARCHIVE_CONCURRENCY)
+
+    async def load(image_url: str):
+        async with semaphore:
+            return await cached_image(image_url, lambda: fetch_page_image(image_url, referer))
+
+    urls = [urljoin(viewer_info["dir_path"], img) for img in images]
+    tasks = [asyncio.create_task(load(url)) for url in urls]
+    sink = _ZipSink()
+    try:
+        with zipfile.ZipFile(sink, "w", zipfile.ZIP_STORED) as zf:
+            for i, (url, task) in enumerate(zip(urls, tasks)):
+                try:
+                    meta = await task
+                    try:
+                        data = await asyncio.to_thread(read_blob, meta["digest"])
+                    except FileNotFoundError:
+                        # Expulsada de la caché entre la carga y la escritura
+                        meta = await load(url)
+                        data = await asyncio.to_thread(read_blob, meta["digest"])
+                except Exception as e:
+                    if i:
+                        # Ya se envió el 200: la excepción corta la conexión sin cerrar el ZIP,
+                        # así el cliente ve una descarga incompleta y no un archivo con menos páginas
+                        logger.error(f"[ARCHIVE] {viewer_info['chapter_title']}: falló la página {i + 1}/{len(urls)} a mitad de descarga: {e}")
+                    raise
+                ext = os.path.splitext(images[i])[1] or ".jpg"
+                zf.writestr(zipfile.ZipInfo(f"{i + 1:03d}{ext}"), data)
+                yield sink.drain()
+        yield sink.drain()
+    finally:
+        for task in tasks:
+            task.cancel()
+
+async def _prepend(first: bytes, rest):
+    yield first
+    async for chunk in rest:
+        yield chunk
+
+@router.get("/scrape-manga/archive/{viewer_id}")
+async def download_archive(viewer_id: str, format: str = Query("cbz", description="cbz | zip")):
+    """
+    Descarga el capítulo completo como CBZ/ZIP en streaming (sin comprimir: las
+    imágenes ya lo están). El archivo nunca se construye entero en memoria.
+    """
+    if format not in ARCHIVE_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Format inválido. Opciones: {list(ARCHIVE_FORMATS)}")
+    viewer_info = get_viewer_info(viewer_id)
+    if not viewer_info:
+        raise HTTPException(status_code=404, detail="Visor no encontrado")
+
+    # La primera página se carga antes de responder: si el CDN falla, el cliente
+    # recibe el error (502) en lugar de un 200 con un archivo vacío
+    chunks = archive_chunks(viewer_info)
+    first = await anext(chunks)
+    filename = f"{viewer_info['chapter_title']}.{format}"
+    return StreamingResponse(
+        _prepend(first, chunks),
+        media_type=ARCHIVE_FORMATS[format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+# -------------------- Lectura anticipada --------------------
+# viewer_id -> {"tasks": {página: tarea}, "last_seen": t, "semaphore": Semaphore}
+readahead = {}
+readahead_stats = {"scheduled": 0, "fetched": 0, "cached": 0, "cancelled": 0, "abandoned": 0, "failed": 0}
+
+def schedule_readahead(viewer_id: str, from_page: int):
+    """
+    Precarga en la caché de imágenes las READAHEAD_DEPTH páginas siguientes a `from_page`
+    y cancela las precargas pendientes que han quedado fuera de esa ventana (el lector
+    saltó de página). Las que ya están descargando terminan y quedan en caché.
+    """
+    viewer_info = get_viewer_info(viewer_id)
+    if not viewer_info or READAHEAD_DEPTH <= 0:
+        return
+    state = readahead.get(viewer_id)
+    if state is None:
+        state = readahead[viewer_id] = {"tasks": {}, "last_seen": 0.0, "semaphore": asyncio.Semaphore(READAHEAD_CONCURRENCY)}
+    state["last_seen"] = time.monotonic()
+
+    images = viewer_info["images"]
+    window = range(from_page + 1, min(from_page + READAHEAD_DEPTH, len(images)) + 1)
+    for page, task in list(state["tasks"].items()):
+        if page not in window:
+            task.cancel()
+
+    for page in window:
+        if page in state["tasks"]:
+            continue
+        image_url = urljoin(viewer_info["dir_path"], images[page - 1])
+        readahead_stats["scheduled"] += 1
+        task = asyncio.create_task(_readahead_page(state, image_url, viewer_info["referer"]))
+        state["tasks"][page] = task
+        task.add_done_callback(lambda t, page=page: _readahead_done(viewer_id, state, page, t))
+
+async def _readahead_page(state: dict, image_url: str, referer: str):
+    if await lookup(image_url) is not None:
+        readahead_stats["cached"] += 1
+        return
+    async with state["semaphore"]:
+        # Si el lector lleva un rato sin pedir páginas se da por parado
+        if time.monotonic() - state["last_seen"] > READAHEAD_IDLE:
+            readahead_stats["abandoned"] += 1
+            return
+        try:
+            await cached_image(image_url, lambda: fetch_page_image(image_url, referer))
+            readahead_stats["fetched"] += 1
+        except (HTTPException, httpx.HTTPError) as e:
+            readahead_stats["failed"] += 1
+            print(f"[WARN] Lectura anticipada de {image_url}: {e}")
+
+def _readahead_done(viewer_id: str, state: dict, page: int, task):
+    if task.cancelled():
+        readahead_stats["cancelled"] += 1
+    if state["tasks"].get(page) is task:
+        del state["tasks"][page]
+    if not state["tasks"] and readahead.get(viewer_id) is state:
+        del readahead[viewer_id]
+
+@router.get("/scrape-manga/image/{viewer_id}/{page_number}/{filename}")
+async def proxy_image(
+    request: Request,
+    viewer_id: str,
+    page_number: int,
+    filename: str,
+    w: Optional[int] = Query(None, ge=16, le=IMAGE_MAX_WIDTH, description="Ancho en píxeles (nunca se amplía)"),
+    q: int = Query(IMAGE_DEFAULT_QUALITY, ge=1, le=95, description="Calidad si se redimensiona o recodifica"),
+    format: Optional[str] = Query(None, description="avif, webp, jpeg o png; con w y sin format se negocia con Accept"),
+):
+    """
+    Sirve la página desde la caché de imágenes en disco; solo la primera vez se descarga
+    del CDN. Responde con ETag fuerte, Cache-Control immutable, Range y 304.
+    Con `w` o `format` se sirve la variante transformada (ver /api/images/transform).
+    """
+    viewer_info = get_viewer_info(viewer_id)
+    if not viewer_info:
+        raise HTTPException(status_code=404, detail="Visor no encontrado")
     
-    return Response(
-        content=response.content,
-        media_type=response.headers.get('content-type', 'image/webp')
-    )
\ No newline at end of file
+    image_url = urljoin(viewer_info["dir_path"], filename)
+    referer = viewer_info["referer"]
+    def load():
+        return cached_image(image_url, lambda: fetch_page_image(image_url, referer))
+
+    meta = await load()
+    schedule_readahead(viewer_id, page_number)
+    if w or format:
+        return await transformed_response(request, meta, w, q, format)
+    return await image_response(request, meta, reload=load)
@@ -1,5 +1,5 @@
 # app/routers/mangas.py
-from fastapi import APIRouter, HTTPException, Query
+from fastapi import APIRouter, HTTPException, Query, Request
 from bs4 import BeautifulSoup
 import httpx
 import re
@@ -8,7 +8,10 @@ from urllib.parse import urljoin
 from playwright.async_api import async_playwright
 from typing import Optional, List, Dict, Any
 
-from app.core.cache import get_cached, set_cache  # tu caché síncrona
+from app.core.cache import get_cached, get_cached_entry, set_cache, memo_parse  # tu caché síncrona
+from app.core.responses import entry_response
+from app.utils.imagemeta import wants_image_meta, image_meta_response
+from app.utils.changes import manga_uploads
 from app.core.config import ZONATMO_BASE_URL, ZONATMO_HEADERS
 
 router = APIRouter()
@@ -323,9 +326,11 @@ def parse_elements(container) -> List[Dict]:
     return items
 
 
-async def find_tab_content_by_button_text_async(soup: BeautifulSoup, texts: List[str], force_refresh: bool = False):
+def find_tab_candidates(soup: BeautifulSoup, texts: List[str]) -> List[Dict]:
     """
-    Busca pestañas por texto de botón/enlace. Si necesita abrir una URL real, usa fetch_html_remote(..., force_refresh=force_refresh)
+    Busca pestañas por texto de botón/enlace y devuelve, en orden, las fuentes a probar:
+    - {"items": [...]} si el contenido está en la propia página (siempre es la última),
+    - {"url": "..."} si hay que abrir otra página.
     """
     texts_lower = [t.lower() for t in texts]
 
@@ -338,8 +343,8 @@ async def find_tab_content_by_button_text_async(soup: BeautifulSoup, texts: List
         low = txt.lower()
         return any(t in low for t in texts_lower)
 
-    candidates = soup.find_all(candidate_fn)
-    for tag in candidates:
+    out: List[Dict] = []
+    for tag in soup.find_all(candidate_fn):
         href = tag.get("href")
         data_target = tag.get("data-target")
         aria = tag.get("aria-controls")
@@ -353,23 +358,108 @@ async def find_tab_content_by_button_text_async(soup: BeautifulSoup, texts: List
         if target:
             node = soup.select_one(f"#{target}")
             if node:
-                return node
+                out.append({"items": parse_elements(node)})
+                return out
 
         if href and (href.startswith("/") or href.startswith("http")):
-            full = normalize_href(href)
-            try:
-                html = await fetch_html_remote(full, force_refresh=force_refresh)
-                return BeautifulSoup(html, "lxml")
-            except Exception:
-                continue
-    return None
+            out.append({"url": normalize_href(href)})
+    return out
+
+
+def parse_elements_html(html: str) -> List[Dict]:
+    return parse_elements(BeautifulSoup(html, "lxml"))
+
+
+async def resolve_tab_items(candidates: List[Dict], force_refresh: bool = False) -> List[Dict]:
+    """
+    Recorre las fuentes de find_tab_candidates; las remotas se abren con
+    fetch_html_remote(..., force_refresh=force_refresh).
+    """
+    for candidate in candidates:
+        if "items" in candidate:
+            return candidate["items"]
+        try:
+            html = await fetch_html_remote(candidate["url"], force_refresh=force_refresh)
+            return memo_parse("/api/mangas/home", parse_elements_html, html)
+        except Exception:
+            continue
+    return []
+
+
+def parse_ranking(container) -> List[Dict]:
+    items: List[Dict] = []
+    if not container:
+        return items
+    for row in container.select(".ranked-item"):
+        a = row.find("a", href=True)
+        pos = row.select_one(".position")
+        badge = row.select_one(".badge")
+        mtype = badge.get_text(strip=True).lower() if badge else None
+
+        items.append({
+            "position": int(pos.get_text(strip=True).replace(".", "")) if pos else None,
+            "title": a.get_text(strip=True) if a else None,
+            "url": normalize_href(a["href"]) if a else None,
+            "type": mtype
+        })
+    return items
+
+
+def parse_home(html: str) -> Dict:
+    """
+    Parte síncrona del home: todas las secciones de la página y, para las pestañas
+    seinen/josei, la lista de fuentes a resolver después.
+    """
+    soup = BeautifulSoup(html, "lxml")
+
+    # Populares
+    populares_general = parse_elements(soup.select_one("#pills-populars"))
+    # Trending
+    trending_general = parse_elements(soup.select_one("#pills-trending"))
+
+    # Últimos añadidos
+    header_added = soup.find(lambda t: t.name in ["h1", "h2", "h3"] and "añadid" in t.get_text(strip=True).lower())
+    container_added = header_added.find_next("div") if header_added else None
+
+    # Últimas subidas
+    header_uploaded = soup.find(lambda t: t.name in ["h1", "h2", "h3"] and "subida" in t.get_text(strip=True).lower())
+    container_uploaded = header_uploaded.find_next("div") if header_uploaded else None
+
+    return {
+        "populares_general": populares_general,
+        "trending_general": trending_general,
+        "tabs": {
+            "populares_seinen": find_tab_candidates(soup, ["p.seinen", "seinen"]),
+            "populares_josei": find_tab_candidates(soup, ["p.josei", "josei"]),
+            "trending_seinen": find_tab_candidates(soup, ["t.seinen", "seinen"]),
+            "trending_josei": find_tab_candidates(soup, ["t.josei", "josei"]),
+        },
+        "ultimos_anadidos": parse_elements(container_added),
+        "ultimas_subidas": parse_elements(container_uploaded),
+        # Top semanal / mensual
+        "top_semanal": parse_ranking(soup.select_one("#pills-weekly")),
+        "top_mensual": parse_ranking(soup.select_one("#pills-monthly")),
+    }
 
 
 # ===========================
 # Home (resumen completo)
 # ===========================
+async def fetch_home_page(force_refresh: bool = False) -> Dict:
+    """
+    Descarga y parsea la portada (sin resolver las pestañas) y pasa ultimas_subidas
+    al detector de novedades.
+    """
+    html = await fetch_html_remote(BASE_URL, force_refresh=force_refresh)
+    page = memo_parse("/api/mangas/home", parse_home, html)
+    manga_uploads.update(page["ultimas_subidas"])
+    return page
+
+
 @router.get("/home", summary="Resumen completo de mangas (home)")
 async def home(
+    request: Request,
+    include: str = Query(None, description="image_meta: añade tamaño, color medio y LQIP de cada imagen"),
     force_refresh: bool = Query(False, description="Forzar refresco y evitar caché (boolean)")
 ):
     """
@@ -382,86 +472,29 @@ async def home(
     - top_mensual
 
     Parámetros:
+    - include (query): "image_meta" añade a cada portada su tamaño, color medio y LQIP.
     - force_refresh (query boolean): si es True, se ignora la caché al obtener HTML remoto.
     """
-    html = await fetch_html_remote(BASE_URL, force_refresh=force_refresh)
-    soup = BeautifulSoup(html, "lxml")
-
-    # ======================
-    # Populares
-    # ======================
-    general_container = soup.select_one("#pills-populars")
-    populares_general = parse_elements(general_container)
-
-    seinen_container = await find_tab_content_by_button_text_async(soup, ["p.seinen", "seinen"], force_refresh=force_refresh)
-    josei_container = await find_tab_content_by_button_text_async(soup, ["p.josei", "josei"], force_refresh=force_refresh)
-
-    populares_seinen = parse_elements(seinen_container) if seinen_container else []
-    populares_josei = parse_elements(josei_container) if josei_container else []
-
-    # ======================
-    # Trending
-    # ======================
-    trending_container = soup.select_one("#pills-trending")
-    trending_general = parse_elements(trending_container)
-
-    t_seinen_container = await find_tab_content_by_button_text_async(soup, ["t.seinen", "seinen"], force_refresh=force_refresh)
-    t_josei_container = await find_tab_content_by_button_text_async(soup, ["t.josei", "josei"], force_refresh=force_refresh)
-
-    trending_seinen = parse_elements(t_seinen_container) if t_seinen_container else []
-    trending_josei = parse_elements(t_josei_container) if t_josei_container else []
-
-    # ======================
-    # Últimos añadidos
-    # ======================
-    header_added = soup.find(lambda t: t.name in ["h1", "h2", "h3"] and "añadid" in t.get_text(strip=True).lower())
-    container_added = header_added.find_next("div") if header_added else None
-    ultimos_anadidos = parse_elements(container_added)
-
-    # ======================
-    # Últimas subidas
-    # ======================
-    header_uploaded = soup.find(lambda t: t.name in ["h1", "h2", "h3"] and "subida" in t.get_text(strip=True).lower())
-    container_uploaded = header_uploaded.find_next("div") if header_uploaded else None
-    ultimas_subidas = parse_elements(container_uploaded)
-
-    # ======================
-    # Top semanal
-    # ======================
-    weekly = soup.select_one("#pills-weekly")
-    top_semanal: List[Dict] = []
-    if weekly:
-        for row in weekly.select(".ranked-item"):
-            a = row.find("a", href=True)
-            pos = row.select_one(".position")
-            badge = row.select_one(".badge")
-            mtype = badge.get_text(strip=True).lower() if badge else None
-
-            top_semanal.append({
-                "position": int(pos.get_text(strip=True).replace(".", "")) if pos else None,
-                "title": a.get_text(strip=True) if a else None,
-                "url": normalize_href(a["href"]) if a else None,
-                "type": mtype
-            })
-
-    # ======================
-    # Top mensual
-    # ======================
-    monthly = soup.select_one("#pills-monthly")
-    top_mensual: List[Dict] = []
-    if monthly:
-        for row in monthly.select(".ranked-item"):
-            a = row.find("a", href=True)
-            pos = row.select_one(".position")
-            badge = row.select_one(".badge")
-            mtype = badge.get_text(strip=True).lower() if badge else None
-
-            top_mensual.append({
-                "position": int(pos.get_text(strip=True).replace(".", "")) if pos else None,
-                "title": a.get_text(strip=True) if a else None,
-                "url": normalize_href(a["href"]) if a else None,
-                "type": mtype
-            })
+    meta = wants_image_meta(include)
+    if not force_refresh:
+        entry = get_cached_entry("mangas_home")
+        if entry is not None:
+            return await image_meta_response(entry["data"]) if meta else entry_response(request, entry)
+
+    page = await fetch_home_page(force_refresh=force_refresh)
+
+    tabs = page["tabs"]
+    populares_seinen = await resolve_tab_items(tabs["populares_seinen"], force_refresh=force_refresh)
+    populares_josei = await resolve_tab_items(tabs["populares_josei"], force_refresh=force_refresh)
+    trending_seinen = await resolve_tab_items(tabs["trending_seinen"], force_refresh=force_refresh)
+    trending_josei = await resolve_tab_items(tabs["trending_josei"], force_refresh=force_refresh)
+
+    populares_general = page["populares_general"]
+    trending_general = page["trending_general"]
+    ultimos_anadidos = page["ultimos_anadidos"]
+    ultimas_subidas = page["ultimas_subidas"]
+    top_semanal = page["top_semanal"]
+    top_mensual = page["top_mensual"]
 
     result = {
         "populares": {
@@ -480,7 +513,5 @@ async def home(
         "top_mensual": {"count": len(top_mensual), "items": top_mensual},
     }
 
-    return result
-    
-
-    return result
+    entry = set_cache("mangas_home", result)
+    return await image_meta_response(result) if meta else entry_response(request, entry)
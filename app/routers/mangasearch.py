@@ -1,15 +1,26 @@
-from fastapi import APIRouter, HTTPException, Query
+from fastapi import APIRouter, HTTPException, Query, Request
 from typing import Optional, List
 from pydantic import BaseModel
 from playwright.async_api import async_playwright
 from playwright.sync_api import sync_playwright
+from bs4 import BeautifulSoup
 import urllib.parse
 import re
+import asyncio
 import time
-from app.core.config import ZONATMO_HEADERS
+from app.core.config import ZONATMO_BASE_URL, ZONATMO_HEADERS, MANGA_LIBRARY_REFRESH
+from app.core.store import KVStore
+from app.core.cache import get_cached_entry, set_cache, load_once, prefetch
+from app.core.responses import JSONBytesResponse, entry_response, wants_ndjson, ndjson_response
+from app.utils.imagemeta import wants_image_meta, with_image_meta, image_meta_response
+from app.utils.mangalibrary import LIBRARY_ORDERS, manga_library
 
 router = APIRouter()
 
+# URL de búsqueda (página 1 de una combinación de filtros) -> cuándo se scrapeó;
+# caduca a los MANGA_LIBRARY_REFRESH segundos y entonces /library la vuelve a pedir
+library_refresh = KVStore("manga_library_refresh", MANGA_LIBRARY_REFRESH)
+
 # ----------------------------
 # Lista de proxies autenticados
 # Formato: IP:PUERTO:USUARIO:CONTRASEÑA
@@ -110,7 +121,7 @@ def build_url(
     query_params = {
         "order_item": order_item or "likes_count",
         "order_dir": order_dir or "desc",
-        "title": title or "",
+        "title": (title or "").strip(),
         "_pg": "1",
         "filter_by": filter_by,
         "type": type or "",
@@ -124,14 +135,69 @@ def build_url(
     }
     if page and page > 1:
         query_params["page"] = str(page)
+    # Listas ordenadas y sin repetir: la URL sirve también de clave de caché canónica
     if genres:
-        query_params["genders[]"] = [str(GENRE_TO_ID[g]) for g in genres]
+        query_params["genders[]"] = [str(GENRE_TO_ID[g]) for g in sorted(set(genres))]
     if exclude_genres:
-        query_params["exclude_genders[]"] = [str(GENRE_TO_ID[g]) for g in exclude_genres]
+        query_params["exclude_genders[]"] = [str(GENRE_TO_ID[g]) for g in sorted(set(exclude_genres))]
 
-    base_url = "https://zonatmo.com/library"
+    base_url = f"{ZONATMO_BASE_URL}/library"
     return f"{base_url}?{urllib.parse.urlencode(query_params, doseq=True)}"
 
+# ----------------------------
+# Extracción de tarjetas del listado
+# ----------------------------
+def parse_search_cards(html: str) -> List[MangaSearchResult]:
+    """
+    Extrae las tarjetas div.element del HTML ya renderizado de /library.
+    Se parsea el HTML completo de una vez en lugar de consultar cada campo por Playwright.
+    """
+    soup = BeautifulSoup(html, "lxml")
+    results: List[MangaSearchResult] = []
+    for card in soup.select("div.element"):
+        a_elem = card.select_one("a[href]")
+        manga_url = a_elem.get("href") if a_elem else "Unknown"
+
+        thumb = card.select_one("div.thumbnail.book")
+        if not thumb:
+            continue
+
+        title_elem = thumb.select_one("h4.text-truncate")
+        title_text = title_elem.get("title") if title_elem else "Unknown"
+
+        score_elem = thumb.select_one("span.score > span")
+        try:
+            score = float(score_elem.get_text().strip().replace(",", ".")) if score_elem else 0.0
+        except ValueError:
+            score = 0.0
+
+        type_elem = thumb.select_one("span.book-type")
+        type_text = type_elem.get_text(strip=True) if type_elem else "Unknown"
+
+        demography_elem = thumb.select_one("span.demography")
+        demography_text = demography_elem.get("title") if demography_elem else "Unknown"
+
+        erotic_tag = thumb.select_one("i[title='Erótico']")
+        is_erotic = erotic_tag is not None
+
+        image_url = "Unknown"
+        for style_tag in thumb.find_all("style"):
+            m = re.search(r"background-image:\s*url\(['\"]?(.*?)['\"]?\)", style_tag.get_text())
+            if m:
+                image_url = m.group(1).strip()
+                break
+
+        results.append(MangaSearchResult(
+            title=title_text,
+            score=score,
+            type=type_text,
+            demography=demography_text,
+            url=manga_url,
+            image_url=image_url,
+            is_erotic=is_erotic
+        ))
+    return results
+
 # ----------------------------
 # Scrape usando Playwright con proxies
 # ----------------------------
@@ -161,55 +227,8 @@ async def scrape(url: str) -> List[MangaSearchResult]:
                 await page.goto(url, timeout=20000)
                 await page.wait_for_timeout(5000)
 
-                cards = await page.query_selector_all("div.element")
-                if not cards:
-                    await browser.close()
-                    continue
-
-                for card in cards:
-                    a_elem = await card.query_selector("a[href]")
-                    manga_url = await a_elem.get_attribute("href") if a_elem else "Unknown"
-
-                    thumb = await card.query_selector("div.thumbnail.book")
-                    if not thumb:
-                        continue
-
-                    title_elem = await thumb.query_selector("h4.text-truncate")
-                    title_text = await title_elem.get_attribute("title") if title_elem else "Unknown"
-
-                    score_elem = await thumb.query_selector("span.score > span")
-                    try:
-                        score = float((await score_elem.inner_text()).strip().replace(",", ".")) if score_elem else 0.0
-                    except ValueError:
-                        score = 0.0
-
-                    type_elem = await thumb.query_selector("span.book-type")
-                    type_text = await type_elem.inner_text() if type_elem else "Unknown"
-
-                    demography_elem = await thumb.query_selector("span.demography")
-                    demography_text = await demography_elem.get_attribute("title") if demography_elem else "Unknown"
-
-                    erotic_tag = await thumb.query_selector("i[title='Erótico']")
-                    is_erotic = erotic_tag is not None
-
-                    styles = await thumb.query_selector_all("style")
-                    image_url = "Unknown"
-                    for style_tag in styles:
-                        m = re.search(r"background-image:\s*url\(['\"]?(.*?)['\"]?\)", await style_tag.inner_text())
-                        if m:
-                            image_url = m.group(1).strip()
-                            break
-
-                    results.append(MangaSearchResult(
-                        title=title_text,
-                        score=score,
-                        type=type_text,
-                        demography=demography_text,
-                        url=manga_url,
-                        image_url=image_url,
-                        is_erotic=is_erotic
-                    ))
-
+                html = await page.content()
+                results = parse_search_cards(html)
                 await browser.close()
                 if results:
                     break
@@ -219,11 +238,31 @@ async def scrape(url: str) -> List[MangaSearchResult]:
 
     return results
 
+def search_cache_key(url: str) -> str:
+    return f"search_{url}"
+
+def library_tags(status=None, genres=None, exclude_genres=None) -> dict:
+    # Lo que los filtros de la búsqueda garantizan de todos sus resultados
+    return {"status": status, "genres": genres or [], "exclude_genres": exclude_genres or []}
+
+async def scrape_entry(url: str, tags: Optional[dict] = None) -> dict:
+    """
+    Ejecuta la búsqueda y la guarda en caché y en la biblioteca local. Sin resultados
+    (o si fallaron todos los proxies) no se cachea: se devuelve una entrada suelta con la misma forma.
+    """
+    data = {"url": url, "results": await scrape(url)}
+    if not data["results"]:
+        return {"data": data, "body": None, "variants": {}}
+    await manga_library.add([r.model_dump() for r in data["results"]], tags or {})
+    await asyncio.to_thread(library_refresh.set, url, time.time())
+    return set_cache(search_cache_key(url), data)
+
 # ----------------------------
 # Endpoint GET /search
 # ----------------------------
 @router.get("/search", response_model=MangaSearchResponse)
 async def search_get(
+    request: Request,
     title: Optional[str] = Query(None),
     order_item: Optional[str] = Query(None),
     order_dir: Optional[str] = Query(None),
@@ -238,7 +277,9 @@ async def search_get(
     genres: Optional[List[str]] = Query(None),
     exclude_genres: Optional[List[str]] = Query(None),
     page: Optional[int] = Query(1),
-    filter_by: str = Query("title")
+    filter_by: str = Query("title"),
+    include: str = Query(None, description="image_meta: añade tamaño, color medio y LQIP de cada imagen"),
+    force_refresh: bool = Query(False)
 ):
     validate_query(order_item, order_dir, type, demography, status,
                    translation_status, webcomic, yonkoma, amateur,
@@ -246,5 +287,83 @@ async def search_get(
     url = build_url(title, order_item, order_dir, type, demography, status,
                     translation_status, webcomic, yonkoma, amateur, erotic,
                     genres, exclude_genres, page, filter_by)
-    results = await scrape(url)
-    return MangaSearchResponse(url=url, results=results)
+    key = search_cache_key(url)
+    tags = library_tags(status, genres, exclude_genres)
+    entry = None if force_refresh else get_cached_entry(key)
+    if entry is None:
+        entry = await load_once(key, lambda: scrape_entry(url, tags))
+
+    results = entry["data"]["results"]
+    if results:
+        next_url = build_url(title, order_item, order_dir, type, demography, status,
+                             translation_status, webcomic, yonkoma, amateur, erotic,
+                             genres, exclude_genres, (page or 1) + 1, filter_by)
+        prefetch(search_cache_key(next_url), lambda: scrape_entry(next_url, tags))
+
+    meta = wants_image_meta(include)
+    if wants_ndjson(request):
+        return ndjson_response((await with_image_meta(results))[0] if meta else results, headers={"X-Source-Url": url})
+    if meta:
+        return await image_meta_response(entry["data"])
+    # Los resultados ya se validaron al construirlos: se serializan directamente sin pasar
+    # otra vez por response_model (que se mantiene para la documentación OpenAPI)
+    return entry_response(request, entry)
+
+# ----------------------------
+# Endpoint GET /library (biblioteca local)
+# ----------------------------
+@router.get("/library", summary="Filtra la biblioteca local de mangas sin abrir el navegador")
+async def library_get(
+    request: Request,
+    title: Optional[str] = Query(None),
+    type: Optional[str] = Query(None),
+    demography: Optional[str] = Query(None),
+    status: Optional[str] = Query(None),
+    erotic: Optional[str] = Query(None),
+    genres: Optional[List[str]] = Query(None),
+    exclude_genres: Optional[List[str]] = Query(None),
+    order: str = Query("score", description=" | ".join(LIBRARY_ORDERS)),
+    order_dir: Optional[str] = Query(None),
+    offset: int = Query(0, ge=0),
+    limit: int = Query(24, ge=1, le=200),
+    refresh: bool = Query(False, description="Scrapear ya esta combinación de filtros y esperar al resultado"),
+):
+    """
+    Responde desde la biblioteca local (una ficha por obra, alimentada por /search)
+    intersecando bitsets por valor de filtro. Si la combinación de filtros no se ha
+    scrapeado en MANGA_LIBRARY_REFRESH segundos se refresca en segundo plano
+    (`stale: true`) o, con `refresh=true`, antes de responder.
+    Los géneros de cada obra se conocen por las búsquedas en que apareció.
+    """
+    validate_query(None, order_dir, type, demography, status, None, None, None, None,
+                   erotic, genres, exclude_genres, None, "title")
+    if order not in LIBRARY_ORDERS:
+        raise HTTPException(status_code=400, detail=f"Invalid order. Must be one of {LIBRARY_ORDERS}")
+
+    url = build_url(None, None, None, type, demography, status, None, None, None, None,
+                    erotic, genres, exclude_genres, 1, "title")
+    tags = library_tags(status, genres, exclude_genres)
+    refreshed = await asyncio.to_thread(library_refresh.get, url)
+    if refresh:
+        await load_once(search_cache_key(url), lambda: scrape_entry(url, tags))
+        refreshed = await asyncio.to_thread(library_refresh.get, url)
+    elif refreshed is None:
+        prefetch(search_cache_key(url), lambda: scrape_entry(url, tags))
+
+    total, results = manga_library.query(
+        type=type, demography=demography, status=status,
+        erotic=None if erotic is None else erotic == "true",
+        genres=sorted(set(genres or [])), exclude_genres=sorted(set(exclude_genres or [])),
+        title=title, order=order, order_dir=order_dir, offset=offset, limit=limit,
+    )
+    headers = {"X-Source-Url": url}
+    if wants_ndjson(request):
+        return ndjson_response(results, headers={**headers, "X-Total-Results": str(total)})
+    return JSONBytesResponse({
+        "total": total,
+        "offset": offset,
+        "limit": limit,
+        "stale": refreshed is None,
+        "refreshed": refreshed,
+        "results": results,
+    }, headers=headers)
@@ -0,0 +1,47 @@
+import asyncio
+from fastapi import APIRouter
+from app.core.cache import get_cache_stats, get_parse_stats, prefetch_stats
+from app.core.imagecache import get_image_cache_stats
+from app.utils.animeindex import anime_index
+from app.utils.changes import get_change_stats
+from app.utils.imagemeta import get_image_meta_stats
+from app.utils.mangalibrary import manga_library
+from app.routers.events import get_events_stats
+from app.routers.mangaimages import extract_stats, readahead_stats, viewer_stats, viewers
+
+router = APIRouter()
+
+@router.get("/stats", summary="Estadísticas internas de caché y parseo")
+async def get_stats():
+    """
+    - cache: aciertos/fallos globales de la caché en memoria.
+    - parse: por endpoint, cuántas páginas se parsearon y cuántas llegaron sin cambios
+      (mismo hash de contenido) y se sirvieron del memo de parseo.
+    - prefetch: páginas N+1 precargadas en segundo plano (y las omitidas por estar ya en caché).
+    - images: caché de imágenes en disco (aciertos, descargas, bytes y expulsiones LRU).
+    - readahead: páginas de capítulos precargadas, canceladas (el lector saltó) o abandonadas (lector parado).
+    - viewers: visores registrados, reutilizados (mismo capítulo), caducados y expulsados por LRU.
+    - image_meta: imágenes encoladas, procesadas y fallidas del trabajo de metadatos (include=image_meta).
+    - anime_index: animes en el índice local de /api/animes/search-local (con detalle) y su antigüedad.
+    - manga_library: obras en la biblioteca local de /api/mangas/library y bitsets del índice.
+    - extract: listas de imágenes de capítulos servidas del almacén o extraídas (y páginas del visor paginado descargadas).
+    - events: suscriptores de /api/events, eventos publicados, rezagados, reanudaciones y lecturas de las portadas.
+    - changes: novedades detectadas en cada lista de la portada y entradas de caché invalidadas/refrescadas por ellas.
+    """
+    # En el bucle de eventos ningún contador cambia mientras se copia; solo la consulta
+    # SQLite del índice de animes va a un hilo
+    anime_index_stats = await asyncio.to_thread(anime_index.stats)
+    return {
+        "cache": get_cache_stats(),
+        "parse": get_parse_stats(),
+        "prefetch": dict(prefetch_stats),
+        "images": get_image_cache_stats(),
+        "readahead": dict(readahead_stats),
+        "viewers": {**viewer_stats, "entries": len(viewers)},
+        "extract": dict(extract_stats),
+        "image_meta": get_image_meta_stats(),
+        "anime_index": anime_index_stats,
+        "manga_library": manga_library.stats(),
+        "changes": get_change_stats(),
+        "events": get_events_stats(),
+    }
@@ -0,0 +1,313 @@
+import os
+import re
+import sqlite3
+import threading
+import time
+from typing import List, Optional
+from app.core.config import DATA_DIR
+
+# Índice local del catálogo de animes (DATA_DIR/anime_index.sqlite3), alimentado por
+# cada página de catálogo y cada detalle que se descarga. El texto se busca con FTS5 y
+# el tokenizador trigram (subcadenas y tolerancia a erratas); los filtros se aprenden de
+# los datos del detalle y de los filtros de la consulta de catálogo que trajo cada anime.
+LOCAL_ORDERS = ["relevance", "title", "score", "year", "updated"]
+
+# El detalle trae el estado como número; se guarda con el nombre del filtro del catálogo
+# (1 es lo que traen los animes del horario de emisión)
+DETAIL_STATUS = {0: "finalizado", 1: "emision", 2: "proximamente"}
+
+
+def media_status(media: dict) -> Optional[str]:
+    """
+    Estado del detalle como valor de VALID_STATUS, o None si no se reconoce.
+    """
+    status = media.get("status")
+    if isinstance(status, str):
+        return status
+    return DETAIL_STATUS.get(status) if isinstance(status, int) else None
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS animes (
+    rowid INTEGER PRIMARY KEY,
+    id TEXT UNIQUE NOT NULL,
+    slug TEXT,
+    title TEXT NOT NULL DEFAULT '',
+    synopsis TEXT NOT NULL DEFAULT '',
+    cover TEXT,
+    category_id INTEGER,
+    category TEXT,
+    status TEXT,
+    year INTEGER,
+    score REAL,
+    updated REAL NOT NULL,
+    detail_updated REAL
+);
+CREATE INDEX IF NOT EXISTS animes_slug ON animes(slug);
+CREATE TABLE IF NOT EXISTS anime_genres (
+    anime_rowid INTEGER NOT NULL,
+    genre TEXT NOT NULL,
+    PRIMARY KEY (genre, anime_rowid)
+) WITHOUT ROWID;
+CREATE VIRTUAL TABLE IF NOT EXISTS animes_fts USING fts5(
+    title, synopsis, content='animes', content_rowid='rowid', tokenize='trigram'
+);
+CREATE TRIGGER IF NOT EXISTS animes_ai AFTER INSERT ON animes BEGIN
+    INSERT INTO animes_fts(rowid, title, synopsis) VALUES (new.rowid, new.title, new.synopsis);
+END;
+CREATE TRIGGER IF NOT EXISTS animes_ad AFTER DELETE ON animes BEGIN
+    INSERT INTO animes_fts(animes_fts, rowid, title, synopsis) VALUES ('delete', old.rowid, old.title, old.synopsis);
+END;
+CREATE TRIGGER IF NOT EXISTS animes_au AFTER UPDATE OF title, synopsis ON animes BEGIN
+    INSERT INTO animes_fts(animes_fts, rowid, title, synopsis) VALUES ('delete', old.rowid, old.title, old.synopsis);
+    INSERT INTO animes_fts(rowid, title, synopsis) VALUES (new.rowid, new.title, new.synopsis);
+END;
+"""
+
+# Los campos de filtro solo se sobrescriben con valores conocidos (COALESCE): una página
+# de catálogo sin filtro de estado no borra el estado aprendido de otra consulta.
+_UPSERT = """
+INSERT INTO animes (id, slug, title, synopsis, cover, category_id, category, status, year, score, updated)
+VALUES (:id, :slug, :title, :synopsis, :cover, :category_id, :category, :status, :year, :score, :updated)
+ON CONFLICT(id) DO UPDATE SET
+    slug = COALESCE(excluded.slug, slug),
+    title = CASE WHEN excluded.title != '' THEN excluded.title ELSE title END,
+    synopsis = CASE WHEN excluded.synopsis != '' THEN excluded.synopsis ELSE synopsis END,
+    cover = COALESCE(excluded.cover, cover),
+    category_id = COALESCE(excluded.category_id, category_id),
+    category = COALESCE(excluded.category, category),
+    status = COALESCE(excluded.status, status),
+    year = COALESCE(excluded.year, year),
+    score = COALESCE(excluded.score, score),
+    updated = excluded.updated
+"""
+
+_COLUMNS = "a.rowid, a.id, a.slug, a.title, a.synopsis, a.cover, a.category_id, a.category, a.status, a.year, a.score, a.updated, a.detail_updated"
+
+
+class AnimeIndex:
+    """
+    Catálogo local en SQLite. La conexión se abre en el primer uso y es segura entre hilos.
+    """
+
+    def __init__(self, name: str = "anime_index"):
+        self.name = name
+        self._conn = None
+        self._lock = threading.Lock()
+
+    def _db(self) -> sqlite3.Connection:
+        if self._conn is None:
+            os.makedirs(DATA_DIR, exist_ok=True)
+            conn = sqlite3.connect(os.path.join(DATA_DIR, f"{self.name}.sqlite3"), check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(_SCHEMA)
+            self._conn = conn
+        return self._conn
+
+    def _set_genres(self, db, anime_ids: list, genres: list, replace: bool):
+        rowids = [r[0] for r in db.execute(
+            f"SELECT rowid FROM animes WHERE id IN ({','.join('?' * len(anime_ids))})", anime_ids
+        )]
+        if replace:
+            db.executemany("DELETE FROM anime_genres WHERE anime_rowid = ?", [(r,) for r in rowids])
+        db.executemany(
+            "INSERT OR IGNORE INTO anime_genres (anime_rowid, genre) VALUES (?, ?)",
+            [(r, g) for r in rowids for g in genres],
+        )
+
+    def index_catalog(self, animes: list, query: dict):
+        """
+        Guarda una página de catálogo. Lo que se sabe por los filtros de la consulta
+        (un solo estado, categoría o año; los géneros pedidos) se anota en cada anime.
+        """
+        rows = [a for a in animes if a.get("id")]
+        if not rows:
+            return
+        categories = query.get("category") or []
+        min_year, max_year = query.get("min_year"), query.get("max_year")
+        tags = {
+            "category": categories[0] if len(categories) == 1 else None,
+            "status": query.get("status"),
+            "year": min_year if min_year and min_year == max_year else None,
+        }
+        now = time.time()
+        with self._lock:
+            db = self._db()
+            with db:
+                db.executemany(_UPSERT, [{
+                    "id": str(a["id"]),
+                    "slug": a.get("slug"),
+                    "title": a.get("title") or "",
+                    "synopsis": a.get("synopsis") or "",
+                    "cover": a.get("cover"),
+                    "category_id": a.get("categoryId"),
+                    "score": None,
+                    "updated": now,
+                    **tags,
+                } for a in rows])
+                if query.get("genre"):
+                    self._set_genres(db, [str(a["id"]) for a in rows], query["genre"], replace=False)
+
+    def index_detail(self, media: dict):
+        """
+        Guarda el detalle de un anime; sus géneros sustituyen a los aprendidos del catálogo.
+        """
+        if media.get("id") is None:
+            return
+        anime_id = str(media["id"])
+        year = media.get("year") or media.get("startDate")
+        if isinstance(year, str):
+            m = re.match(r"\d{4}", year)
+            year = int(m.group()) if m else None
+        now = time.time()
+        with self._lock:
+            db = self._db()
+            with db:
+                db.execute(_UPSERT, {
+                    "id": anime_id,
+                    "slug": media.get("slug"),
+                    "title": media.get("title") or "",
+                    "synopsis": media.get("synopsis") or "",
+                    "cover": None,
+                    "category_id": media.get("categoryId"),
+                    "category": None,
+                    "status": media_status(media),
+                    "year": year if isinstance(year, int) else None,
+                    "score": media.get("score"),
+                    "updated": now,
+                })
+                db.execute("UPDATE animes SET detail_updated = ? WHERE id = ?", (now, anime_id))
+                genres = [g.get("slug") for g in media.get("genres") or [] if isinstance(g, dict) and g.get("slug")]
+                if genres:
+                    self._set_genres(db, [anime_id], genres, replace=True)
+
+    def search(
+        self,
+        q: Optional[str] = None,
+        genre: Optional[List[str]] = None,
+        category: Optional[List[str]] = None,
+        status: Optional[str] = None,
+        min_year: Optional[int] = None,
+        max_year: Optional[int] = None,
+        order: Optional[str] = None,
+        offset: int = 0,
+        limit: int = 20,
+    ) -> dict:
+        """
+        {"total", "results", "fuzzy"}. Con `q` se buscan primero subcadenas exactas en título
+        y sinopsis; si no hay ninguna, cualquier trigrama de `q` (tolera erratas), por relevancia.
+        """
+        where, params = [], []
+        if genre:
+            where.append(
+                f"a.rowid IN (SELECT anime_rowid FROM anime_genres WHERE genre IN ({','.join('?' * len(genre))})"
+                " GROUP BY anime_rowid HAVING COUNT(*) = ?)"
+            )
+            params += [*genre, len(genre)]
+        if category:
+            where.append(f"a.category IN ({','.join('?' * len(category))})")
+            params += category
+        if status:
+            where.append("a.status = ?")
+            params.append(status)
+        if min_year:
+            where.append("a.year >= ?")
+            params.append(min_year)
+        if max_year:
+            where.append("a.year <= ?")
+            params.append(max_year)
+
+        order = order or ("relevance" if q else "title")
+        with self._lock:
+            db = self._db()
+            fuzzy = False
+            if q and len(q) >= 3:
+                phrase = '"' + q.replace('"', '""') + '"'
+                total, rows = self._query(db, where, params, phrase, order, offset, limit)
+                if total == 0 and len(q) > 3:
+                    trigrams = {q[i:i + 3].lower() for i in range(len(q) - 2)}
+                    match = " OR ".join('"' + t.replace('"', '""') + '"' for t in trigrams)
+                    total, rows = self._query(db, where, params, match, order, offset, limit)
+                    fuzzy = True
+            elif q:
+                # El trigrama necesita 3 caracteres; las búsquedas más cortas van por LIKE
+                escaped = q.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+                total, rows = self._query(
+                    db, where + ["(a.title LIKE ? ESCAPE '\\' OR a.synopsis LIKE ? ESCAPE '\\')"],
+                    params + [f"%{escaped}%"] * 2, None, order, offset, limit,
+                )
+            else:
+                total, rows = self._query(db, where, params, None, order, offset, limit)
+            genres = self._genres(db, [r[0] for r in rows])
+        return {"total": total, "fuzzy": fuzzy, "results": [self._row(r, genres.get(r[0], [])) for r in rows]}
+
+    def _query(self, db, where, params, match, order, offset, limit):
+        joins, clauses, args = "", list(where), list(params)
+        if match:
+            joins = "JOIN animes_fts f ON f.rowid = a.rowid"
+            clauses.insert(0, "animes_fts MATCH ?")
+            args.insert(0, match)
+        sql_where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        order_by = {
+            "relevance": "bm25(animes_fts)" if match else "a.title COLLATE NOCASE",
+            "title": "a.title COLLATE NOCASE",
+            "score": "a.score IS NULL, a.score DESC",
+            "year": "a.year IS NULL, a.year DESC",
+            "updated": "a.updated DESC",
+        }[order]
+        total = db.execute(f"SELECT COUNT(*) FROM animes a {joins} {sql_where}", args).fetchone()[0]
+        rows = db.execute(
+            f"SELECT {_COLUMNS} FROM animes a {joins} {sql_where} ORDER BY {order_by}, a.rowid LIMIT ? OFFSET ?",
+            (*args, limit, offset),
+        ).fetchall()
+        return total, rows
+
+    def _genres(self, db, rowids: list) -> dict:
+        out = {}
+        if rowids:
+            for rowid, genre in db.execute(
+                f"SELECT anime_rowid, genre FROM anime_genres WHERE anime_rowid IN ({','.join('?' * len(rowids))}) ORDER BY genre",
+                rowids,
+            ):
+                out.setdefault(rowid, []).append(genre)
+        return out
+
+    @staticmethod
+    def _row(r, genres: list) -> dict:
+        now = time.time()
+        return {
+            "id": r[1],
+            "slug": r[2],
+            "title": r[3],
+            "synopsis": r[4],
+            "cover": r[5],
+            "categoryId": r[6],
+            "category": r[7],
+            "status": r[8],
+            "year": r[9],
+            "score": r[10],
+            "genres": genres,
+            # Frescura: cuándo se vio por última vez en el catálogo/detalle y hace cuánto
+            "updated": r[11],
+            "detail_updated": r[12],
+            "age": round(now - r[11]),
+        }
+
+    def status_of(self, slug: str) -> Optional[str]:
+        """
+        Estado aprendido del catálogo ("emision", "finalizado"...) o None si no se conoce.
+        """
+        with self._lock:
+            row = self._db().execute("SELECT status FROM animes WHERE slug = ?", (slug,)).fetchone()
+        return row[0] if row else None
+
+    def stats(self) -> dict:
+        with self._lock:
+            db = self._db()
+            count, oldest, newest, details = db.execute(
+                "SELECT COUNT(*), MIN(updated), MAX(updated), COUNT(detail_updated) FROM animes"
+            ).fetchone()
+        return {"animes": count, "with_detail": details, "oldest": oldest, "newest": newest}
+
+
+anime_index = AnimeIndex()
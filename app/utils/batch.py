@@ -0,0 +1,61 @@
+import asyncio
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+from fastapi import HTTPException
+from app.core.cache import dumps, serialized_body
+from app.core.config import BATCH_MAX_ITEMS, BATCH_CONCURRENCY
+
+
+def check_batch(keys: List[str], name: str, max_items: int = BATCH_MAX_ITEMS) -> List[str]:
+    """
+    Valida el tamaño del lote y devuelve las claves sin repetir, en el orden recibido.
+    """
+    if not keys:
+        raise HTTPException(status_code=400, detail=f"{name} no puede estar vacío")
+    if len(keys) > max_items:
+        raise HTTPException(status_code=400, detail=f"Máximo {max_items} elementos en {name}")
+    return list(dict.fromkeys(keys))
+
+
+async def gather_entries(
+    keys: List[str],
+    load: Callable[[str], Awaitable[dict]],
+    lookup: Optional[Callable[[str], Optional[dict]]] = None,
+    concurrency: int = BATCH_CONCURRENCY,
+) -> Tuple[Dict[str, dict], Dict[str, str]]:
+    """
+    Resuelve cada clave a su valor (p. ej. una entrada de caché): primero `lookup` (aciertos, sin esperar),
+    luego `load` para los fallos con como mucho `concurrency` descargas a la vez.
+    Los errores de cada clave se devuelven aparte sin cortar el resto del lote.
+    """
+    entries, errors = {}, {}
+    misses = []
+    for key in keys:
+        entry = lookup(key) if lookup else None
+        if entry is not None:
+            entries[key] = entry
+        else:
+            misses.append(key)
+
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(key):
+        async with semaphore:
+            try:
+                entries[key] = await load(key)
+            except HTTPException as e:
+                errors[key] = e.detail
+            except Exception as e:
+                errors[key] = str(e)
+
+    await asyncio.gather(*(one(key) for key in misses))
+    return entries, errors
+
+
+def batch_body(keys: List[str], entries: Dict[str, dict], errors: Dict[str, str]) -> bytes:
+    """
+    {"results": {clave: datos}, "errors": {clave: detalle}} reutilizando los bytes ya
+    serializados de cada entrada de caché en lugar de volver a serializar los datos.
+    """
+    results = b",".join(dumps(key) + b":" + serialized_body(entries[key]) for key in keys if key in entries)
+    failed = {key: errors[key] for key in keys if key in errors}
+    return b'{"results":{' + results + b'},"errors":' + dumps(failed) + b"}"
@@ -0,0 +1,124 @@
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from app.core.cache import invalidate, load_once
+from app.core.config import CHANGE_SEEN_MAX
+
+logger = logging.getLogger(__name__)
+
+# Detector de novedades de la portada. Cada lista (últimos episodios, últimos animes,
+# últimas subidas de manga) recuerda las claves que ya vio; con cada snapshot nuevo
+# avisa a sus oyentes solo de lo que no estaba, y ellos invalidan o refrescan las
+# entradas de caché afectadas en lugar de esperar a que venza su TTL.
+change_stats = {"invalidated": 0, "refreshed": 0, "refresh_failed": 0}
+refresh_tasks = set()
+
+
+class ChangeFeed:
+    """
+    Diferencias entre snapshots sucesivos de una lista. El primero solo sirve de
+    referencia; `key(item)` identifica cada elemento (None = se ignora).
+    """
+
+    def __init__(self, name: str, key):
+        self.name = name
+        self.key = key
+        self.seen = OrderedDict()
+        self.primed = False
+        self.last = None
+        self.listeners = []
+        self.stats = {"snapshots": 0, "changes": 0, "last_change": None}
+
+    def subscribe(self, listener):
+        """
+        Registra listener(nuevos); se puede usar como decorador.
+        """
+        self.listeners.append(listener)
+        return listener
+
+    def diff(self, items: list) -> list:
+        new = []
+        for item in items:
+            key = self.key(item)
+            if key is None:
+                continue
+            if key in self.seen:
+                self.seen.move_to_end(key)
+            else:
+                self.seen[key] = True
+                new.append(item)
+        while len(self.seen) > CHANGE_SEEN_MAX:
+            self.seen.popitem(last=False)
+        if not self.primed:
+            self.primed = bool(self.seen)
+            return []
+        return new
+
+    def update(self, items: list) -> list:
+        """
+        Compara `items` con lo visto y avisa de lo nuevo. Devuelve los elementos nuevos.
+        """
+        # memo_parse devuelve el mismo objeto si la página no cambió: nada que comparar
+        if items is self.last:
+            return []
+        self.last = items
+        self.stats["snapshots"] += 1
+        new = self.diff(items)
+        if new:
+            self.stats["changes"] += len(new)
+            self.stats["last_change"] = time.time()
+            for listener in self.listeners:
+                try:
+                    listener(new)
+                except Exception as e:
+                    logger.warning(f"[CHANGES] {self.name}: {e}")
+        return new
+
+
+def _episode_key(ep: dict):
+    slug = (ep.get("media") or {}).get("slug")
+    return (slug, ep.get("number")) if slug else None
+
+
+def _upload_key(item: dict):
+    return (item["url"], item.get("chapter")) if item.get("url") else None
+
+
+anime_episodes = ChangeFeed("anime_episodes", _episode_key)
+anime_media = ChangeFeed("anime_media", lambda item: item.get("slug"))
+manga_uploads = ChangeFeed("manga_uploads", _upload_key)
+FEEDS = [anime_episodes, anime_media, manga_uploads]
+
+
+def _refresh_done(task):
+    refresh_tasks.discard(task)
+    if task.cancelled():
+        return
+    # Un fallo puede llegar como excepción o como el dict {"error": ...} del parser
+    error = task.exception()
+    if error is None and isinstance(task.result(), dict) and "error" in task.result():
+        error = task.result()["error"]
+    if error is None:
+        change_stats["refreshed"] += 1
+    else:
+        change_stats["refresh_failed"] += 1
+        logger.warning(f"[CHANGES] Falló el refresco: {error}")
+
+
+def invalidate_keys(keys: list, refresh_key=None, loader=None):
+    """
+    Quita `keys` de la caché. Si `refresh_key` estaba cacheada (alguien la consulta),
+    se vuelve a cargar en segundo plano con loader() en lugar de esperar a otra petición.
+    No depende de PREFETCH_NEXT_PAGE: solo se cuentan los refrescos que terminan bien.
+    """
+    dropped = [key for key in keys if invalidate(key)]
+    change_stats["invalidated"] += len(dropped)
+    if refresh_key in dropped and loader is not None:
+        task = asyncio.ensure_future(load_once(refresh_key, loader))
+        refresh_tasks.add(task)
+        task.add_done_callback(_refresh_done)
+
+
+def get_change_stats() -> dict:
+    return {**change_stats, **{feed.name: {**feed.stats, "seen": len(feed.seen)} for feed in FEEDS}}
@@ -0,0 +1,149 @@
+import asyncio
+import logging
+import time
+from urllib.parse import urlsplit
+from app.core.responses import JSONBytesResponse
+from app.core.config import IMAGE_META_TTL, IMAGE_META_CONCURRENCY, IMAGE_META_QUEUE_MAX, IMAGE_META_RETRY
+from app.core.store import KVStore
+from app.utils.imaging import fetch_source_image, is_allowed_host, placeholder, run_in_pool
+
+logger = logging.getLogger(__name__)
+
+# Campos de las respuestas que apuntan a una imagen; el resultado va en "<campo>_meta"
+IMAGE_FIELDS = ("image_url", "cover", "poster", "backdrop", "image")
+
+# URL de la imagen -> {"width", "height", "color", "lqip"}; persiste entre reinicios
+image_meta = KVStore("image_meta", IMAGE_META_TTL)
+image_meta_stats = {"queued": 0, "computed": 0, "failed": 0, "dropped": 0}
+
+# Cola del trabajo en segundo plano: cada URL se descarga una sola vez aunque se pida
+# desde muchas respuestas; las que fallan esperan IMAGE_META_RETRY antes de reintentarse.
+_queue = None
+_workers = []
+pending = set()
+failed = {}
+
+
+def wants_image_meta(include) -> bool:
+    return bool(include) and "image_meta" in (i.strip() for i in include.split(","))
+
+
+def _is_image_url(value) -> bool:
+    # Solo las de hosts permitidos: las demás nunca se descargan ni cuentan como pendientes
+    return (isinstance(value, str) and value.startswith(("http://", "https://"))
+            and is_allowed_host(urlsplit(value).hostname))
+
+
+def _plain(data):
+    # Los resultados de búsqueda de mangas se cachean como modelos pydantic
+    return data.model_dump() if hasattr(data, "model_dump") else data
+
+
+def collect_image_urls(data, urls: set):
+    data = _plain(data)
+    if isinstance(data, dict):
+        for key, value in data.items():
+            if key in IMAGE_FIELDS and _is_image_url(value):
+                urls.add(value)
+            elif not isinstance(value, str):
+                collect_image_urls(value, urls)
+    elif isinstance(data, list):
+        for item in data:
+            collect_image_urls(item, urls)
+    return urls
+
+
+def _enrich(data, metas: dict):
+    # Copia con "<campo>_meta" añadido: los datos de entrada vienen de la caché y no se tocan
+    data = _plain(data)
+    if isinstance(data, dict):
+        out = {}
+        for key, value in data.items():
+            out[key] = value if isinstance(value, str) else _enrich(value, metas)
+            if key in IMAGE_FIELDS and isinstance(value, str) and value in metas:
+                out[f"{key}_meta"] = metas[value]
+        return out
+    if isinstance(data, list):
+        return [_enrich(item, metas) for item in data]
+    return data
+
+
+async def with_image_meta(data):
+    """
+    (copia de `data` con los metadatos ya calculados, URLs aún pendientes). Las que
+    faltan se encolan para el trabajo en segundo plano y aparecerán en peticiones posteriores.
+    """
+    urls = collect_image_urls(data, set())
+    metas = await asyncio.to_thread(image_meta.get_many, list(urls)) if urls else {}
+    missing = [u for u in urls if u not in metas]
+    queue_image_meta(missing)
+    return _enrich(data, metas), len(missing)
+
+
+async def with_image_meta_stream(items):
+    # Para respuestas NDJSON que se generan según llegan las páginas
+    async for item in items:
+        yield (await with_image_meta(item))[0]
+
+
+async def image_meta_response(data, headers: dict = None) -> JSONBytesResponse:
+    """
+    Respuesta JSON con los metadatos de imagen añadidos. X-Image-Meta-Pending indica
+    cuántas imágenes siguen en cola (volver a pedir más tarde para tenerlas).
+    """
+    enriched, missing = await with_image_meta(data)
+    return JSONBytesResponse(enriched, headers={**(headers or {}), "X-Image-Meta-Pending": str(missing)})
+
+
+def queue_image_meta(urls):
+    global _queue
+    if not urls:
+        return
+    if _queue is None:
+        _queue = asyncio.Queue()
+    now = time.monotonic()
+    if len(failed) > IMAGE_META_QUEUE_MAX:
+        for url, t in list(failed.items()):
+            if now - t >= IMAGE_META_RETRY:
+                del failed[url]
+    for url in urls:
+        if url in pending or now - failed.get(url, -IMAGE_META_RETRY) < IMAGE_META_RETRY:
+            continue
+        if len(pending) >= IMAGE_META_QUEUE_MAX:
+            image_meta_stats["dropped"] += 1
+            continue
+        pending.add(url)
+        _queue.put_nowait(url)
+        image_meta_stats["queued"] += 1
+    while len(_workers) < IMAGE_META_CONCURRENCY:
+        _workers.append(asyncio.create_task(_worker()))
+
+
+async def _worker():
+    while True:
+        url = await _queue.get()
+        try:
+            content, _ = await fetch_source_image(url)
+            await asyncio.to_thread(image_meta.set, url, await run_in_pool(placeholder, content))
+            failed.pop(url, None)
+            image_meta_stats["computed"] += 1
+        except Exception as e:
+            # Cualquier fallo (descarga, imagen corrupta...) se anota y el trabajador sigue
+            failed[url] = time.monotonic()
+            image_meta_stats["failed"] += 1
+            logger.warning(f"[IMAGE META] {url}: {e}")
+        finally:
+            pending.discard(url)
+
+
+def stop_image_meta():
+    global _queue
+    for task in _workers:
+        task.cancel()
+    _workers.clear()
+    pending.clear()
+    _queue = None
+
+
+def get_image_meta_stats() -> dict:
+    return {**image_meta_stats, "pending": len(pending)}
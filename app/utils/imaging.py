@@ -0,0 +1,144 @@
+import asyncio
+import base64
+import io
+from concurrent.futures import ProcessPoolExecutor
+from PIL import Image, features
+from fastapi import HTTPException
+from typing import Optional
+from urllib.parse import urlsplit
+from app.core.config import BASE_URL, ZONATMO_BASE_URL, IMAGE_ALLOWED_HOSTS, IMAGE_WORKERS, LQIP_WIDTH
+from app.core.http import get_client, get_with_retries
+from app.core.imagecache import cached_image, read_blob
+
+# Por orden de preferencia si el cliente acepta varios
+OUTPUT_FORMATS = {
+    "avif": ("AVIF", "image/avif"),
+    "webp": ("WEBP", "image/webp"),
+    "jpeg": ("JPEG", "image/jpeg"),
+    "png": ("PNG", "image/png"),
+}
+SUPPORTED_OUTPUTS = [f for f in ("avif", "webp") if features.check(f)] + ["jpeg", "png"]
+
+_pool = None
+
+# Además de los configurados, los hosts de las webs de origen (y sus subdominios)
+ALLOWED_HOSTS = {h.lower() for h in IMAGE_ALLOWED_HOSTS} | {
+    urlsplit(u).hostname for u in (BASE_URL, ZONATMO_BASE_URL) if urlsplit(u).hostname
+}
+
+
+def is_allowed_host(host: Optional[str]) -> bool:
+    host = (host or "").lower()
+    return any(host == h or host.endswith("." + h) for h in ALLOWED_HOSTS)
+
+
+def images_client():
+    return get_client("images", timeout=30.0, follow_redirects=True)
+
+
+async def fetch_source_image(url: str):
+    parts = urlsplit(url)
+    headers = {"Referer": f"{parts.scheme}://{parts.netloc}/"}
+    response = await get_with_retries(images_client(), url, headers=headers)
+    if response.status_code != 200:
+        raise HTTPException(status_code=400, detail=f"No se pudo obtener la imagen: Código de estado {response.status_code}")
+    content_type = response.headers.get("content-type", "")
+    if not content_type.startswith("image/"):
+        raise HTTPException(status_code=400, detail=f"La URL no es una imagen: {content_type or 'sin Content-Type'}")
+    return response.content, content_type
+
+
+def check_image_format(fmt):
+    if fmt and fmt not in SUPPORTED_OUTPUTS:
+        raise HTTPException(status_code=400, detail=f"Format inválido. Opciones: {SUPPORTED_OUTPUTS}")
+
+
+def negotiate_image_format(accept: str, source_type: str) -> str:
+    """
+    AVIF o WebP si el cliente los acepta (y Pillow los soporta); si no, PNG para
+    orígenes que pueden traer transparencia y JPEG para el resto.
+    """
+    accept = accept or ""
+    for fmt in ("avif", "webp"):
+        if fmt in SUPPORTED_OUTPUTS and f"image/{fmt}" in accept:
+            return fmt
+    return "png" if source_type in ("image/png", "image/gif") else "jpeg"
+
+
+def transform(data: bytes, width, quality: int, fmt: str):
+    """
+    Redimensiona a `width` (sin ampliar, manteniendo proporción) y codifica en `fmt`.
+    Se ejecuta en el pool de procesos: solo recibe y devuelve bytes.
+    """
+    with Image.open(io.BytesIO(data)) as img:
+        img.load()
+        if width and width < img.width:
+            img = img.resize((width, max(1, round(img.height * width / img.width))), Image.LANCZOS)
+        pil_format, content_type = OUTPUT_FORMATS[fmt]
+        if pil_format == "JPEG" and img.mode not in ("RGB", "L"):
+            img = img.convert("RGB")
+        elif img.mode not in ("RGB", "RGBA", "L", "LA"):
+            img = img.convert("RGBA" if "transparency" in img.info else "RGB")
+        out = io.BytesIO()
+        options = {"optimize": True} if pil_format == "PNG" else {"quality": quality}
+        img.save(out, pil_format, **options)
+        return out.getvalue(), content_type
+
+
+def placeholder(data: bytes) -> dict:
+    """
+    Tamaño real, color medio y una miniatura LQIP (WebP de LQIP_WIDTH px en data URI)
+    para reservar el hueco y pintar algo mientras llega la imagen.
+    """
+    with Image.open(io.BytesIO(data)) as img:
+        width, height = img.size
+        # En JPEG decodifica directamente a una escala reducida
+        img.draft("RGB", (LQIP_WIDTH * 4, LQIP_WIDTH * 4))
+        thumb = img.convert("RGB")
+        thumb.thumbnail((LQIP_WIDTH, LQIP_WIDTH * 4))
+    r, g, b = thumb.resize((1, 1), Image.BOX).getpixel((0, 0))
+    out = io.BytesIO()
+    thumb.save(out, "WEBP", quality=40)
+    return {
+        "width": width,
+        "height": height,
+        "color": f"#{r:02x}{g:02x}{b:02x}",
+        "lqip": "data:image/webp;base64," + base64.b64encode(out.getvalue()).decode("ascii"),
+    }
+
+
+def get_pool() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(max_workers=IMAGE_WORKERS)
+    return _pool
+
+
+async def run_in_pool(func, *args):
+    return await asyncio.get_running_loop().run_in_executor(get_pool(), func, *args)
+
+
+def shutdown_pool():
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+async def image_variant(source: dict, width, quality: int, fmt: str) -> dict:
+    """
+    Metadatos de la variante (ancho, calidad, formato) de una imagen ya cacheada.
+    Cada variante se guarda en la caché de imágenes con una clave derivada del digest
+    del original, así que Pillow solo trabaja la primera vez que se pide.
+    """
+    key = f"variant:{source['digest']}|w={width or ''}|q={quality}|f={fmt}"
+
+    async def fetch():
+        data = await asyncio.to_thread(read_blob, source["digest"])
+        try:
+            return await run_in_pool(transform, data, width, quality, fmt)
+        except OSError as e:
+            # Pillow lanza UnidentifiedImageError (subclase de OSError) si no es una imagen
+            raise HTTPException(status_code=422, detail=f"No se pudo transformar la imagen: {e}")
+
+    return await cached_image(key, fetch)
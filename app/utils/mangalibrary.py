@@ -0,0 +1,164 @@
+import asyncio
+import time
+from typing import List, Optional
+from app.core.config import MANGA_LIBRARY_TTL
+from app.core.store import KVStore
+
+LIBRARY_ORDERS = ["score", "title"]
+
+
+def normalize_value(value: Optional[str]) -> Optional[str]:
+    # "ONE SHOT" -> "one_shot", "Seinen" -> "seinen": mismos valores que los filtros
+    return value.strip().lower().replace(" ", "_") if value and value != "Unknown" else None
+
+
+class MangaLibrary:
+    """
+    Una ficha por obra (clave = URL) con un bitset por valor de filtro: cada obra tiene
+    un número y el bit n de ("genre", "action") indica si la obra n es de acción. Los
+    bitsets son enteros de Python, así que combinar filtros es un & / ~ y contar es bit_count().
+    Las fichas persisten en un KVStore y los bitsets se reconstruyen al cargar (load(),
+    que la app ejecuta en un hilo al arrancar); las escrituras al almacén van a un hilo.
+    """
+
+    def __init__(self, name: str):
+        self.store = KVStore(name, MANGA_LIBRARY_TTL)
+        self.records = []   # número -> ficha
+        self.numbers = {}   # url -> número
+        self.bits = {}      # (campo, valor) -> bitset
+        self.all = 0
+        self._orders = None
+        self._loaded = False
+
+    def load(self):
+        """
+        Lee todas las fichas del almacén (una vez). Lento con muchas obras: llamarlo
+        con asyncio.to_thread antes de servir peticiones.
+        """
+        if self._loaded:
+            return
+        for record in self.store.items().values():
+            self._put(record)
+        self._loaded = True
+
+    @staticmethod
+    def _keys(record: dict):
+        for field in ("type", "demography", "status"):
+            if record.get(field):
+                yield field, record[field]
+        yield "erotic", bool(record.get("is_erotic"))
+        for genre in record.get("genres", []):
+            yield "genre", genre
+
+    def _put(self, record: dict):
+        n = self.numbers.get(record["url"])
+        if n is None:
+            n = self.numbers[record["url"]] = len(self.records)
+            self.records.append(record)
+            self.all |= 1 << n
+        else:
+            mask = ~(1 << n)
+            for key in self._keys(self.records[n]):
+                self.bits[key] &= mask
+            self.records[n] = record
+        bit = 1 << n
+        for key in self._keys(record):
+            self.bits[key] = self.bits.get(key, 0) | bit
+        self._orders = None
+
+    async def add(self, results: list, tags: dict):
+        """
+        Incorpora las tarjetas de una búsqueda. `tags` es lo que la consulta garantiza de
+        todos sus resultados: status, genres (incluidos) y exclude_genres (excluidos).
+        Lo que no se conoce se conserva de visitas anteriores.
+        """
+        self.load()
+        now = time.time()
+        changed = {}
+        for card in results:
+            if not card.get("url") or card["url"] == "Unknown":
+                continue
+            n = self.numbers.get(card["url"])
+            old = self.records[n] if n is not None else {}
+            genres = (set(old.get("genres", [])) | set(tags.get("genres") or [])) - set(tags.get("exclude_genres") or [])
+            record = {
+                "url": card["url"],
+                "title": card.get("title") or old.get("title"),
+                "score": card.get("score") or 0.0,
+                "type": normalize_value(card.get("type")) or old.get("type"),
+                "demography": normalize_value(card.get("demography")) or old.get("demography"),
+                "status": tags.get("status") or old.get("status"),
+                "is_erotic": bool(card.get("is_erotic")),
+                "image_url": card.get("image_url") or old.get("image_url"),
+                "genres": sorted(genres),
+                "updated": now,
+            }
+            self._put(record)
+            changed[record["url"]] = record
+        if changed:
+            await asyncio.to_thread(self.store.set_many, changed)
+
+    def _order(self, order: str) -> list:
+        if self._orders is None:
+            numbers = range(len(self.records))
+            self._orders = {
+                "score": sorted(numbers, key=lambda n: (-self.records[n]["score"], self.records[n]["title"] or "")),
+                "title": sorted(numbers, key=lambda n: (self.records[n]["title"] or "").lower()),
+            }
+        return self._orders[order]
+
+    def query(
+        self,
+        type: Optional[str] = None,
+        demography: Optional[str] = None,
+        status: Optional[str] = None,
+        erotic: Optional[bool] = None,
+        genres: Optional[List[str]] = None,
+        exclude_genres: Optional[List[str]] = None,
+        title: Optional[str] = None,
+        order: str = "score",
+        order_dir: Optional[str] = None,
+        offset: int = 0,
+        limit: int = 24,
+    ):
+        """
+        (total, fichas de la página). Los géneros incluidos deben estar todos; los
+        excluidos se comparan con los géneros conocidos de cada obra.
+        """
+        self.load()
+        bits = self.all
+        for field, value in (("type", type), ("demography", demography), ("status", status), ("erotic", erotic)):
+            if value is not None:
+                bits &= self.bits.get((field, value), 0)
+        for genre in genres or []:
+            bits &= self.bits.get(("genre", genre), 0)
+        for genre in exclude_genres or []:
+            bits &= ~self.bits.get(("genre", genre), 0)
+
+        ordered = self._order(order)
+        # score se sirve de mayor a menor y title de A a Z salvo que se pida lo contrario
+        if order_dir and order_dir != ("desc" if order == "score" else "asc"):
+            ordered = ordered[::-1]
+        needle = title.strip().lower() if title else None
+        # Desplazar un entero grande es O(tamaño): los bits se consultan sobre sus bytes
+        raw = bits.to_bytes((len(self.records) + 7) // 8, "little")
+        if not needle:
+            total = bits.bit_count()
+            page = []
+            for n in ordered:
+                if raw[n >> 3] >> (n & 7) & 1:
+                    if offset:
+                        offset -= 1
+                        continue
+                    page.append(self.records[n])
+                    if len(page) == limit:
+                        break
+            return total, page
+        matches = [n for n in ordered if raw[n >> 3] >> (n & 7) & 1 and needle in (self.records[n]["title"] or "").lower()]
+        return len(matches), [self.records[n] for n in matches[offset:offset + limit]]
+
+    def stats(self) -> dict:
+        return {"works": len(self.records), "bitsets": len(self.bits), "loaded": self._loaded}
+
+
+manga_library = MangaLibrary("manga_library")
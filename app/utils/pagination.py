@@ -0,0 +1,53 @@
+from typing import Callable, List, Optional, Tuple
+from fastapi import HTTPException
+
+VALID_LIST_ORDERS = ["asc", "desc"]
+
+
+def is_paged(offset: int, limit: Optional[int], order: Optional[str], fields: Optional[str]) -> bool:
+    """
+    True si el cliente pidió una vista parcial de la lista (si no, se sirve la respuesta cacheada completa).
+    """
+    return bool(offset or limit is not None or order or fields)
+
+
+def check_order(order: Optional[str]):
+    if order and order not in VALID_LIST_ORDERS:
+        raise HTTPException(status_code=400, detail=f"Order inválido. Opciones: {VALID_LIST_ORDERS}")
+
+
+def parse_fields(fields: Optional[str], valid: List[str]) -> Optional[List[str]]:
+    if not fields:
+        return None
+    selected = [f.strip() for f in fields.split(",") if f.strip()]
+    invalid = [f for f in selected if f not in valid]
+    if invalid:
+        raise HTTPException(status_code=400, detail=f"Fields inválidos: {invalid}. Opciones: {valid}")
+    return selected
+
+
+def project(item: dict, fields: Optional[List[str]]) -> dict:
+    if not fields:
+        return item
+    return {f: item.get(f) for f in fields}
+
+
+def paginate(
+    items: list,
+    offset: int = 0,
+    limit: Optional[int] = None,
+    order: Optional[str] = None,
+    key: Optional[Callable] = None,
+) -> Tuple[list, dict]:
+    """
+    Devuelve el trozo pedido de `items` sin copiar la lista completa salvo para ordenar.
+    Con `key` se ordena por esa clave; sin ella "desc" invierte el orden original.
+    """
+    check_order(order)
+    if order:
+        if key:
+            items = sorted(items, key=key, reverse=order == "desc")
+        elif order == "desc":
+            items = items[::-1]
+    end = None if limit is None else offset + limit
+    return items[offset:end], {"total": len(items), "offset": offset, "limit": limit, "order": order}
@@ -1,12 +1,15 @@
 import re, json, httpx
 from bs4 import BeautifulSoup
 from app.core.config import HEADERS
+from app.core.http import get_client
+
+def animeav1_client() -> httpx.AsyncClient:
+    return get_client("animeav1", headers=HEADERS)
 
 async def fetch_html(url):
-    async with httpx.AsyncClient() as client:
-        r = await client.get(url, headers=HEADERS)
-        r.raise_for_status()
-        return r.text
+    r = await animeav1_client().get(url)
+    r.raise_for_status()
+    return r.text
 
 def find_sveltekit_script(soup: BeautifulSoup):
     for s in soup.find_all("script"):
@@ -0,0 +1,2 @@
+# benchmarks/__init__.py
+# (vacío, solo sirve para poder ejecutar los benchmarks con `python -m benchmarks.<modulo>`)
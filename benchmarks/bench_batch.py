@@ -0,0 +1,92 @@
+"""
+Compara N peticiones de detalle secuenciales contra una sola petición batch.
+
+Arranca el simulador y la API igual que benchmarks.loadtest y, con la caché
+fría (force_refresh=true), mide para animes y mangas:
+    - N GET /api/animes/{slug} (o /api/mangas/detalle) uno tras otro
+    - 1 POST /api/animes/batch (o /api/mangas/detalle/batch) con los mismos N
+
+Uso:
+    python -m benchmarks.bench_batch [--items 20] [--rounds 3] [--sim-args "--latency-ms 150"]
+"""
+import argparse
+import asyncio
+import shlex
+import statistics
+import sys
+import time
+
+import httpx
+
+from benchmarks.loadtest import spawn, wait_ready, _detail_url
+
+
+async def sequential(client: httpx.AsyncClient, requests: list) -> float:
+    start = time.perf_counter()
+    for path, params in requests:
+        resp = await client.get(path, params={**params, "force_refresh": "true"})
+        resp.raise_for_status()
+    return time.perf_counter() - start
+
+
+async def batch(client: httpx.AsyncClient, path: str, body: dict) -> float:
+    start = time.perf_counter()
+    resp = await client.post(path, json=body, params={"force_refresh": "true"})
+    resp.raise_for_status()
+    errors = resp.json()["errors"]
+    if errors:
+        raise RuntimeError(f"errores en el batch: {errors}")
+    return time.perf_counter() - start
+
+
+async def main_async(args) -> int:
+    procs = []
+    try:
+        upstream = f"http://127.0.0.1:{args.sim_port}"
+        procs.append(spawn(["-m", "benchmarks.upstream_sim", "--port", str(args.sim_port), *shlex.split(args.sim_args)], {}))
+        await wait_ready(f"{upstream}/horario")
+        zonatmo = f"{upstream}/zonatmo"
+
+        app_url = f"http://127.0.0.1:{args.app_port}"
+        procs.append(spawn(
+            ["-m", "uvicorn", "app.main:app", "--port", str(args.app_port), "--log-level", "warning"],
+            {"BASE_URL": upstream, "ZONATMO_BASE_URL": zonatmo},
+        ))
+        await wait_ready(f"{app_url}/api/stats")
+
+        slugs = [f"anime-{i}" for i in range(1, args.items + 1)]
+        urls = [_detail_url(zonatmo, i) for i in range(1, args.items + 1)]
+        cases = [
+            ("animes", [(f"/api/animes/{s}", {}) for s in slugs], "/api/animes/batch", {"slugs": slugs}),
+            ("mangas", [("/api/mangas/detalle", {"url": u}) for u in urls], "/api/mangas/detalle/batch", {"urls": urls}),
+        ]
+
+        print(f"{'caso':<8} {'secuencial s':>13} {'batch s':>9} {'items/s sec':>12} {'items/s batch':>14} {'mejora':>7}")
+        async with httpx.AsyncClient(base_url=app_url, timeout=120.0) as client:
+            for name, requests, batch_path, body in cases:
+                seq_times, batch_times = [], []
+                for _ in range(args.rounds):
+                    seq_times.append(await sequential(client, requests))
+                    batch_times.append(await batch(client, batch_path, body))
+                seq, bat = statistics.median(seq_times), statistics.median(batch_times)
+                print(f"{name:<8} {seq:>13.2f} {bat:>9.2f} {args.items / seq:>12.1f} {args.items / bat:>14.1f} {seq / bat:>6.1f}x")
+        return 0
+    finally:
+        for proc in procs:
+            proc.terminate()
+        for proc in procs:
+            proc.wait(timeout=10)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--items", type=int, default=20)
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument("--sim-port", type=int, default=9000)
+    parser.add_argument("--app-port", type=int, default=8001)
+    parser.add_argument("--sim-args", default="", help="Argumentos extra para benchmarks.upstream_sim")
+    return asyncio.run(main_async(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
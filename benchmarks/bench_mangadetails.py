@@ -0,0 +1,46 @@
+"""
+Benchmark de parse_detail sobre una obra de 3000 capítulos.
+
+Uso:
+    python -m benchmarks.bench_mangadetails [--chapters 3000] [--runs 5]
+
+Sale con código 1 si la mediana supera TARGET_MS.
+"""
+import argparse
+import logging
+import statistics
+import sys
+import time
+
+from app.routers.mangadetails import parse_detail
+from benchmarks.fixtures import manga_detail_html
+
+# Objetivo para 3000 capítulos x 2 grupos (~6 MB de HTML) en una máquina de desarrollo
+TARGET_MS = 500
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chapters", type=int, default=3000)
+    parser.add_argument("--uploads", type=int, default=2, help="Subidas (grupos) por capítulo")
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    logging.disable(logging.INFO)
+    html = manga_detail_html(args.chapters, args.uploads)
+    url = "https://zonatmo.com/library/manga/1/one-piece"
+
+    timings = []
+    for _ in range(args.runs):
+        start = time.perf_counter()
+        data = parse_detail(html, url)
+        timings.append((time.perf_counter() - start) * 1000)
+
+    median = statistics.median(timings)
+    print(f"HTML: {len(html) / 1e6:.1f} MB, filas de capítulos: {len(data['chapters'])}")
+    print(f"parse_detail: mediana {median:.1f} ms, mín {min(timings):.1f} ms, objetivo {TARGET_MS} ms")
+    return 0 if median <= TARGET_MS else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
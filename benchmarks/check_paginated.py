@@ -0,0 +1,72 @@
+"""
+Comprueba la extracción del visor paginado empezando por cualquier página.
+
+Arranca el simulador y la API igual que benchmarks.loadtest y pide /scrape-manga
+con capítulos /viewer/<id>/paginated/N (una imagen por página) para varios N: la
+lista de imágenes (la que se guarda por capítulo) tiene que ser siempre 01..P en
+orden, sin huecos ni repetidas.
+
+Uso:
+    python -m benchmarks.check_paginated [--pages 12] [--starts 1,5,12]
+
+Sale con código 1 si alguna lista no es la esperada.
+"""
+import argparse
+import asyncio
+import sys
+import tempfile
+
+import httpx
+
+from benchmarks.loadtest import spawn, wait_ready
+
+
+async def images_for(client: httpx.AsyncClient, url: str, force_refresh: bool) -> list:
+    resp = await client.post("/api/mangas/scrape-manga", json={"url": url, "force_refresh": force_refresh})
+    resp.raise_for_status()
+    return [img["filename"] for img in resp.json()["images"]]
+
+
+async def main_async(args) -> int:
+    procs = []
+    failures = 0
+    try:
+        upstream = f"http://127.0.0.1:{args.sim_port}"
+        procs.append(spawn(["-m", "benchmarks.upstream_sim", "--port", str(args.sim_port), "--pages", str(args.pages)], {}))
+        await wait_ready(f"{upstream}/horario")
+        zonatmo = f"{upstream}/zonatmo"
+
+        app_url = f"http://127.0.0.1:{args.app_port}"
+        procs.append(spawn(
+            ["-m", "uvicorn", "app.main:app", "--port", str(args.app_port), "--log-level", "warning"],
+            {"BASE_URL": upstream, "ZONATMO_BASE_URL": zonatmo, "DATA_DIR": tempfile.mkdtemp(prefix="check_paginated_")},
+        ))
+        await wait_ready(f"{app_url}/api/stats")
+
+        expected = [f"{n:02d}.webp" for n in range(1, args.pages + 1)]
+        async with httpx.AsyncClient(base_url=app_url, timeout=60.0) as client:
+            for start in args.starts:
+                url = f"{zonatmo}/viewer/chapter{start}/paginated/{start}"
+                extracted = await images_for(client, url, force_refresh=True)
+                ok = extracted == expected
+                failures += not ok
+                print(f"inicio {start:>3}: {'OK' if ok else 'FALLO'}" + ("" if ok else f" imágenes={extracted}"))
+        return 1 if failures else 0
+    finally:
+        for proc in procs:
+            proc.terminate()
+        for proc in procs:
+            proc.wait(timeout=10)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, default=12)
+    parser.add_argument("--starts", default="1,5,12", type=lambda v: [int(n) for n in v.split(",") if n])
+    parser.add_argument("--sim-port", type=int, default=9000)
+    parser.add_argument("--app-port", type=int, default=8001)
+    return asyncio.run(main_async(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
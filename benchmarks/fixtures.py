@@ -0,0 +1,311 @@
+"""
+Páginas HTML de ejemplo para los benchmarks de parsers.
+
+Se generan de forma determinista imitando la estructura de ZonaTMO,
+así los benchmarks funcionan sin red y sin guardar megas de HTML en el repo.
+"""
+
+
+ZONATMO = "https://zonatmo.com"
+
+
+def manga_detail_html(chapters: int = 3000, uploads_per_chapter: int = 2, base: str = ZONATMO) -> str:
+    """
+    Página de detalle de una obra con `chapters` capítulos y
+    `uploads_per_chapter` subidas (grupos) por capítulo.
+    """
+    rows = []
+    for i in range(chapters, 0, -1):
+        uploads = []
+        for j in range(uploads_per_chapter):
+            upload_id = i * 10 + j
+            uploads.append(f"""
+            <li class="list-group-item upload-link">
+              <div class="row">
+                <div class="col-4 col-md-6 text-truncate">
+                  <span><a href="{base}/groups/{j + 1}/scan-{j + 1}">Scan {j + 1}</a></span>
+                </div>
+                <div class="col-4 col-md-2 text-center">
+                  <span class="badge badge-primary p-2">2024-0{(i % 9) + 1}-1{j}</span>
+                </div>
+                <div class="col-2 col-sm-1 text-right">
+                  <a href="{base}/view_uploads/{upload_id}" class="btn btn-default btn-sm">
+                    <span class="fa fa-play fa-2x"></span>
+                  </a>
+                </div>
+              </div>
+            </li>""")
+        rows.append(f"""
+      <li class="list-group-item p-0 bg-light upload-link" data-index="{i}">
+        <h4 class="px-2 py-3 m-0">
+          <div class="row">
+            <div class="col-10 text-truncate">
+              <a class="btn-collapse" onclick="collapseChapter('c{i}')">
+                <i class="fa fa-chevron-down"></i> Capítulo {i}.00 : Capítulo {i}
+              </a>
+            </div>
+          </div>
+        </h4>
+        <div class="chapter-list-element" id="c{i}">
+          <ul class="list-group list-group-flush chapter-list">{"".join(uploads)}
+          </ul>
+        </div>
+      </li>""")
+
+    return f"""<!DOCTYPE html>
+<html lang="es">
+<head><meta charset="UTF-8"><title>One Piece - ZonaTMO</title></head>
+<body>
+  <header class="container-fluid element">
+    <div class="row">
+      <div class="col-12 col-md-3">
+        <div class="book-thumbnail" style="background-image: url('https://otakuteca.com/images/books/cover/one-piece.webp');"></div>
+        <div class="book-type badge badge-manga" data-type="manga">MANGA</div>
+        <div class="demography shounen" title="Demografía">Shounen</div>
+      </div>
+      <div class="col-12 col-md-9 element-header-content-text">
+        <h1 class="element-title my-2">One Piece <small>(1997)</small></h1>
+        <h2 class="element-subtitle">Wan Pīsu</h2>
+        <p class="element-description">Gol D. Roger fue conocido como el Rey de los Piratas.</p>
+        <h6><a class="badge badge-primary" href="/library?genders[]=1">Acción</a>
+            <a class="badge badge-primary" href="/library?genders[]=2">Aventura</a>
+            <a class="badge badge-primary" href="/library?genders[]=3">Comedia</a></h6>
+      </div>
+    </div>
+  </header>
+  <section class="element-header-content">
+    <h5 class="element-subtitle">Estado</h5>
+    <span class="book-status publishing">Publicándose</span>
+    <h5>Títulos alternativos</h5>
+    <span class="badge badge-pill">ワンピース</span>
+    <span class="badge badge-pill">OP</span>
+    <h5>Sinónimos</h5>
+    <span class="badge badge-pill">Wan Pisu</span>
+  </section>
+  <div class="container" id="chapters">
+    <ul class="list-group list-group-flush chapters">{"".join(rows)}
+    </ul>
+  </div>
+</body>
+</html>
+"""
+
+
+# -------------------- animeav1 (SvelteKit) --------------------
+def _sveltekit_page(data_js: str, body: str = "") -> str:
+    return f"""<!DOCTYPE html>
+<html lang="es">
+<head><meta charset="utf-8"><title>AnimeAV1</title></head>
+<body>
+  <div style="display: contents">{body}
+    <script>
+      {{
+        __sveltekit_1x2y3z = {{ base: new URL(".", location).pathname.slice(0, -1) }};
+        const element = document.currentScript.parentElement;
+        Promise.all([import("/_app/immutable/entry/start.js"), import("/_app/immutable/entry/app.js")]).then(([kit, app]) => {{
+          kit.start(app, element, {{
+            node_ids: [0, 2],
+            data: {data_js},
+            form: null,
+            error: null
+          }});
+        }});
+      }}
+    </script>
+  </div>
+</body>
+</html>
+"""
+
+
+def _anime_js(i: int) -> str:
+    return (
+        f'{{id:{i},title:"Anime {i}",slug:"anime-{i}",synopsis:"Sinopsis del anime {i}.\\nSegunda línea.",'
+        f'categoryId:1,score:{7 + (i % 3)}.{i % 10},votes:{i * 13},status:{i % 3},startDate:"2020-01-0{(i % 9) + 1}",'
+        f'genres:[{{id:1,name:"Acción",slug:"accion"}},{{id:2,name:"Aventura",slug:"aventura"}}]}}'
+    )
+
+
+def anime_catalog_html(results: int = 20, page: int = 1, total_pages: int = 50) -> str:
+    items = ",".join(
+        f'{{id:"{n}",title:"Anime {n}",synopsis:"Sinopsis del anime {n}.\\nMás texto.",categoryId:1,slug:"anime-{n}"}}'
+        for n in range((page - 1) * results + 1, page * results + 1)
+    )
+    data_js = (
+        '[{type:"data",data:{user:null},uses:{}},'
+        f'{{type:"data",data:(function(a){{a.id=1;a.name="TV Anime";a.slug="tv-anime";'
+        f'return {{category:a,results:[{items}]}}}}({{}})),uses:{{search_params:["page"]}}}}]'
+    )
+    links = "".join(f'<a href="/catalogo?page={p}">{p}</a>' for p in range(1, min(total_pages, 5) + 1))
+    body = f"""
+    <main>
+      <p>{results * total_pages} Resultados</p>
+      <nav class="pagination">{links}<a href="/catalogo?page={total_pages}">{total_pages}</a></nav>
+    </main>"""
+    return _sveltekit_page(data_js, body)
+
+
+def anime_home_html(featured: int = 10, latest_episodes: int = 30, latest_media: int = 20) -> str:
+    featured_js = ",".join(_anime_js(i) for i in range(1, featured + 1))
+    episodes_js = ",".join(
+        f'{{id:{i * 100},number:{i},createdAt:"2024-05-0{(i % 9) + 1}",media:{{id:{i},title:"Anime {i}",slug:"anime-{i}"}}}}'
+        for i in range(1, latest_episodes + 1)
+    )
+    media_js = ",".join(_anime_js(i) for i in range(100, 100 + latest_media))
+    data_js = (
+        '[{type:"data",data:{user:null},uses:{}},'
+        f'{{type:"data",data:{{featured:[{featured_js}],latestEpisodes:[{episodes_js}],latestMedia:[{media_js}]}},uses:{{}}}}]'
+    )
+    return _sveltekit_page(data_js)
+
+
+def anime_media_html(episodes: int = 1100) -> str:
+    episodes_js = ",".join(f"{{id:{n + 5000},number:{n},filler:{'true' if n % 50 == 0 else 'false'}}}" for n in range(1, episodes + 1))
+    media_js = (
+        '{id:21,title:"One Piece",aka:{"ja-jp":"ワンピース"},slug:"one-piece",'
+        'synopsis:"Gol D. Roger fue conocido como el Rey de los Piratas.",categoryId:1,'
+        f'score:8.7,votes:12345,malId:21,status:1,episodesCount:{episodes},'
+        'genres:[{id:1,name:"Acción",slug:"accion"},{id:2,name:"Aventura",slug:"aventura"}],'
+        f'episodes:[{episodes_js}]}}'
+    )
+    data_js = f'[{{type:"data",data:{{user:null}},uses:{{}}}},{{type:"data",data:{{media:{media_js}}},uses:{{}}}}]'
+    return _sveltekit_page(data_js)
+
+
+def anime_episode_html(servers: int = 6) -> str:
+    def variant(kind: str) -> str:
+        return ",".join(f'{{server:"{kind}{n}",url:"https://player.example.com/{kind.lower()}/{n}"}}' for n in range(servers))
+
+    data_js = (
+        '[{type:"data",data:{user:null},uses:{}},'
+        '{type:"data",data:{media:{id:21,title:"One Piece",aka:{"ja-jp":"ワンピース"},'
+        'genres:[{id:1,name:"Acción",slug:"accion"}],score:8.7,votes:12345,malId:21,status:1,episodesCount:1100}},uses:{}},'
+        '{type:"data",data:{episode:{id:6001,number:1,filler:false},'
+        f'embeds:{{SUB:[{variant("Sub")}],DUB:[{variant("Dub")}]}},'
+        f'downloads:{{SUB:[{variant("Dl")}]}}}},uses:{{}}}}]'
+    )
+    return _sveltekit_page(data_js)
+
+
+def anime_schedule_html(items: int = 60) -> str:
+    media_js = ",".join(
+        f'{{id:{i},title:"Anime {i}",slug:"anime-{i}",status:1,nextEpisode:undefined,categoryId:1}}' for i in range(1, items + 1)
+    )
+    data_js = f'[{{type:"data",data:{{user:null}},uses:{{}}}},{{type:"data",data:{{media:[{media_js}]}},uses:{{}}}}]'
+    return _sveltekit_page(data_js)
+
+
+# -------------------- zonatmo --------------------
+def _manga_card(i: int, demography: str = "shounen", base: str = ZONATMO) -> str:
+    return f"""
+      <div class="element col-6 col-sm-4 col-md-3 col-lg-2" data-identifier="{i}">
+        <a href="{base}/library/manga/{i}/manga-{i}">
+          <div class="thumbnail book book-thumbnail-{i}">
+            <style>.book-thumbnail-{i}::before {{ background-image: url('https://otakuteca.com/images/books/cover/{i}.webp'); }}</style>
+            <div class="thumbnail-title"><h4 class="text-truncate" title="Manga {i}">Manga {i}</h4></div>
+            <span class="score"><span>{7 + (i % 3)},{i % 10}0</span></span>
+            <span class="book-type badge badge-manga">MANGA</span>
+            <span class="demography {demography}" title="{demography.capitalize()}">{demography.capitalize()}</span>
+            <div class="upload_time"><span class="number">hace {i % 12} horas</span></div>
+            <div class="chapter-number"><span class="number">{i * 3}.00</span></div>
+            <div class="popularity"><div class="gauge-arrow" data-percentage="{i % 100}"></div></div>
+            {'<i class="fas fa-heartbeat" title="Erótico"></i>' if i % 7 == 0 else ''}
+          </div>
+        </a>
+      </div>"""
+
+
+def manga_cards_html(cards: int = 30, start: int = 1, base: str = ZONATMO) -> str:
+    return "".join(_manga_card(i, base=base) for i in range(start, start + cards))
+
+
+def manga_home_html(cards: int = 30, uploads: int = 60, base: str = ZONATMO) -> str:
+    def ranked(start: int) -> str:
+        return "".join(
+            f'<div class="ranked-item"><span class="position">{n}.</span>'
+            f'<a href="/library/manga/{start + n}/manga-{start + n}">Manga {start + n}</a>'
+            f'<span class="badge badge-manga">Manga</span></div>'
+            for n in range(1, 11)
+        )
+
+    return f"""<!DOCTYPE html>
+<html lang="es">
+<head><meta charset="UTF-8"><title>ZonaTMO</title></head>
+<body>
+  <ul class="nav nav-pills">
+    <li><a href="#pills-populars" data-toggle="pill">Populares</a></li>
+    <li><a href="#pills-populars-boys" data-target="#pills-populars-boys">P.Seinen</a></li>
+    <li><a href="#pills-populars-girls" data-target="#pills-populars-girls">P.Josei</a></li>
+    <li><a href="#pills-trending" data-toggle="pill">Trending</a></li>
+    <li><a href="#pills-trending-boys" data-target="#pills-trending-boys">T.Seinen</a></li>
+    <li><a href="#pills-trending-girls" data-target="#pills-trending-girls">T.Josei</a></li>
+  </ul>
+  <div class="tab-content">
+    <div class="tab-pane row" id="pills-populars">{manga_cards_html(cards, 1, base)}</div>
+    <div class="tab-pane row" id="pills-populars-boys">{manga_cards_html(cards, 100, base)}</div>
+    <div class="tab-pane row" id="pills-populars-girls">{manga_cards_html(cards, 200, base)}</div>
+    <div class="tab-pane row" id="pills-trending">{manga_cards_html(cards, 300, base)}</div>
+    <div class="tab-pane row" id="pills-trending-boys">{manga_cards_html(cards, 400, base)}</div>
+    <div class="tab-pane row" id="pills-trending-girls">{manga_cards_html(cards, 500, base)}</div>
+  </div>
+  <h2>Últimos añadidos</h2>
+  <div class="row">{manga_cards_html(cards, 600, base)}</div>
+  <h2>Últimas subidas</h2>
+  <div class="row">{manga_cards_html(uploads, 700, base)}</div>
+  <div class="tab-pane" id="pills-weekly">{ranked(800)}</div>
+  <div class="tab-pane" id="pills-monthly">{ranked(900)}</div>
+</body>
+</html>
+"""
+
+
+def manga_library_html(cards: int = 24, base: str = ZONATMO) -> str:
+    return f"""<!DOCTYPE html>
+<html lang="es">
+<head><meta charset="UTF-8"><title>Biblioteca - ZonaTMO</title></head>
+<body>
+  <main class="container">
+    <div class="row">{manga_cards_html(cards, 1000, base)}</div>
+    <ul class="pagination"><li class="page-item"><a class="page-link" href="/library?page=2">2</a></li></ul>
+  </main>
+</body>
+</html>
+"""
+
+
+def manga_viewer_html(pages: int = 60, uniqid: str = "5f3a9c1e2b7d4",
+                      images_base: str = "https://img1.japanreader.com/uploads") -> str:
+    images = ",".join(f'"{n:02d}.webp"' for n in range(1, pages + 1))
+    return f"""<!DOCTYPE html>
+<html lang="es">
+<head><meta charset="UTF-8"><title>Capítulo 1 - ZonaTMO</title></head>
+<body>
+  <div id="main-container" class="viewer-container"></div>
+  <script type="text/javascript">
+    var uniqid = '{uniqid}';
+    dirPath = '{images_base}/{uniqid}/';
+    images = JSON.parse('[{images}]');
+    var currentPage = 1;
+  </script>
+</body>
+</html>
+"""
+
+
+def manga_viewer_page_html(page: int, pages: int = 60, uniqid: str = "5f3a9c1e2b7d4",
+                           images_base: str = "https://img1.japanreader.com/uploads") -> str:
+    """
+    Una página del visor paginado (/paginated/N): solo su imagen y el selector de páginas.
+    """
+    options = "".join(f'<option value="{n}">{n}</option>' for n in range(1, pages + 1))
+    return f"""<!DOCTYPE html>
+<html lang="es">
+<head><meta charset="UTF-8"><title>Capítulo 1 - ZonaTMO</title></head>
+<body>
+  <select id="viewer-pages-select">{options}</select>
+  <div id="main-container" class="viewer-container">
+    <img class="viewer-image" src="{images_base}/{uniqid}/{page:02d}.webp">
+  </div>
+</body>
+</html>
+"""
@@ -0,0 +1,199 @@
+"""
+Prueba de carga de extremo a extremo contra el simulador local.
+
+Arranca benchmarks.upstream_sim y la API (uvicorn app.main:app) apuntando a él,
+y lanza cada escenario a RPS fijo (bucle abierto: las peticiones salen a su hora
+aunque las anteriores no hayan terminado). Por endpoint informa throughput,
+latencia p50/p99, ratio de aciertos de caché (delta de /api/stats) y RSS máximo
+del proceso de la API.
+
+Uso:
+    python -m benchmarks.loadtest --rps 50 --duration 10
+    python -m benchmarks.loadtest --only anime_detail --sim-args "--latency-ms 200 --rate-limit-rate 0.05"
+
+Los endpoints que usan navegador (home/búsqueda de mangas con Playwright, /horario con
+Selenium) no se incluyen: necesitan un Chrome real y los proxies remotos.
+"""
+import argparse
+import asyncio
+import os
+import random
+import shlex
+import statistics
+import subprocess
+import sys
+import time
+
+import httpx
+
+SLUGS = [f"anime-{i}" for i in range(1, 21)] + ["one-piece"]
+MANGA_IDS = list(range(1, 11))
+
+
+def _detail_url(zonatmo: str, manga_id: int) -> str:
+    return f"{zonatmo}/library/manga/{manga_id}/manga-{manga_id}"
+
+
+# nombre -> función(rnd, zonatmo) que devuelve (método, ruta, kwargs de httpx)
+SCENARIOS = {
+    "anime_home": lambda rnd, z: ("GET", "/api/animes/home", {}),
+    "anime_catalog": lambda rnd, z: ("GET", "/api/animes", {"params": {"page": rnd.randint(1, 5)}}),
+    "anime_detail": lambda rnd, z: ("GET", f"/api/animes/{rnd.choice(SLUGS)}", {}),
+    "anime_episode": lambda rnd, z: ("GET", f"/api/animes/{rnd.choice(SLUGS)}/{rnd.randint(1, 12)}", {}),
+    "manga_detail": lambda rnd, z: ("GET", "/api/mangas/detalle", {"params": {"url": _detail_url(z, rnd.choice(MANGA_IDS))}}),
+    "resolve_chapter": lambda rnd, z: (
+        "GET", "/api/mangas/resolve_chapter", {"params": {"upload_url": f"{z}/view_uploads/{rnd.randint(1, 200)}"}}
+    ),
+    "scrape_manga": lambda rnd, z: (
+        "POST", "/api/mangas/scrape-manga", {"json": {"url": f"{z}/viewer/{rnd.randint(1, 20):013d}/paginated"}}
+    ),
+}
+
+
+def rss_mb(pid: int):
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        return None
+    return None
+
+
+def percentile(values: list, pct: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(pct / 100 * (len(values) - 1))))]
+
+
+async def wait_ready(url: str, timeout: float = 30.0):
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient() as client:
+        while time.monotonic() < deadline:
+            try:
+                await client.get(url, timeout=1.0)
+                return
+            except httpx.HTTPError:
+                await asyncio.sleep(0.2)
+    raise RuntimeError(f"{url} no respondió en {timeout}s")
+
+
+async def run_scenario(client: httpx.AsyncClient, name: str, rps: float, duration: float, zonatmo: str, app_pid, rnd) -> dict:
+    stats_before = (await client.get("/api/stats")).json()["cache"]
+    latencies, errors, statuses = [], 0, {}
+    peak_rss = rss_mb(app_pid) if app_pid else None
+
+    async def one(scheduled: float):
+        nonlocal errors
+        method, path, kwargs = SCENARIOS[name](rnd, zonatmo)
+        try:
+            resp = await client.request(method, path, **kwargs)
+            statuses[resp.status_code] = statuses.get(resp.status_code, 0) + 1
+            if resp.status_code >= 400:
+                errors += 1
+        except httpx.HTTPError:
+            errors += 1
+            statuses["exc"] = statuses.get("exc", 0) + 1
+        # Latencia medida desde la hora programada (evita omisión coordinada)
+        latencies.append(time.monotonic() - scheduled)
+
+    total = int(rps * duration)
+    start = time.monotonic()
+    tasks = []
+    for i in range(total):
+        scheduled = start + i / rps
+        delay = scheduled - time.monotonic()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        tasks.append(asyncio.create_task(one(scheduled)))
+        if app_pid and i % max(1, int(rps)) == 0:
+            current = rss_mb(app_pid)
+            if current is not None:
+                peak_rss = max(peak_rss or 0, current)
+    await asyncio.gather(*tasks)
+    elapsed = time.monotonic() - start
+
+    stats_after = (await client.get("/api/stats")).json()["cache"]
+    hits = stats_after["hits"] - stats_before["hits"]
+    lookups = hits + stats_after["misses"] - stats_before["misses"]
+    current = rss_mb(app_pid) if app_pid else None
+    if current is not None:
+        peak_rss = max(peak_rss or 0, current)
+
+    return {
+        "sent": total,
+        "errors": errors,
+        "statuses": statuses,
+        "throughput": (total - errors) / elapsed if elapsed else 0.0,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+        "mean_ms": statistics.fmean(latencies) * 1000 if latencies else 0.0,
+        "cache_hit_ratio": hits / lookups if lookups else 0.0,
+        "rss_mb": peak_rss,
+    }
+
+
+def spawn(args: list, env: dict) -> subprocess.Popen:
+    return subprocess.Popen([sys.executable, *args], env={**os.environ, **env})
+
+
+async def main_async(args) -> int:
+    procs = []
+    upstream = args.upstream
+    try:
+        if not upstream:
+            upstream = f"http://127.0.0.1:{args.sim_port}"
+            procs.append(spawn(["-m", "benchmarks.upstream_sim", "--port", str(args.sim_port), *shlex.split(args.sim_args)], {}))
+            await wait_ready(f"{upstream}/horario")
+        zonatmo = f"{upstream}/zonatmo"
+
+        app_url, app_pid = args.app, None
+        if not app_url:
+            app_url = f"http://127.0.0.1:{args.app_port}"
+            app_proc = spawn(
+                ["-m", "uvicorn", "app.main:app", "--port", str(args.app_port), "--log-level", "warning"],
+                {"BASE_URL": upstream, "ZONATMO_BASE_URL": zonatmo},
+            )
+            procs.append(app_proc)
+            app_pid = app_proc.pid
+            await wait_ready(f"{app_url}/api/stats")
+
+        rnd = random.Random(args.seed)
+        limits = httpx.Limits(max_connections=args.max_connections)
+        print(f"{'endpoint':<16} {'ok/s':>8} {'p50 ms':>9} {'p99 ms':>9} {'errores':>8} {'caché':>7} {'RSS MB':>8}")
+        async with httpx.AsyncClient(base_url=app_url, timeout=args.timeout, limits=limits) as client:
+            for name in args.only or SCENARIOS:
+                r = await run_scenario(client, name, args.rps, args.duration, zonatmo, app_pid, rnd)
+                rss = f"{r['rss_mb']:.0f}" if r["rss_mb"] is not None else "-"
+                print(f"{name:<16} {r['throughput']:>8.1f} {r['p50_ms']:>9.1f} {r['p99_ms']:>9.1f} "
+                      f"{r['errors']:>8} {r['cache_hit_ratio']:>7.2f} {rss:>8}")
+                if r["errors"]:
+                    print(f"{'':<16} estados: {r['statuses']}")
+        return 0
+    finally:
+        for proc in procs:
+            proc.terminate()
+        for proc in procs:
+            proc.wait(timeout=10)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rps", type=float, default=20.0)
+    parser.add_argument("--duration", type=float, default=10.0, help="Segundos por escenario")
+    parser.add_argument("--only", action="append", choices=sorted(SCENARIOS))
+    parser.add_argument("--upstream", help="Usar un simulador ya arrancado (URL base)")
+    parser.add_argument("--app", help="Usar una API ya arrancada (URL base); sin RSS")
+    parser.add_argument("--sim-port", type=int, default=9000)
+    parser.add_argument("--app-port", type=int, default=8001)
+    parser.add_argument("--sim-args", default="", help="Argumentos extra para benchmarks.upstream_sim")
+    parser.add_argument("--max-connections", type=int, default=200)
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("--seed", type=int, default=1)
+    return asyncio.run(main_async(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,52 @@
+"""
+Graba páginas reales de animeav1 y zonatmo como fixtures de los benchmarks.
+
+Uso:
+    python -m benchmarks.record                       # todas las páginas por defecto
+    python -m benchmarks.record manga_detail=https://zonatmo.com/library/manga/1/one-piece
+
+Cada página se guarda en benchmarks/recorded/<fixture>.html y la suite
+(benchmarks.run) la usa en lugar de la generada.
+"""
+import sys
+
+import httpx
+
+from app.core.config import BASE_URL, ZONATMO_BASE_URL, HEADERS, ZONATMO_HEADERS
+from benchmarks.run import RECORDED_DIR
+
+DEFAULT_URLS = {
+    "anime_catalog": f"{BASE_URL}/catalogo?page=1",
+    "anime_home": BASE_URL,
+    "anime_media": f"{BASE_URL}/media/one-piece",
+    "anime_episode": f"{BASE_URL}/media/one-piece/1",
+    "anime_schedule": f"{BASE_URL}/horario",
+    "manga_home": ZONATMO_BASE_URL,
+    "manga_library": f"{ZONATMO_BASE_URL}/library",
+}
+
+
+def main() -> int:
+    urls = dict(DEFAULT_URLS)
+    for arg in sys.argv[1:]:
+        name, _, url = arg.partition("=")
+        urls[name] = url
+
+    RECORDED_DIR.mkdir(exist_ok=True)
+    failed = 0
+    for name, url in urls.items():
+        headers = ZONATMO_HEADERS if url.startswith(ZONATMO_BASE_URL) else HEADERS
+        try:
+            resp = httpx.get(url, headers=headers, timeout=20.0, follow_redirects=True)
+            resp.raise_for_status()
+        except httpx.HTTPError as e:
+            print(f"[ERROR] {name}: {url} -> {e}")
+            failed += 1
+            continue
+        (RECORDED_DIR / f"{name}.html").write_text(resp.text, encoding="utf-8")
+        print(f"[OK] {name}: {url} ({len(resp.content) / 1024:.0f} KiB)")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
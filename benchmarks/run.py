@@ -0,0 +1,143 @@
+"""
+Suite de benchmarks de los parsers (sin red).
+
+Uso:
+    python -m benchmarks.run                    # compara con benchmarks/baseline.json
+    python -m benchmarks.run --save-baseline    # guarda los resultados como nueva referencia
+    python -m benchmarks.run --only parse_detail --threshold 0.2
+
+Por cada parser informa páginas/s y memoria máxima asignada durante un parseo
+(tracemalloc). Sale con código 1 si algún parser empeora más que --threshold
+respecto a la referencia guardada.
+
+Las páginas son las de benchmarks/fixtures.py; si existe benchmarks/recorded/<fixture>.html
+(ver benchmarks/record.py) se usa esa copia grabada en su lugar.
+"""
+import argparse
+import json
+import logging
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+from app.routers.animes import parse_catalog, parse_home, parse_media, parse_episode
+from app.routers.animeschedule import parse_schedule_media
+from app.routers.mangas import parse_elements_html, parse_home as parse_manga_home
+from app.routers.mangadetails import parse_detail
+from app.routers.mangaimages import parse_image_data
+from app.routers.mangasearch import parse_search_cards
+from benchmarks import fixtures
+
+BENCH_DIR = Path(__file__).resolve().parent
+RECORDED_DIR = BENCH_DIR / "recorded"
+BASELINE_FILE = BENCH_DIR / "baseline.json"
+
+# nombre -> (fixture, función sobre el HTML)
+CASES = {
+    "get_animes": ("anime_catalog", lambda html: parse_catalog(html, "https://animeav1.com/catalogo?page=1", 1)),
+    "extract_home_block": ("anime_home", parse_home),
+    "extract_js_object": ("anime_media", lambda html: parse_media(html, "one-piece")),
+    "get_episode": ("anime_episode", parse_episode),
+    "fetch_media": ("anime_schedule", parse_schedule_media),
+    "parse_elements": ("manga_home", parse_elements_html),
+    "mangas_home": ("manga_home", parse_manga_home),
+    "parse_detail": ("manga_detail", lambda html: parse_detail(html, "https://zonatmo.com/library/manga/1/one-piece")),
+    "extract_image_data": ("manga_viewer", parse_image_data),
+    "search_cards": ("manga_library", parse_search_cards),
+}
+
+GENERATORS = {
+    "anime_catalog": fixtures.anime_catalog_html,
+    "anime_home": fixtures.anime_home_html,
+    "anime_media": fixtures.anime_media_html,
+    "anime_episode": fixtures.anime_episode_html,
+    "anime_schedule": fixtures.anime_schedule_html,
+    "manga_home": fixtures.manga_home_html,
+    "manga_detail": lambda: fixtures.manga_detail_html(chapters=300),
+    "manga_viewer": fixtures.manga_viewer_html,
+    "manga_library": fixtures.manga_library_html,
+}
+
+
+def load_fixture(name: str) -> str:
+    recorded = RECORDED_DIR / f"{name}.html"
+    if recorded.exists():
+        return recorded.read_text(encoding="utf-8")
+    return GENERATORS[name]()
+
+
+def measure(fn, html: str, min_time: float, rounds: int = 5) -> dict:
+    fn(html)  # calentamiento
+
+    # Mejor ronda de `rounds`: mucho más estable que una única media frente a ruido de la máquina
+    best = 0.0
+    for _ in range(rounds):
+        runs, start = 0, time.perf_counter()
+        while True:
+            fn(html)
+            runs += 1
+            elapsed = time.perf_counter() - start
+            if elapsed >= min_time / rounds:
+                break
+        best = max(best, runs / elapsed)
+
+    tracemalloc.start()
+    fn(html)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "pages_per_s": round(best, 2),
+        "peak_kib": round(peak / 1024, 1),
+        "html_kib": round(len(html.encode("utf-8")) / 1024, 1),
+    }
+
+
+def compare(name: str, result: dict, baseline: dict, threshold: float) -> list:
+    base = baseline.get(name)
+    if not base:
+        return []
+    problems = []
+    if result["pages_per_s"] < base["pages_per_s"] * (1 - threshold):
+        problems.append(f"{name}: {result['pages_per_s']} páginas/s < referencia {base['pages_per_s']}")
+    if result["peak_kib"] > base["peak_kib"] * (1 + threshold):
+        problems.append(f"{name}: pico {result['peak_kib']} KiB > referencia {base['peak_kib']} KiB")
+    return problems
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--only", action="append", choices=sorted(CASES), help="Ejecutar solo estos parsers")
+    parser.add_argument("--min-time", type=float, default=1.0, help="Segundos mínimos de medición por parser")
+    parser.add_argument("--threshold", type=float, default=0.3, help="Empeoramiento tolerado (0.3 = 30%%)")
+    parser.add_argument("--baseline", type=Path, default=BASELINE_FILE)
+    parser.add_argument("--save-baseline", action="store_true")
+    args = parser.parse_args()
+
+    logging.disable(logging.INFO)
+    baseline = json.loads(args.baseline.read_text()) if args.baseline.exists() else {}
+
+    results, problems = {}, []
+    print(f"{'parser':<20} {'páginas/s':>10} {'pico KiB':>10} {'HTML KiB':>10}  referencia")
+    for name in args.only or CASES:
+        fixture, fn = CASES[name]
+        result = measure(fn, load_fixture(fixture), args.min_time)
+        results[name] = result
+        base = baseline.get(name)
+        ref = f"{base['pages_per_s']} p/s, {base['peak_kib']} KiB" if base else "-"
+        print(f"{name:<20} {result['pages_per_s']:>10} {result['peak_kib']:>10} {result['html_kib']:>10}  {ref}")
+        problems += compare(name, result, baseline, args.threshold)
+
+    if args.save_baseline:
+        args.baseline.write_text(json.dumps({**baseline, **results}, indent=2, sort_keys=True) + "\n")
+        print(f"Referencia guardada en {args.baseline}")
+        return 0
+
+    for problem in problems:
+        print(f"[REGRESIÓN] {problem}")
+    return 1 if problems else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
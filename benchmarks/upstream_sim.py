@@ -0,0 +1,184 @@
+"""
+Simulador local de animeav1 y zonatmo para pruebas de carga.
+
+Sirve las páginas de benchmarks/fixtures.py (o las grabadas en benchmarks/recorded/)
+con latencia, errores, 429 y cuerpos lentos configurables:
+
+    python -m benchmarks.upstream_sim --port 9000 --latency-ms 80 --error-rate 0.01 --rate-limit-rate 0.02
+
+y la API se apunta a él con:
+
+    BASE_URL=http://127.0.0.1:9000 ZONATMO_BASE_URL=http://127.0.0.1:9000/zonatmo uvicorn app.main:app
+
+Rutas (animeav1 en la raíz, zonatmo bajo /zonatmo):
+    /, /catalogo, /media/{slug}, /media/{slug}/{n}, /horario
+    /zonatmo/, /zonatmo/library, /zonatmo/library/{type}/{id}/{slug},
+    /zonatmo/view_uploads/{id}, /zonatmo/viewer/{uniqid}/paginated,
+    /zonatmo/viewer/{uniqid}/paginated/{n} (una imagen por página),
+    /zonatmo/uploads/{uniqid}/{filename}
+"""
+import argparse
+import asyncio
+import hashlib
+import random
+import struct
+import zlib
+from dataclasses import dataclass
+from functools import lru_cache
+
+from fastapi import FastAPI, Request
+from fastapi.responses import HTMLResponse, RedirectResponse, Response, StreamingResponse
+
+from benchmarks import fixtures
+from benchmarks.run import RECORDED_DIR
+
+
+@dataclass
+class SimConfig:
+    latency_ms: float = 50.0
+    jitter_ms: float = 20.0
+    error_rate: float = 0.0
+    rate_limit_rate: float = 0.0
+    slow_body_rate: float = 0.0
+    slow_body_kib_s: float = 64.0
+    chapters: int = 300
+    episodes: int = 1100
+    pages: int = 40
+    image_kib: int = 300
+    seed: int | None = None
+
+
+def _recorded_or(name: str, generate) -> str:
+    recorded = RECORDED_DIR / f"{name}.html"
+    if recorded.exists():
+        return recorded.read_text(encoding="utf-8")
+    return generate()
+
+
+@lru_cache(maxsize=None)
+def _png(seed: str, kib: int) -> bytes:
+    """
+    PNG en escala de grises con ruido (no comprimible), de unos `kib` KiB.
+    """
+    width = 720
+    height = max(1, kib * 1024 // width)
+    rnd = random.Random(seed)
+    raw = b"".join(b"\x00" + rnd.randbytes(width) for _ in range(height))
+
+    def chunk(kind: bytes, data: bytes) -> bytes:
+        return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data) & 0xFFFFFFFF)
+
+    header = struct.pack(">IIBBBBB", width, height, 8, 0, 0, 0, 0)
+    return b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", header) + chunk(b"IDAT", zlib.compress(raw, 1)) + chunk(b"IEND", b"")
+
+
+def create_app(config: SimConfig) -> FastAPI:
+    app = FastAPI(title="Upstream simulator")
+    rnd = random.Random(config.seed)
+
+    @app.middleware("http")
+    async def faults(request: Request, call_next):
+        delay = max(0.0, config.latency_ms + rnd.uniform(-config.jitter_ms, config.jitter_ms)) / 1000
+        await asyncio.sleep(delay)
+
+        roll = rnd.random()
+        if roll < config.error_rate:
+            return Response("upstream error", status_code=rnd.choice([500, 502, 503]))
+        if roll < config.error_rate + config.rate_limit_rate:
+            return Response("too many requests", status_code=429, headers={"Retry-After": "1"})
+
+        response = await call_next(request)
+        if rnd.random() >= config.slow_body_rate:
+            return response
+
+        # Cuerpo lento: se reenvía en trozos de 4 KiB a slow_body_kib_s
+        body = b"".join([part async for part in response.body_iterator])
+        chunk_delay = 4 / config.slow_body_kib_s
+
+        async def trickle():
+            for i in range(0, len(body), 4096):
+                yield body[i:i + 4096]
+                await asyncio.sleep(chunk_delay)
+
+        headers = {k: v for k, v in response.headers.items() if k.lower() != "content-length"}
+        return StreamingResponse(trickle(), status_code=response.status_code, headers=headers)
+
+    # -------------------- animeav1 --------------------
+    @app.get("/", response_class=HTMLResponse)
+    def anime_home():
+        return _recorded_or("anime_home", fixtures.anime_home_html)
+
+    @app.get("/catalogo", response_class=HTMLResponse)
+    def anime_catalog(page: int = 1):
+        return fixtures.anime_catalog_html(page=page)
+
+    @app.get("/horario", response_class=HTMLResponse)
+    def anime_schedule():
+        return _recorded_or("anime_schedule", fixtures.anime_schedule_html)
+
+    @app.get("/media/{slug}", response_class=HTMLResponse)
+    def anime_media(slug: str):
+        return fixtures.anime_media_html(episodes=config.episodes if slug == "one-piece" else 24)
+
+    @app.get("/media/{slug}/{number}", response_class=HTMLResponse)
+    def anime_episode(slug: str, number: int):
+        return _recorded_or("anime_episode", fixtures.anime_episode_html)
+
+    # -------------------- zonatmo --------------------
+    def zonatmo_base(request: Request) -> str:
+        return str(request.base_url).rstrip("/") + "/zonatmo"
+
+    @app.get("/zonatmo/", response_class=HTMLResponse)
+    @app.get("/zonatmo", response_class=HTMLResponse)
+    def manga_home(request: Request):
+        return fixtures.manga_home_html(base=zonatmo_base(request))
+
+    @app.get("/zonatmo/library", response_class=HTMLResponse)
+    def manga_library(request: Request):
+        return fixtures.manga_library_html(base=zonatmo_base(request))
+
+    @app.get("/zonatmo/library/{kind}/{manga_id}/{slug}", response_class=HTMLResponse)
+    def manga_detail(request: Request, kind: str, manga_id: int, slug: str):
+        return fixtures.manga_detail_html(chapters=config.chapters, base=zonatmo_base(request))
+
+    @app.get("/zonatmo/view_uploads/{upload_id}")
+    def view_uploads(request: Request, upload_id: int):
+        uniqid = hashlib.md5(str(upload_id).encode()).hexdigest()[:13]
+        return RedirectResponse(f"{zonatmo_base(request)}/viewer/{uniqid}/paginated", status_code=302)
+
+    @app.get("/zonatmo/viewer/{uniqid}/paginated", response_class=HTMLResponse)
+    def viewer(request: Request, uniqid: str):
+        return fixtures.manga_viewer_html(
+            pages=config.pages, uniqid=uniqid, images_base=f"{zonatmo_base(request)}/uploads"
+        )
+
+    @app.get("/zonatmo/viewer/{uniqid}/paginated/{page}", response_class=HTMLResponse)
+    def viewer_page(request: Request, uniqid: str, page: int):
+        return fixtures.manga_viewer_page_html(
+            page, pages=config.pages, uniqid=uniqid, images_base=f"{zonatmo_base(request)}/uploads"
+        )
+
+    @app.get("/zonatmo/uploads/{uniqid}/{filename}")
+    def image(uniqid: str, filename: str):
+        return Response(_png(f"{uniqid}/{filename}", config.image_kib), media_type="image/png")
+
+    return app
+
+
+def main():
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9000)
+    defaults = SimConfig()
+    for field, value in vars(defaults).items():
+        parser.add_argument(f"--{field.replace('_', '-')}", type=type(value) if value is not None else int, default=value)
+    args = vars(parser.parse_args())
+    host, port = args.pop("host"), args.pop("port")
+
+    uvicorn.run(create_app(SimConfig(**args)), host=host, port=port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()